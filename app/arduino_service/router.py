@@ -2,14 +2,17 @@ from fastapi import APIRouter, HTTPException
 from .schemas import UpdateData, DeviceUpdateRequest, DeviceUpdateResponse, RawDataRequest, RawDataResponse
 from app.database import get_db_connection
 from app.websocket.manager import broadcast_machine_status
+from app.notifications.outbox import enqueue_completion, notify_outbox
 from datetime import datetime, timedelta
 import traceback
 import pytz
 import logging
-import asyncio
 
-from app.services.ai_summary import refresh_ai_tip_if_needed
-from app.services.kma_weather import refresh_weather_if_needed
+from app.services.refresh_scheduler import signal_state_changed
+from app.services.duration_model import duration_model
+from app.services.cycle_history import record_cycle
+from app.services.congestion import record_congestion, week_index, week_start
+from app.services.state_version import bump_state_version, bump_version
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -25,6 +28,7 @@ WEEKDAY_MAP = {
 }
 
 KST = pytz.timezone('Asia/Seoul')
+SEGMENT_BY_FIELD = {"avg_washing_time": "washing", "avg_spinning_time": "spinning"}
 MIN_TIMESTAMP = 1577836800  # 2020-01-01
 
 
@@ -118,11 +122,15 @@ def calculate_and_update_thresholds(cursor, machine_uuid: int):
         logger.error(f"기준점 계산 중 오류: {str(e)}", exc_info=True)
         # 기준점 계산 실패해도 진행 (중요하지 않음)
 
-def update_congestion_for_range(cursor, start_timestamp: int, end_timestamp: int):
+def update_congestion_for_range(cursor, start_timestamp: int, end_timestamp: int, room_id: int | None = None) -> list[tuple[int, int, int]]:
     """
     세탁 시작부터 종료까지의 모든 시간대 혼잡도 +1
     예: 7시 시작 ~ 9시 종료 → 7시, 8시, 9시 각각 +1
+    busy_table(전체 누적)과 congestion_weekly_table(세탁실 × 주 단위)을 함께 갱신
+    반환: 갱신한 (주 인덱스, 요일 인덱스, 시간) 목록 → 커밋 후 인메모리 혼잡도 집계에 같은 증가 반영
     """
+    cells: list[tuple[int, int, int]] = []
+    weekly_room_id = int(room_id) if room_id is not None else 0
     start_dt = datetime.fromtimestamp(start_timestamp, tz=pytz.UTC).astimezone(KST)
     end_dt = datetime.fromtimestamp(end_timestamp, tz=pytz.UTC).astimezone(KST)
     
@@ -141,26 +149,43 @@ def update_congestion_for_range(cursor, start_timestamp: int, end_timestamp: int
             updated_at = CURRENT_TIMESTAMP
         """
         cursor.execute(congestion_query, (day_str, hour))
+
+        week = week_index(current_dt.date())
+        cursor.execute(
+            """
+            INSERT INTO congestion_weekly_table (room_id, week_start, busy_day, busy_time, busy_count)
+            VALUES (%s, %s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE busy_count = busy_count + 1
+            """,
+            (weekly_room_id, week_start(week), weekday, hour),
+        )
+        cells.append((week, weekday, hour))
         
         current_dt += timedelta(hours=1)
 
+    return cells
 
-def update_course_avg_time(cursor, course_name: str, elapsed_time: int):
+
+def update_course_avg_time(cursor, course_name: str, elapsed_time: int, machine_id: int | None = None):
     """
-    코스별 평균 소요 시간 (time_table 업데이트 중지, 기존 값만 사용)
-    count_avg는 항상 1로 유지
+    코스 전체 소요 시간 학습 (duration_model, 주기적으로 duration_model_table에 저장)
+    time_table은 기본값으로만 사용하고 더 이상 갱신하지 않음
     """
-    logger.info(f"[time_table 업데이트 중지] 코스 '{course_name}' 기존 값 사용, elapsed_time={elapsed_time}초는 무시")
-    return
+    duration_model.observe(machine_id, course_name, "total", int(elapsed_time) // 60)
+    logger.info(f"코스 '{course_name}' 전체 소요 시간 기록: machine_id={machine_id}, elapsed_time={elapsed_time}초")
 
 
-def update_segment_avg_time(cursor, course_name: str, elapsed_minutes: int, field_name: str):
+def update_segment_avg_time(cursor, course_name: str, elapsed_minutes: int, field_name: str, machine_id: int | None = None):
     """
-    특정 구간의 평균 시간 (time_table 업데이트 중지, 기존 값만 사용)
-    count_avg는 항상 1로 유지
+    구간(세탁/탈수) 소요 시간 학습 (duration_model)
+    field_name: avg_washing_time / avg_spinning_time
     """
-    logger.info(f"[time_table 업데이트 중지] 코스 '{course_name}' {field_name} 기존 값 사용, elapsed={elapsed_minutes}분은 무시")
-    return
+    segment = SEGMENT_BY_FIELD.get(field_name)
+    if segment is None:
+        logger.warning(f"알 수 없는 구간: {field_name}")
+        return
+    duration_model.observe(machine_id, course_name, segment, elapsed_minutes)
+    logger.info(f"코스 '{course_name}' {segment} 소요 시간 기록: machine_id={machine_id}, elapsed={elapsed_minutes}분")
 
 
 @router.post("/update")
@@ -197,7 +222,7 @@ async def update(data: UpdateData):
             # ===== 2단계: 현재 DB 상태 조회 =====
             try:
                 cursor.execute(
-                    "SELECT status, last_update, machine_uuid FROM machine_table WHERE machine_id=%s",
+                    "SELECT status, last_update, machine_uuid, course_name FROM machine_table WHERE machine_id=%s",
                     (data.machine_id,)
                 )
                 
@@ -209,6 +234,8 @@ async def update(data: UpdateData):
                 
                 current_status = db_result.get("status")
                 machine_uuid = db_result.get("machine_uuid")
+                # 4단계의 FINISHED UPDATE가 course_name을 NULL로 초기화하므로 이번 사이클의 코스명을 미리 보관
+                cycle_course_name = db_result.get("course_name")
                 
                 logger.info(f"DB 조회 완료: current_status={current_status}, machine_uuid={machine_uuid}")
                 
@@ -275,7 +302,7 @@ async def update(data: UpdateData):
                         if washing_time_seconds > 0 and course_name:
                             washing_time_minutes = washing_time_seconds // 60
                             logger.info(f"세탁 시간 계산: {data.timestamp} - {first_timestamp} = {washing_time_seconds}초 = {washing_time_minutes}분")
-                            update_segment_avg_time(cursor, course_name, washing_time_minutes, "avg_washing_time")
+                            update_segment_avg_time(cursor, course_name, washing_time_minutes, "avg_washing_time", data.machine_id)
                             logger.info("세탁 시간 업데이트 완료")
                         else:
                             logger.warning(f"세탁 시간 계산 실패: washing_time={washing_time_seconds}초, course_name={course_name}")
@@ -320,7 +347,9 @@ async def update(data: UpdateData):
                         if drying_time_seconds > 0 and course_name:
                             drying_time_minutes = drying_time_seconds // 60
                             logger.info(f"건조 시간 계산: {data.timestamp} - {first_timestamp} = {drying_time_seconds}초 = {drying_time_minutes}분")
-                            logger.info("건조 시간 계산 완료")
+                            # 건조기는 건조 시간이 곧 전체 소요 시간
+                            update_course_avg_time(cursor, course_name, drying_time_seconds, data.machine_id)
+                            logger.info("건조 시간 기록 완료")
                         else:
                             logger.warning(f"건조 시간 계산 실패: drying_time={drying_time_seconds}초, course_name={course_name}")
                 
@@ -377,6 +406,8 @@ async def update(data: UpdateData):
           
           
             # ===== 5단계: FINISHED 처리 =====
+            congestion_cells: list[tuple[int, int, int]] = []
+            congestion_room_id = None
             if data.status == "FINISHED":
                 try:
                     logger.info("FINISHED 상태: 추가 처리 시작")
@@ -388,7 +419,8 @@ async def update(data: UpdateData):
                         UNIX_TIMESTAMP(first_update) as first_timestamp,
                         last_update as last_timestamp,
                         spinning_update,
-                        course_name
+                        room_id,
+                        machine_type
                         FROM machine_table 
                         WHERE machine_id=%s
                         """,
@@ -404,34 +436,37 @@ async def update(data: UpdateData):
                     first_timestamp = result.get("first_timestamp")
                     spinning_update = result.get("spinning_update")
                     last_timestamp = result.get("last_timestamp")
-                    course_name = result.get("course_name")
+                    is_dryer = result.get("machine_type") == "dryer"
                     
-                    logger.info(f"코스명: {course_name}")
+                    logger.info(f"코스명: {cycle_course_name}")
                     logger.info(f"first_timestamp (세탁 시작): {first_timestamp}")
                     logger.info(f"spinning_update (탈수 시작): {spinning_update}")  # 
                     logger.info(f"last_timestamp (종료): {last_timestamp}")
                     
+                    # 이번 사이클에 탈수가 없었으면 spinning_update는 이전 사이클 값이므로 제외
                     if (spinning_update is not None and 
                         last_timestamp is not None and 
-                        course_name is not None):
+                        cycle_course_name is not None and
+                        (first_timestamp is None or int(spinning_update) >= int(first_timestamp))):
                         
                         spinning_time_seconds = int(last_timestamp) - int(spinning_update)
                         
                         if spinning_time_seconds > 0:
                             spinning_time_minutes = spinning_time_seconds // 60
                             logger.info(f"탈수 시간 계산: {last_timestamp} - {spinning_update} = {spinning_time_seconds}초 = {spinning_time_minutes}분")
-                            update_segment_avg_time(cursor, course_name, spinning_time_minutes, "avg_spinning_time")
+                            update_segment_avg_time(cursor, cycle_course_name, spinning_time_minutes, "avg_spinning_time", data.machine_id)
                             logger.info("탈수 시간 기록 완료")
                         else:
                             logger.warning("탈수 시간 계산 실패")
                     else:
                         logger.warning("탈수 시간 계산 필수 데이터 누락 (스킵)")
-                        logger.warning(f"   spinning_update={spinning_update}, last_timestamp={last_timestamp}, course_name={course_name}")
+                        logger.warning(f"   spinning_update={spinning_update}, last_timestamp={last_timestamp}, course_name={cycle_course_name}")
                     
-                    # 강화된 유효성 검사
-                    if (first_timestamp is not None and 
+                    # 강화된 유효성 검사 (건조기 전체 시간은 3-3단계에서 이미 기록)
+                    if (not is_dryer and
+                        first_timestamp is not None and 
                         last_timestamp is not None and 
-                        course_name is not None and
+                        cycle_course_name is not None and
                         isinstance(first_timestamp, (int, float)) and
                         isinstance(last_timestamp, (int, float)) and
                         (int(last_timestamp) - int(first_timestamp)) > 0):  # 
@@ -458,7 +493,7 @@ async def update(data: UpdateData):
                             
                             # 유효한 시간만 기록 (함수 내에서도 체크!)
                             if elapsed_time is not None and elapsed_time > 0:
-                                update_course_avg_time(cursor, course_name, elapsed_time)
+                                update_course_avg_time(cursor, cycle_course_name, elapsed_time, data.machine_id)
                                 logger.info("코스 시간 기록 완료")
                             else:
                                 logger.warning(f"코스 시간 기록 스킵: elapsed_time={elapsed_time}")
@@ -466,11 +501,11 @@ async def update(data: UpdateData):
                         except Exception as e:
                             logger.error(f"코스별 시간 계산 중 오류: {str(e)}", exc_info=True)
                     
-                    else:
+                    elif not is_dryer:
                         logger.warning("필수 데이터 누락 또는 타입 오류:")
                         logger.warning(f"  first_timestamp={first_timestamp}")
                         logger.warning(f"  last_timestamp={last_timestamp}")
-                        logger.warning(f"  course_name={course_name}")
+                        logger.warning(f"  course_name={cycle_course_name}")
                     
                     # standard_table 삽입
                     try:
@@ -503,16 +538,45 @@ async def update(data: UpdateData):
                         isinstance(last_timestamp, (int, float)) and
                         (int(last_timestamp) - int(first_timestamp)) > 0):  # 
                         try:
-                            update_congestion_for_range(cursor, int(first_timestamp), int(last_timestamp))
+                            congestion_room_id = result.get("room_id")
+                            congestion_cells = update_congestion_for_range(
+                                cursor, int(first_timestamp), int(last_timestamp), congestion_room_id
+                            )
                             logger.info("혼잡도 업데이트 완료")
                         except Exception as e:
                             logger.error(f"혼잡도 업데이트 실패: {str(e)}", exc_info=True)
                     else:
                         logger.warning("혼잡도 업데이트 스킵: timestamp 정보 부족 또는 음수")
                     
+                    # 사이클 기록 (wash_cycle_table, 사이클당 1회)
+                    try:
+                        record_cycle(
+                            cursor,
+                            machine_id=data.machine_id,
+                            machine_uuid=machine_uuid,
+                            room_id=result.get("room_id"),
+                            machine_type=result.get("machine_type"),
+                            course_name=cycle_course_name,
+                            started_at=first_timestamp,
+                            spinning_at=spinning_update,
+                            finished_at=last_timestamp,
+                            wash_avg_magnitude=data.wash_avg_magnitude,
+                            wash_max_magnitude=data.wash_max_magnitude,
+                            spin_max_magnitude=data.spin_max_magnitude,
+                        )
+                    except Exception as e:
+                        logger.error(f"사이클 기록 실패: {str(e)}", exc_info=True)
+                    
                 except Exception as e:
                     logger.error(f"FINISHED 처리 중 오류: {str(e)}", exc_info=True)
                     
+            # ===== 5-1단계: 완료 푸시 알림 outbox 기록 (상태 변경과 같은 트랜잭션) =====
+            outbox_id = None
+            if actual_status == "FINISHED":
+                try:
+                    outbox_id = enqueue_completion(cursor, data.machine_id, actual_status, int(datetime.now(KST).timestamp()))
+                except Exception as e:
+                    logger.error(f"알림 outbox 기록 실패: {str(e)}", exc_info=True)
             
             # ===== 6단계: DB 커밋 ===== 
             try:
@@ -522,6 +586,14 @@ async def update(data: UpdateData):
                 logger.error(f"DB 커밋 실패: {str(e)}", exc_info=True)
                 raise HTTPException(status_code=500, detail=f"DB 커밋 실패: {str(e)}")
             
+            bump_state_version("update")
+            if congestion_cells:
+                # 커밋된 busy_table 증가분을 인메모리 행렬에도 반영 + 혼잡도 ETag 무효화
+                record_congestion(congestion_room_id, congestion_cells)
+                bump_version("congestion", "finished")
+            if outbox_id is not None:
+                notify_outbox()
+            
             # ===== 7단계: WebSocket 브로드캐스트 =====
             try:
                 if actual_status in ("WASHING", "SPINNING", "DRYING", "FINISHED"):
@@ -529,14 +601,11 @@ async def update(data: UpdateData):
                     logger.info(f"WebSocket 브로드캐스트 완료: {actual_status}")
             except Exception as e:
                 logger.error(f"WebSocket 브로드캐스트 실패: {str(e)}", exc_info=True)
+            # FINISHED 브로드캐스트의 알림 자동 해제까지 반영
+            bump_state_version("update_broadcast")
 
-            # ===== 8단계: AI TIP / 날씨 캐시 비동기 갱신 트리거 =====
-            try:
-                asyncio.create_task(refresh_ai_tip_if_needed())
-                asyncio.create_task(refresh_weather_if_needed())
-                logger.debug("Background AI tip/weather refresh tasks scheduled")
-            except Exception as e:
-                logger.warning(f"Background refresh scheduling failed: {str(e)}", exc_info=True)
+            # ===== 8단계: AI TIP 갱신 스케줄러에 상태 변경 알림 (갱신 시점은 스케줄러가 결정) =====
+            signal_state_changed()
 
             logger.info(f"UPDATE 요청 완료: machine_id={data.machine_id}")
             return {"message": "received"}
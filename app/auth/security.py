@@ -1,14 +1,23 @@
 import os
 import time
 import hashlib
+import threading
 import jwt
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from app.database import get_db_connection
 
 ALGORITHM = "HS256"
 SECRET = os.getenv("JWT_SECRET", "dev_secret")
 
+# 토큰 검증 캐시: user_id -> (jti, access_token, user row, 만료 시각(monotonic))
+# /login, /logout 등 user_token이 바뀌는 곳에서 invalidate_cached_user로 즉시 무효화한다.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+_auth_cache: Dict[int, Tuple[Optional[str], str, dict, float]] = {}
+_auth_cache_lock = threading.Lock()
+_auth_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
@@ -49,15 +58,56 @@ def get_user_by_id(user_id: int) -> Optional[dict]:
 
 
 def get_current_user(access_token: str) -> dict:
+    # 서명/만료 검증은 항상 수행하고, DB 조회(user_token 일치 확인)만 캐시한다
     payload = decode_jwt(access_token)
     user_id = int(payload.get("sub"))
+    jti = payload.get("jti")
+
+    now = time.monotonic()
+    with _auth_cache_lock:
+        entry = _auth_cache.get(user_id)
+        if entry and entry[0] == jti and entry[1] == access_token and entry[3] > now:
+            _auth_cache_stats["hits"] += 1
+            return dict(entry[2])
+        _auth_cache_stats["misses"] += 1
+
     with get_db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute("SELECT * FROM user_table WHERE user_id = %s", (user_id,))
         user = cursor.fetchone()
         if not user or user.get("user_token") != access_token:
             raise ValueError("Invalid token")
-        return user
+
+    if AUTH_CACHE_TTL_SECONDS > 0:
+        with _auth_cache_lock:
+            if len(_auth_cache) >= AUTH_CACHE_MAX_ENTRIES:
+                for uid in [uid for uid, e in _auth_cache.items() if e[3] <= now]:
+                    _auth_cache.pop(uid, None)
+            if len(_auth_cache) < AUTH_CACHE_MAX_ENTRIES:
+                _auth_cache[user_id] = (jti, access_token, dict(user), now + AUTH_CACHE_TTL_SECONDS)
+    return user
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """토큰 교체(로그인/로그아웃)나 user_table 변경 시 캐시된 검증 결과 제거."""
+    with _auth_cache_lock:
+        if _auth_cache.pop(int(user_id), None) is not None:
+            _auth_cache_stats["invalidations"] += 1
+
+
+def get_auth_cache_stats() -> dict:
+    with _auth_cache_lock:
+        hits = _auth_cache_stats["hits"]
+        misses = _auth_cache_stats["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "invalidations": _auth_cache_stats["invalidations"],
+            "hit_ratio": (hits / total) if total else None,
+            "size": len(_auth_cache),
+            "ttl_seconds": AUTH_CACHE_TTL_SECONDS,
+        }
 
 
 def is_admin(user: dict) -> bool:
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from app.notifications.fcm import is_retryable_error
+from app.utils.metrics import LatencyHistogram
+
+FCM_DISPATCH_WORKERS = int(os.getenv("FCM_DISPATCH_WORKERS", "2"))
+FCM_DISPATCH_QUEUE_SIZE = int(os.getenv("FCM_DISPATCH_QUEUE_SIZE", "1000"))
+FCM_DISPATCH_MAX_RETRIES = 3
+FCM_DISPATCH_RETRY_INITIAL_DELAY = 0.5
+
+
+class _Job:
+    __slots__ = ("func", "label", "future", "enqueued_at")
+
+    def __init__(self, func: Callable[[], Any], label: str, future: Optional[asyncio.Future]):
+        self.func = func
+        self.label = label
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class NotificationDispatcher:
+    """FCM 전송을 이벤트 루프 밖에서 처리하는 비동기 작업 큐.
+
+    - 브로드캐스트 코드는 enqueue/submit만 하고 즉시 반환 (이벤트 루프 블로킹 없음)
+    - 워커 N개가 전용 스레드 풀에서 동기 Firebase Admin SDK 호출을 실행
+    - 네트워크 오류 재시도는 time.sleep 대신 asyncio.sleep으로 대기
+    """
+
+    def __init__(self, workers: int = FCM_DISPATCH_WORKERS, queue_size: int = FCM_DISPATCH_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.queue_latency = LatencyHistogram()
+        self.send_latency = LatencyHistogram()
+        self._counters = {
+            "enqueued": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "dropped": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fcm-dispatch")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"FCM dispatcher started workers={self.workers} queue_size={self.queue_size}")
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self._tasks:
+            return
+        # 남은 작업은 잠시 기다려 처리하고 종료
+        if self._queue is not None and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"FCM dispatcher stop: {self._queue.qsize()} jobs left unsent")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info("FCM dispatcher stopped")
+
+    def enqueue(self, func: Callable[..., Any], *args, label: str = "", **kwargs) -> None:
+        """전송 작업을 큐에 넣고 바로 반환 (결과는 로그/지표로만 확인)."""
+        self._put(_Job(functools.partial(func, *args, **kwargs), label or func.__name__, None))
+
+    def submit(self, func: Callable[..., Any], *args, label: str = "", **kwargs) -> asyncio.Future:
+        """전송 작업을 큐에 넣고 결과를 받을 Future 반환."""
+        future = asyncio.get_running_loop().create_future()
+        self._put(_Job(functools.partial(func, *args, **kwargs), label or func.__name__, future))
+        return future
+
+    def _put(self, job: _Job) -> None:
+        self._counters["enqueued"] += 1
+        if self._queue is None:
+            # 디스패처가 시작되지 않은 경우(시작 실패 등)에도 이벤트 루프는 막지 않음
+            asyncio.get_running_loop().create_task(self._run_job(job))
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["dropped"] += 1
+            logger.error(f"❌ FCM dispatcher queue full, job dropped: {job.label}")
+            if job.future is not None and not job.future.done():
+                job.future.set_exception(RuntimeError("FCM dispatcher queue full"))
+
+    async def _worker(self, idx: int) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._run_job(job)
+            except Exception:
+                logger.exception(f"FCM dispatcher worker {idx}: unexpected error")
+            finally:
+                queue.task_done()
+
+    async def _run_job(self, job: _Job) -> None:
+        loop = asyncio.get_running_loop()
+        self.queue_latency.observe(time.monotonic() - job.enqueued_at)
+
+        delay = FCM_DISPATCH_RETRY_INITIAL_DELAY
+        for attempt in range(1, FCM_DISPATCH_MAX_RETRIES + 1):
+            started = time.monotonic()
+            try:
+                result = await loop.run_in_executor(self._executor, job.func)
+            except Exception as e:
+                self.send_latency.observe(time.monotonic() - started)
+                if is_retryable_error(e) and attempt < FCM_DISPATCH_MAX_RETRIES:
+                    self._counters["retries"] += 1
+                    logger.warning(
+                        f"⚠️ FCM 전송 네트워크 오류 (시도 {attempt}/{FCM_DISPATCH_MAX_RETRIES}, {job.label}): {e} → {delay}초 후 재시도"
+                    )
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                    continue
+                self._counters["failed"] += 1
+                logger.error(f"❌ FCM 전송 실패 ({job.label}): {e}")
+                if job.future is not None and not job.future.done():
+                    job.future.set_exception(e)
+                return
+
+            self.send_latency.observe(time.monotonic() - started)
+            self._counters["completed"] += 1
+            logger.info(f"✅ FCM 전송 완료 ({job.label}): {result}")
+            if job.future is not None and not job.future.done():
+                job.future.set_result(result)
+            return
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "workers": self.workers,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_latency": self.queue_latency.snapshot(),
+            "send_latency": self.send_latency.snapshot(),
+        }
+
+
+dispatcher = NotificationDispatcher()
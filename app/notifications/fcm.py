@@ -5,6 +5,7 @@ from loguru import logger
 # Firebase Admin SDK (v1 API) - 필수
 try:
     import firebase_admin  # type: ignore
+    from firebase_admin import exceptions as firebase_exceptions  # type: ignore
     from firebase_admin import messaging  # type: ignore
 except Exception as e:
     logger.error(f"❌ Firebase Admin SDK import failed: {e}")
@@ -16,6 +17,68 @@ def _chunked(items: List[str], size: int = 500) -> List[List[str]]:
     return [items[i:i + size] for i in range(0, len(items), size)]
 
 
+def is_retryable_error(exc: Exception) -> bool:
+    """재시도 가능한 네트워크 오류인지 확인"""
+    error_str = str(exc).lower()
+    return any(err in error_str for err in ['connection reset', 'timeout', 'network', 'unreachable'])
+
+
+def _build_data_payload(title: str, body: str, data: Optional[Dict]) -> Dict[str, str]:
+    """Data payload를 문자열로 변환 (title, body 포함)"""
+    return {
+        "title": str(title),
+        "body": str(body),
+        **{str(k): str(v) for k, v in (data or {}).items()}
+    }
+
+
+def _build_webpush_config(title: str, body: str, data: Optional[Dict]):
+    """✅ iOS PWA를 위한 WebpushConfig 설정"""
+    # machine_id가 있으면 딥링크로 이동, 없으면 메인 페이지
+    machine_id = data.get("machine_id", "") if data else ""
+    click_url = f"https://washcall.space/index.html#{machine_id}" if machine_id else "https://washcall.space/index.html"
+    
+    return messaging.WebpushConfig(
+        notification=messaging.WebpushNotification(
+            title=title,
+            body=body,
+            icon='/images/favicon.png',  # 알림 아이콘
+        ),
+        fcm_options=messaging.WebpushFCMOptions(
+            link=click_url  # 알림 클릭 시 이동할 URL
+        ),
+        headers={
+            'TTL': '300'  # 5분 TTL (Time To Live)
+        }
+    )
+
+
+def classify_token_error(exc: Optional[Exception]) -> str:
+    """토큰별 전송 실패를 FCM 오류 코드로 분류.
+
+    Returns:
+        "dead": 토큰이 영구적으로 무효 (UNREGISTERED, SENDER_ID_MISMATCH, 잘못된 토큰 형식)
+        "transient": 일시적 오류 (UNAVAILABLE, INTERNAL, QUOTA_EXCEEDED 등)
+        "other": 그 외 (payload 오류 등 토큰과 무관한 실패)
+    """
+    if exc is None:
+        return "other"
+    if isinstance(exc, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return "dead"
+    # INVALID_ARGUMENT는 payload 오류일 수도 있으므로 토큰 관련 메시지일 때만 무효 처리
+    if isinstance(exc, firebase_exceptions.InvalidArgumentError) and "registration token" in str(exc).lower():
+        return "dead"
+    if isinstance(exc, (
+        messaging.QuotaExceededError,
+        firebase_exceptions.UnavailableError,
+        firebase_exceptions.InternalError,
+        firebase_exceptions.DeadlineExceededError,
+        firebase_exceptions.ResourceExhaustedError,
+    )):
+        return "transient"
+    return "other"
+
+
 def _retry_with_backoff(func, max_retries: int = 3, initial_delay: float = 1.0):
     """네트워크 오류 시 지수 백오프로 재시도"""
     delay = initial_delay
@@ -26,10 +89,9 @@ def _retry_with_backoff(func, max_retries: int = 3, initial_delay: float = 1.0):
             return func()
         except Exception as e:
             last_exception = e
-            error_str = str(e).lower()
             
             # 재시도 가능한 네트워크 오류인지 확인
-            if any(err in error_str for err in ['connection reset', 'timeout', 'network', 'unreachable']):
+            if is_retryable_error(e):
                 if attempt < max_retries - 1:
                     logger.warning(f"⚠️ 네트워크 오류 발생 (시도 {attempt + 1}/{max_retries}): {e}")
                     logger.info(f"🔄 {delay}초 후 재시도...")
@@ -45,7 +107,13 @@ def _retry_with_backoff(func, max_retries: int = 3, initial_delay: float = 1.0):
     raise last_exception
 
 
-def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict] = None) -> Dict:
+def send_to_tokens(
+    tokens: List[str],
+    title: str,
+    body: str,
+    data: Optional[Dict] = None,
+    max_retries: int = 3,
+) -> Dict:
     """Send push notifications to device tokens using Firebase Admin SDK v1 API.
     
     Firebase Admin SDK must be initialized in main.py startup event before calling this function.
@@ -55,9 +123,12 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
         title: Notification title
         body: Notification body
         data: Optional data payload (will be converted to strings)
+        max_retries: In-call retries on network errors (blocking sleep). The async
+            dispatcher passes 1 and schedules retries with asyncio.sleep instead.
     
     Returns:
-        Dict with keys: attempted (int), sent (int), v1 (bool), errors (list)
+        Dict with keys: attempted (int), sent (int), v1 (bool), errors (list),
+        token_failures (dict: full token -> classify_token_error 결과)
     """
     # 토큰 정리
     tokens = [t for t in (tokens or []) if t]
@@ -72,36 +143,14 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
 
     logger.info(f"🔥 FCM v1 API 사용 - 토큰 수: {len(tokens)}")
     
-    # Data payload를 문자열로 변환 (title, body 포함)
-    data_str = {
-        "title": str(title),
-        "body": str(body),
-        **{str(k): str(v) for k, v in (data or {}).items()}
-    }
-    
-    # ✅ iOS PWA를 위한 WebpushConfig 설정
-    # machine_id가 있으면 딥링크로 이동, 없으면 메인 페이지
-    machine_id = data.get("machine_id", "") if data else ""
-    click_url = f"https://washcall.space/index.html#{machine_id}" if machine_id else "https://washcall.space/index.html"
-    
-    webpush_config = messaging.WebpushConfig(
-        notification=messaging.WebpushNotification(
-            title=title,
-            body=body,
-            icon='/images/favicon.png',  # 알림 아이콘
-        ),
-        fcm_options=messaging.WebpushFCMOptions(
-            link=click_url  # 알림 클릭 시 이동할 URL
-        ),
-        headers={
-            'TTL': '300'  # 5분 TTL (Time To Live)
-        }
-    )
+    data_str = _build_data_payload(title, body, data)
+    webpush_config = _build_webpush_config(title, body, data)
     
     # 배치 전송 (FCM v1은 최대 500개 토큰/요청)
     attempted = 0
     sent_total = 0
     failed_tokens = []
+    token_failures: Dict[str, str] = {}
     
     try:
         for batch in _chunked(tokens):
@@ -116,7 +165,7 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
             def send_batch():
                 return messaging.send_each_for_multicast(msg)
             
-            resp = _retry_with_backoff(send_batch, max_retries=3, initial_delay=0.5)
+            resp = _retry_with_backoff(send_batch, max_retries=max_retries, initial_delay=0.5)
             
             attempted += len(batch)
             success_count = int(getattr(resp, "success_count", 0))
@@ -127,9 +176,12 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
             if failure_count > 0 and hasattr(resp, 'responses'):
                 for idx, response in enumerate(resp.responses):
                     if not response.success:
+                        kind = classify_token_error(response.exception)
+                        token_failures[batch[idx]] = kind
                         failed_tokens.append({
                             "token": batch[idx][:20] + "...",
-                            "error": str(response.exception) if response.exception else "Unknown"
+                            "error": str(response.exception) if response.exception else "Unknown",
+                            "kind": kind,
                         })
             
             logger.info(f"📤 배치 전송 완료: success={success_count}, fail={failure_count}")
@@ -144,6 +196,7 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
         
         if failed_tokens:
             result["errors"] = failed_tokens
+            result["token_failures"] = token_failures
             logger.warning(f"⚠️ 실패한 토큰 수: {len(failed_tokens)}")
         
         return result
@@ -163,3 +216,55 @@ def send_to_tokens(tokens: List[str], title: str, body: str, data: Optional[Dict
         
         logger.error(f"   전체 스택: {repr(e)}", exc_info=True)
         raise
+
+
+def send_messages(items: List[Dict], max_retries: int = 3) -> Dict:
+    """Send individual (per-token) messages in as few FCM round-trips as possible.
+
+    Unlike send_to_tokens, every item may carry its own title/body/data, so
+    completions of several machines can share one send_each request
+    (FCM v1 accepts up to 500 messages per call).
+
+    Args:
+        items: List of dicts with keys token (required), title, body, data
+        max_retries: In-call retries on network errors (see send_to_tokens)
+
+    Returns:
+        Dict with keys: attempted (int), sent (int), v1 (bool),
+        outcomes (list aligned with items: None on success, otherwise
+        classify_token_error 결과)
+    """
+    items = list(items or [])
+    if not items:
+        return {"attempted": 0, "sent": 0, "v1": True, "outcomes": []}
+
+    if not firebase_admin._apps:  # type: ignore[attr-defined]
+        logger.error("❌ Firebase Admin SDK가 초기화되지 않았습니다")
+        raise RuntimeError("Firebase Admin SDK must be initialized before sending notifications")
+
+    outcomes: List[Optional[str]] = []
+    sent_total = 0
+    for start in range(0, len(items), 500):
+        chunk = items[start:start + 500]
+        messages = [
+            messaging.Message(
+                data=_build_data_payload(item["title"], item["body"], item.get("data")),
+                webpush=_build_webpush_config(item["title"], item["body"], item.get("data")),
+                token=item["token"],
+            )
+            for item in chunk
+        ]
+
+        def send_chunk():
+            return messaging.send_each(messages)
+
+        resp = _retry_with_backoff(send_chunk, max_retries=max_retries, initial_delay=0.5)
+        for response in resp.responses:
+            if response.success:
+                outcomes.append(None)
+                sent_total += 1
+            else:
+                outcomes.append(classify_token_error(response.exception))
+        logger.info(f"📤 메시지 배치 전송 완료: success={resp.success_count}, fail={resp.failure_count}")
+
+    return {"attempted": len(items), "sent": sent_total, "v1": True, "outcomes": outcomes}
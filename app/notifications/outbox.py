@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import suppress
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.database import get_db_connection
+from app.notifications.dispatcher import dispatcher
+from app.notifications.subscriber_index import subscriber_index
+from app.notifications.token_health import backoff_remaining, send_messages_and_prune
+
+# 발송 루프 주기 (이벤트 신호가 없어도 이 주기로 미발송 행 확인)
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "5"))
+# 신호를 받은 뒤 다른 완료 이벤트를 함께 모으기 위해 잠깐 대기
+OUTBOX_BATCH_WINDOW_SECONDS = float(os.getenv("OUTBOX_BATCH_WINDOW_SECONDS", "0.2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# 행을 가져간 프로세스가 죽어도 이 시간이 지나면 다른 발송 루프가 다시 가져감
+OUTBOX_LOCK_SECONDS = 60
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_RETRY_MAX_SECONDS = 600
+
+_outbox_task: asyncio.Task | None = None
+_outbox_wakeup: asyncio.Event | None = None
+_stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "rounds": 0}
+
+
+def _completion_messages(machine: dict, machine_id: int, status: str) -> tuple[dict, dict, dict]:
+    """완료 알림 (title, body) 조합: (개별 알림용, 방 구독자용, data)"""
+    room_name = machine.get("room_name") or "세탁실"
+    machine_name = machine.get("machine_name") or "세탁기"
+    if (machine.get("machine_type") or "washer") == "dryer":
+        notify_msg = {"title": "🎉 건조 완료!", "body": f"{machine_name}의 건조가 완료되었습니다. 빨래를 꺼내주세요!"}
+        room_msg = {"title": f"🎉 {room_name} 건조 완료!", "body": f"{machine_name}의 건조가 완료되었습니다."}
+    else:
+        notify_msg = {"title": "🎉 세탁 완료!", "body": f"{machine_name}의 세탁이 완료되었습니다. 빨래를 꺼내주세요!"}
+        room_msg = {"title": f"🎉 {room_name} 세탁 완료!", "body": f"{machine_name}의 세탁이 완료되었습니다."}
+    data = {
+        "machine_id": str(machine_id),
+        "room_id": str(machine.get("room_id")),
+        "status": status,
+        "click_action": "index.html",
+        "type": "wash_complete",
+    }
+    return notify_msg, room_msg, data
+
+
+def enqueue_completion(cursor, machine_id: int, status: str, now_ts: int) -> Optional[int]:
+    """FINISHED 상태 변경과 같은 트랜잭션에서 완료 알림을 outbox에 기록.
+
+    cursor는 /update의 (dictionary=True) 커서이며 커밋은 호출자가 한다.
+    수신자(개별 알림 구독자, 방 전용 구독자)는 이 시점에 확정해 payload에 저장하므로
+    이후 notify_subscriptions가 자동 해제되어도 재시도가 가능하다.
+    """
+    cursor.execute(
+        "SELECT machine_uuid, machine_name, machine_type, room_id, room_name FROM machine_table WHERE machine_id = %s",
+        (machine_id,),
+    )
+    machine = cursor.fetchone()
+    if not machine:
+        return None
+
+    if subscriber_index.loaded:
+        # 개별 알림 구독자와 중복되는 방 구독자는 제외 (인메모리 집합 연산)
+        notify_uids, room_uids = subscriber_index.completion_targets(machine.get("room_id"), machine.get("machine_uuid"))
+    else:
+        subscriber_index.note_fallback()
+        cursor.execute(
+            "SELECT DISTINCT user_id FROM notify_subscriptions WHERE machine_uuid = %s",
+            (machine.get("machine_uuid"),),
+        )
+        notify_uids = sorted({int(r["user_id"]) for r in cursor.fetchall() or []})
+
+        room_uids: List[int] = []
+        if machine.get("room_id") is not None:
+            cursor.execute(
+                "SELECT DISTINCT user_id FROM room_subscriptions WHERE room_id = %s",
+                (machine.get("room_id"),),
+            )
+            # 개별 알림 구독자와 중복되는 방 구독자는 제외
+            room_uids = sorted({int(r["user_id"]) for r in cursor.fetchall() or []} - set(notify_uids))
+
+    notify_msg, room_msg, data = _completion_messages(machine, machine_id, status)
+    groups = []
+    if notify_uids:
+        groups.append({**notify_msg, "user_ids": notify_uids})
+    if room_uids:
+        groups.append({**room_msg, "user_ids": room_uids})
+    if not groups:
+        logger.info(f"FCM 스킵: machine_id={machine_id}, 구독자 없음 (outbox 미기록)")
+        return None
+
+    cursor.execute(
+        """
+        INSERT INTO notification_outbox
+            (machine_id, room_id, event_type, payload, status, created_at, next_attempt_at)
+        VALUES (%s, %s, %s, %s, 'PENDING', %s, %s)
+        """,
+        (machine_id, machine.get("room_id"), "wash_complete",
+         json.dumps({"data": data, "groups": groups}, ensure_ascii=False), now_ts, now_ts),
+    )
+    _stats["enqueued"] += 1
+    logger.info(
+        f"📥 outbox 기록: machine_id={machine_id}, notify={len(notify_uids)}명, room={len(room_uids)}명"
+    )
+    return cursor.lastrowid
+
+
+def notify_outbox() -> None:
+    """커밋 직후 호출: 발송 루프를 깨워 바로 전송."""
+    if _outbox_wakeup is not None:
+        _outbox_wakeup.set()
+
+
+def _claim_rows(owner: str, now_ts: int) -> List[dict]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            UPDATE notification_outbox
+            SET locked_by = %s, locked_until = %s
+            WHERE status = 'PENDING'
+              AND next_attempt_at <= %s
+              AND (locked_until IS NULL OR locked_until < %s)
+            ORDER BY outbox_id
+            LIMIT %s
+            """,
+            (owner, now_ts + OUTBOX_LOCK_SECONDS, now_ts, now_ts, OUTBOX_BATCH_SIZE),
+        )
+        conn.commit()
+        cursor.execute(
+            "SELECT outbox_id, machine_id, payload, attempts FROM notification_outbox WHERE locked_by = %s AND status = 'PENDING'",
+            (owner,),
+        )
+        return cursor.fetchall() or []
+
+
+def _fetch_tokens(user_ids: set[int]) -> Dict[int, str]:
+    if not user_ids:
+        return {}
+    if subscriber_index.loaded:
+        return subscriber_index.tokens_for(user_ids)
+    subscriber_index.note_fallback()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        placeholders = ",".join(["%s"] * len(user_ids))
+        cursor.execute(
+            f"SELECT user_id, fcm_token FROM user_table WHERE user_id IN ({placeholders}) AND fcm_token IS NOT NULL",
+            tuple(user_ids),
+        )
+        return {int(r[0]): r[1] for r in cursor.fetchall() or [] if r and r[1]}
+
+
+def _finish_rows(owner: str, results: List[tuple], now_ts: int) -> None:
+    """results: (outbox_id, attempts, 남은 payload 또는 None(완료), last_error, retry_after)
+
+    retry_after가 있으면 (토큰 백오프로 건너뛴 수신자만 남은 경우) 지수 백오프 대신 그 시간 뒤에 재시도.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for outbox_id, attempts, remaining, last_error, retry_after in results:
+            if remaining is None:
+                cursor.execute(
+                    """
+                    UPDATE notification_outbox
+                    SET status = 'SENT', sent_at = %s, attempts = %s, locked_by = NULL, locked_until = NULL
+                    WHERE outbox_id = %s AND locked_by = %s
+                    """,
+                    (now_ts, attempts, outbox_id, owner),
+                )
+                _stats["sent"] += 1
+            elif attempts >= OUTBOX_MAX_ATTEMPTS:
+                cursor.execute(
+                    """
+                    UPDATE notification_outbox
+                    SET status = 'FAILED', attempts = %s, payload = %s, last_error = %s,
+                        locked_by = NULL, locked_until = NULL
+                    WHERE outbox_id = %s AND locked_by = %s
+                    """,
+                    (attempts, json.dumps(remaining, ensure_ascii=False), (last_error or "")[:500], outbox_id, owner),
+                )
+                _stats["failed"] += 1
+                logger.error(f"❌ outbox 발송 포기: outbox_id={outbox_id}, attempts={attempts}, error={last_error}")
+            else:
+                delay = min(OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX_SECONDS)
+                if retry_after is not None:
+                    delay = max(retry_after, OUTBOX_RETRY_BASE_SECONDS)
+                cursor.execute(
+                    """
+                    UPDATE notification_outbox
+                    SET attempts = %s, payload = %s, last_error = %s, next_attempt_at = %s,
+                        locked_by = NULL, locked_until = NULL
+                    WHERE outbox_id = %s AND locked_by = %s
+                    """,
+                    (attempts, json.dumps(remaining, ensure_ascii=False), (last_error or "")[:500],
+                     now_ts + int(delay), outbox_id, owner),
+                )
+                _stats["retried"] += 1
+        conn.commit()
+
+
+async def drain_outbox_once() -> int:
+    """미발송 outbox 행을 한 번에 가져와 한 번의 FCM 라운드로 전송. 처리한 행 수 반환."""
+    owner = uuid.uuid4().hex
+    now_ts = int(time.time())
+    rows = await asyncio.to_thread(_claim_rows, owner, now_ts)
+    if not rows:
+        return 0
+    _stats["rounds"] += 1
+
+    payloads: Dict[int, dict] = {}
+    user_ids: set[int] = set()
+    for row in rows:
+        payload = row["payload"]
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode("utf-8")
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        payloads[int(row["outbox_id"])] = payload
+        for group in payload.get("groups", []):
+            user_ids.update(int(u) for u in group.get("user_ids", []))
+
+    tokens = await asyncio.to_thread(_fetch_tokens, user_ids)
+
+    # 여러 세탁기의 완료 알림을 하나의 send_each 라운드로 묶음
+    items: List[dict] = []
+    owners: List[tuple] = []  # (outbox_id, group_idx, user_id)
+    for outbox_id, payload in payloads.items():
+        for g_idx, group in enumerate(payload.get("groups", [])):
+            for uid in group.get("user_ids", []):
+                token = tokens.get(int(uid))
+                if not token:
+                    continue
+                items.append({"token": token, "title": group["title"], "body": group["body"], "data": payload.get("data")})
+                owners.append((outbox_id, g_idx, int(uid)))
+
+    last_error: Optional[str] = None
+    retry_uids: Dict[tuple, set] = {}
+    failed_rows: set[int] = set()  # 실제 전송 실패가 있었던 행 (attempts 증가)
+    skipped_tokens: Dict[int, List[str]] = {}  # 행별 백오프로 건너뛴 토큰
+    if items:
+        try:
+            result = await dispatcher.submit(send_messages_and_prune, items, label=f"outbox rows={len(rows)}")
+            for item, (outbox_id, g_idx, uid), outcome in zip(items, owners, result.get("outcomes") or []):
+                if outcome == "transient":
+                    failed_rows.add(outbox_id)
+                elif outcome == "skipped":
+                    # 백오프 중인 토큰은 보내지 않았을 뿐이므로 백오프가 끝난 뒤 다시 보냄
+                    skipped_tokens.setdefault(outbox_id, []).append(item["token"])
+                else:
+                    continue
+                retry_uids.setdefault((outbox_id, g_idx), set()).add(uid)
+            if failed_rows:
+                last_error = "transient FCM failure"
+        except Exception as e:
+            # 전송 자체가 실패 → 모든 행 그대로 재시도
+            last_error = str(e)
+            for outbox_id, g_idx, uid in owners:
+                retry_uids.setdefault((outbox_id, g_idx), set()).add(uid)
+                failed_rows.add(outbox_id)
+
+    results = []
+    for row in rows:
+        outbox_id = int(row["outbox_id"])
+        payload = payloads[outbox_id]
+        remaining_groups = []
+        for g_idx, group in enumerate(payload.get("groups", [])):
+            uids = retry_uids.get((outbox_id, g_idx))
+            if uids:
+                remaining_groups.append({**group, "user_ids": sorted(uids)})
+        attempts = int(row.get("attempts") or 0)
+        retry_after = None
+        if remaining_groups and outbox_id not in failed_rows:
+            # 백오프로 건너뛴 수신자만 남음: 시도 횟수를 쓰지 않고 백오프가 끝날 때 재시도
+            retry_after = int(backoff_remaining(skipped_tokens.get(outbox_id, ()))) + 1
+        else:
+            attempts += 1
+        remaining = {**payload, "groups": remaining_groups} if remaining_groups else None
+        row_error = "token in backoff" if retry_after is not None else last_error
+        results.append((outbox_id, attempts, remaining, row_error, retry_after))
+
+    await asyncio.to_thread(_finish_rows, owner, results, int(time.time()))
+    logger.info(f"📤 outbox 라운드 완료: rows={len(rows)}, messages={len(items)}, retry_groups={len(retry_uids)}")
+    return len(rows)
+
+
+async def _outbox_loop():
+    logger.info(f"Outbox sender started poll={OUTBOX_POLL_INTERVAL_SECONDS}s batch={OUTBOX_BATCH_SIZE}")
+    assert _outbox_wakeup is not None
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_outbox_wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL_SECONDS)
+                await asyncio.sleep(OUTBOX_BATCH_WINDOW_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _outbox_wakeup.clear()
+            try:
+                # 배치 크기만큼 가득 찼으면 이어서 한 번 더 처리
+                while await drain_outbox_once() >= OUTBOX_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("outbox_loop: iteration failed")
+    except asyncio.CancelledError:
+        logger.info("Outbox sender cancelled")
+        raise
+
+
+async def start_outbox_sender():
+    global _outbox_task, _outbox_wakeup
+    if _outbox_task and not _outbox_task.done():
+        return
+    _outbox_wakeup = asyncio.Event()
+    _outbox_task = asyncio.create_task(_outbox_loop())
+
+
+async def stop_outbox_sender():
+    global _outbox_task, _outbox_wakeup
+    if not _outbox_task:
+        return
+    _outbox_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await _outbox_task
+    _outbox_task = None
+    _outbox_wakeup = None
+
+
+def get_outbox_stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from contextlib import suppress
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.database import get_db_connection
+
+# 다른 프로세스/직접 DB 수정과의 차이를 맞추기 위한 전체 재적재 주기 (0이면 비활성화)
+SUBSCRIBER_INDEX_RELOAD_SECONDS = float(os.getenv("SUBSCRIBER_INDEX_RELOAD_SECONDS", "300"))
+
+# (room_id → 방 구독자, machine_uuid → 개별 알림 구독자, user_id → fcm_token)
+Maps = Tuple[Dict[int, Set[int]], Dict[int, Set[int]], Dict[int, str]]
+
+
+class SubscriberIndex:
+    """알림 대상 계산용 인메모리 인덱스.
+
+    - room_id → 방 구독자 user_id 집합 (room_subscriptions)
+    - machine_uuid → 개별 알림 구독자 user_id 집합 (notify_subscriptions)
+    - user_id → fcm_token (user_table)
+
+    기동 시 한 번 적재하고, 구독/토큰을 바꾸는 엔드포인트가 커밋 후 직접 갱신한다.
+    적재 전(DB 미준비 등)에는 loaded=False 이므로 호출자는 기존 DB 조회로 폴백한다.
+    """
+
+    def __init__(self):
+        self._room_users: Dict[int, Set[int]] = {}
+        self._machine_users: Dict[int, Set[int]] = {}
+        self._tokens: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        # 재적재 중(SELECT ~ 교체 사이)에 들어온 갱신. 교체 직전에 새 매핑에 다시 적용한다
+        self._journal: Optional[List[Callable[[Maps], None]]] = None
+        self.loaded = False
+        self._stats = {"reloads": 0, "lookups": 0, "fallbacks": 0, "replayed": 0}
+
+    # ---------- 적재 ----------
+
+    def load(self) -> None:
+        """DB에서 세 매핑을 다시 읽어 한 번에 교체.
+
+        읽는 동안 들어온 구독/토큰 갱신은 기록해 두었다가 새 매핑에 다시 적용한 뒤 교체하므로
+        스냅샷보다 늦은 갱신이 재적재로 사라지지 않는다 (집합 추가/삭제라 중복 적용해도 같음).
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            room_users: Dict[int, Set[int]] = {}
+            machine_users: Dict[int, Set[int]] = {}
+            tokens: Dict[int, str] = {}
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT room_id, user_id FROM room_subscriptions")
+                for room_id, user_id in cursor.fetchall() or []:
+                    room_users.setdefault(int(room_id), set()).add(int(user_id))
+                cursor.execute("SELECT machine_uuid, user_id FROM notify_subscriptions")
+                for machine_uuid, user_id in cursor.fetchall() or []:
+                    machine_users.setdefault(int(machine_uuid), set()).add(int(user_id))
+                cursor.execute("SELECT user_id, fcm_token FROM user_table WHERE fcm_token IS NOT NULL")
+                for user_id, token in cursor.fetchall() or []:
+                    if token:
+                        tokens[int(user_id)] = token
+
+            with self._lock:
+                journal = self._journal or []
+                for op in journal:
+                    op((room_users, machine_users, tokens))
+                self._room_users = room_users
+                self._machine_users = machine_users
+                self._tokens = tokens
+                self.loaded = True
+                self._stats["reloads"] += 1
+                self._stats["replayed"] += len(journal)
+        finally:
+            with self._lock:
+                self._journal = None
+        logger.info(
+            f"🗂️ 구독자 인덱스 적재: rooms={len(room_users)}, machines={len(machine_users)}, "
+            f"tokens={len(tokens)}, replayed={len(journal)}"
+        )
+
+    # ---------- 갱신 (커밋 후 호출) ----------
+
+    def _mutate(self, op: Callable[[Maps], None]) -> None:
+        """현재 매핑에 적용하고, 재적재 중이면 교체 전에 다시 적용하도록 기록."""
+        with self._lock:
+            op((self._room_users, self._machine_users, self._tokens))
+            if self._journal is not None:
+                self._journal.append(op)
+
+    def add_room_subscriber(self, room_id: int, user_id: int) -> None:
+        def op(maps: Maps) -> None:
+            maps[0].setdefault(int(room_id), set()).add(int(user_id))
+        self._mutate(op)
+
+    def add_notify_subscriber(self, machine_uuid: int, user_id: int) -> None:
+        def op(maps: Maps) -> None:
+            maps[1].setdefault(int(machine_uuid), set()).add(int(user_id))
+        self._mutate(op)
+
+    def remove_notify_subscriber(self, user_id: int, machine_uuids: Iterable[int]) -> None:
+        machine_uuids = [int(m) for m in machine_uuids]
+
+        def op(maps: Maps) -> None:
+            machine_users = maps[1]
+            for machine_uuid in machine_uuids:
+                users = machine_users.get(machine_uuid)
+                if users is not None:
+                    users.discard(int(user_id))
+                    if not users:
+                        del machine_users[machine_uuid]
+        self._mutate(op)
+
+    def clear_machine(self, machine_uuid: int) -> None:
+        """FINISHED 후 개별 알림 자동 해제."""
+        def op(maps: Maps) -> None:
+            maps[1].pop(int(machine_uuid), None)
+        self._mutate(op)
+
+    def set_token(self, user_id: int, token: Optional[str]) -> None:
+        def op(maps: Maps) -> None:
+            if token:
+                maps[2][int(user_id)] = token
+            else:
+                maps[2].pop(int(user_id), None)
+        self._mutate(op)
+
+    def remove_tokens(self, tokens: Iterable[str]) -> None:
+        """무효 토큰 정리(user_table NULL 처리)와 동일하게 인덱스에서도 제거."""
+        dead = set(tokens)
+        if not dead:
+            return
+
+        def op(maps: Maps) -> None:
+            user_tokens = maps[2]
+            for user_id in [uid for uid, t in user_tokens.items() if t in dead]:
+                del user_tokens[user_id]
+        self._mutate(op)
+
+    # ---------- 조회 ----------
+
+    def room_users(self, room_id: Optional[int]) -> List[int]:
+        with self._lock:
+            self._stats["lookups"] += 1
+            return sorted(self._room_users.get(int(room_id), ())) if room_id is not None else []
+
+    def user_rooms(self, user_id: int) -> List[int]:
+        """사용자가 구독한 세탁실 (세탁실 수만큼 순회)."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            return sorted(room_id for room_id, users in self._room_users.items() if int(user_id) in users)
+
+    def machine_users(self, machine_uuid: Optional[int]) -> List[int]:
+        with self._lock:
+            self._stats["lookups"] += 1
+            return sorted(self._machine_users.get(int(machine_uuid), ())) if machine_uuid is not None else []
+
+    def completion_targets(self, room_id: Optional[int], machine_uuid: Optional[int]) -> Tuple[List[int], List[int]]:
+        """완료 알림 대상: (개별 알림 구독자, 개별 알림과 겹치지 않는 방 구독자)."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            notify = set(self._machine_users.get(int(machine_uuid), ())) if machine_uuid is not None else set()
+            room = set(self._room_users.get(int(room_id), ())) if room_id is not None else set()
+        return sorted(notify), sorted(room - notify)
+
+    def tokens_for(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        with self._lock:
+            self._stats["lookups"] += 1
+            return {int(uid): self._tokens[int(uid)] for uid in user_ids if int(uid) in self._tokens}
+
+    def note_fallback(self) -> None:
+        with self._lock:
+            self._stats["fallbacks"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": self.loaded,
+                "rooms": len(self._room_users),
+                "machines": len(self._machine_users),
+                "tokens": len(self._tokens),
+            }
+
+
+subscriber_index = SubscriberIndex()
+
+_reload_task: asyncio.Task | None = None
+
+
+async def _reload_loop():
+    try:
+        while True:
+            await asyncio.sleep(SUBSCRIBER_INDEX_RELOAD_SECONDS)
+            try:
+                await asyncio.to_thread(subscriber_index.load)
+            except Exception:
+                logger.exception("subscriber_index: reload failed")
+    except asyncio.CancelledError:
+        raise
+
+
+async def start_subscriber_index():
+    """기동 시 적재 + 주기적 재적재 시작. 적재 실패 시 DB 조회 폴백으로 동작."""
+    global _reload_task
+    try:
+        await asyncio.to_thread(subscriber_index.load)
+    except Exception as e:
+        logger.error(f"❌ 구독자 인덱스 적재 실패 (DB 조회로 폴백): {e}")
+    if SUBSCRIBER_INDEX_RELOAD_SECONDS > 0 and (_reload_task is None or _reload_task.done()):
+        _reload_task = asyncio.create_task(_reload_loop())
+
+
+async def stop_subscriber_index():
+    global _reload_task
+    if not _reload_task:
+        return
+    _reload_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await _reload_task
+    _reload_task = None
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from loguru import logger
+
+from app.database import get_db_connection
+from app.notifications.fcm import send_messages
+from app.notifications.subscriber_index import subscriber_index
+
+# 일시 오류 토큰 백오프: 실패 횟수에 따라 base * 2^(n-1)초 동안 전송 제외 (최대 max)
+TOKEN_BACKOFF_BASE_SECONDS = float(os.getenv("FCM_TOKEN_BACKOFF_BASE_SECONDS", "60"))
+TOKEN_BACKOFF_MAX_SECONDS = float(os.getenv("FCM_TOKEN_BACKOFF_MAX_SECONDS", "3600"))
+
+# token -> (연속 일시 실패 횟수, 다음 전송 허용 시각(monotonic))
+_backoff: Dict[str, Tuple[int, float]] = {}
+_lock = threading.Lock()
+_stats = {
+    "dead_detected": 0,
+    "pruned": 0,
+    "transient_failures": 0,
+    "skipped_backoff": 0,
+    "recovered": 0,
+}
+
+
+def filter_sendable(tokens: Iterable[str]) -> List[str]:
+    """백오프 기간 중인 토큰을 제외한 전송 대상 목록."""
+    now = time.monotonic()
+    result = []
+    with _lock:
+        for token in tokens:
+            entry = _backoff.get(token)
+            if entry and entry[1] > now:
+                _stats["skipped_backoff"] += 1
+                continue
+            result.append(token)
+    return result
+
+
+def backoff_remaining(tokens: Iterable[str]) -> float:
+    """토큰들 중 가장 늦게 끝나는 백오프까지 남은 시간 (초, 백오프 중인 토큰이 없으면 0)."""
+    now = time.monotonic()
+    with _lock:
+        return max((_backoff[t][1] - now for t in tokens if t in _backoff), default=0.0) if _backoff else 0.0
+
+
+def record_results(sent_tokens: Iterable[str], token_failures: Dict[str, str]) -> None:
+    """전송 결과로 토큰별 백오프 점수 갱신."""
+    now = time.monotonic()
+    with _lock:
+        for token in sent_tokens:
+            if token in token_failures:
+                continue
+            if _backoff.pop(token, None) is not None:
+                _stats["recovered"] += 1
+        for token, kind in token_failures.items():
+            if kind == "transient":
+                failures = _backoff.get(token, (0, 0.0))[0] + 1
+                delay = min(TOKEN_BACKOFF_BASE_SECONDS * (2 ** (failures - 1)), TOKEN_BACKOFF_MAX_SECONDS)
+                _backoff[token] = (failures, now + delay)
+                _stats["transient_failures"] += 1
+            elif kind == "dead":
+                _backoff.pop(token, None)
+                _stats["dead_detected"] += 1
+
+
+def prune_dead_tokens(tokens: List[str]) -> int:
+    """영구 무효 토큰을 user_table에서 일괄 NULL 처리."""
+    tokens = list(dict.fromkeys(t for t in tokens if t))
+    if not tokens:
+        return 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join(["%s"] * len(tokens))
+            cursor.execute(
+                f"UPDATE user_table SET fcm_token = NULL WHERE fcm_token IN ({placeholders})",
+                tuple(tokens),
+            )
+            pruned = cursor.rowcount or 0
+            conn.commit()
+    except Exception as e:
+        logger.error(f"❌ 무효 FCM 토큰 정리 실패: tokens={len(tokens)}, error={e}")
+        return 0
+
+    subscriber_index.remove_tokens(tokens)
+    with _lock:
+        _stats["pruned"] += pruned
+    logger.info(f"🧹 무효 FCM 토큰 정리: {pruned}개 NULL 처리")
+    return pruned
+
+
+def send_messages_and_prune(items: List[Dict], max_retries: int = 1) -> Dict:
+    """백오프 중인 토큰은 건너뛰고 메시지를 전송한 뒤, 영구 무효 토큰은 바로 정리.
+
+    디스패처 워커 스레드에서 실행되는 것을 전제로 한다 (동기 DB 접근).
+
+    Returns:
+        send_messages 결과 + pruned, skipped_backoff.
+        outcomes는 입력 items 순서 기준 (None=성공, "skipped"=백오프로 건너뜀,
+        그 외 classify_token_error 결과).
+    """
+    items = list(items or [])
+    sendable_tokens = set(filter_sendable(item["token"] for item in items))
+    send_items = [item for item in items if item["token"] in sendable_tokens]
+
+    result = send_messages(send_items, max_retries=max_retries) if send_items else {
+        "attempted": 0, "sent": 0, "v1": True, "outcomes": [],
+    }
+    sent_outcomes = result.get("outcomes") or []
+
+    token_failures = {
+        item["token"]: kind for item, kind in zip(send_items, sent_outcomes) if kind
+    }
+    record_results([item["token"] for item in send_items], token_failures)
+
+    dead = [t for t, kind in token_failures.items() if kind == "dead"]
+    result["pruned"] = prune_dead_tokens(dead) if dead else 0
+
+    outcome_iter = iter(sent_outcomes)
+    result["outcomes"] = [
+        next(outcome_iter, "other") if item["token"] in sendable_tokens else "skipped"
+        for item in items
+    ]
+    result["skipped_backoff"] = len(items) - len(send_items)
+    return result
+
+
+def get_token_health_stats() -> dict:
+    with _lock:
+        now = time.monotonic()
+        return {
+            **_stats,
+            "backoff_tokens": sum(1 for _, until in _backoff.values() if until > now),
+        }
@@ -1,163 +1,55 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import os
 import random
+import re
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from typing import Optional
 
 import holidays
 import pytz
-import requests
-from google import genai
 from google.genai import types
 from loguru import logger
-from openai import OpenAI
 
 from app.database import get_db_connection
+from app.services.congestion import congestion_matrix
+from app.services.forecast import build_forecasts, forecast_tip_message
+from app.services.http_clients import http_clients
 from app.services.kma_weather import get_kma_weather_from_cache_only
+from app.services.prompt_compiler import compile_batch_prompt, compile_prompt, prompt_metrics
+from app.services.tip_memo import context_fingerprint, tip_memo
+from app.services.tip_pool import tip_generation_lock, tip_pool
 
 CACHE_DURATION_SECONDS = 60  # 1분
+# Ollama 후보 동시 요청 수 / 전체 생성 마감 시간 (초, 마감까지 받은 후보만 사용)
+OLLAMA_PARALLELISM = max(1, int(os.getenv("OLLAMA_PARALLELISM", "3")))
+OLLAMA_DEADLINE_SECONDS = float(os.getenv("OLLAMA_DEADLINE_SECONDS", "45"))
+# OpenRouter/Ollama 스트리밍 응답 사용 (첫 줄이 끝나면 읽기를 멈춰 생성 시간 단축)
+AI_STREAMING = os.getenv("AI_STREAMING", "true").lower() == "true"
+# /tip에서 캐시가 비었을 때 AI 생성을 기다리는 최대 시간 (초). 넘으면 로컬 TIP 반환, 생성은 백그라운드로 계속
+TIP_DEADLINE_SECONDS = float(os.getenv("TIP_DEADLINE_SECONDS", "2"))
 KST = pytz.timezone("Asia/Seoul")
+# 여러 세탁실 TIP을 한 번에 생성할 때의 시스템 지시 (세탁실마다 "ID|문장" 한 줄)
+BATCH_SYSTEM_INSTRUCTION = (
+    "당신은 대학 기숙사 세탁실 이용 시간을 추천하는 AI입니다. "
+    "세탁실마다 정확히 한 줄씩, '세탁실ID|추천 문장' 형식으로만 답합니다. "
+    "추천 문장은 자연스럽고 친근한 말투의 미래 예측 형태이며 이모지를 적절히 활용합니다."
+)
+# 배치 응답 한 줄: "1|추천 문장" (ID 앞뒤 괄호, 구분자 |/:/) 허용)
+ROOM_LINE_RE = re.compile(r"^\s*[-*]?\s*\[?(\d+)\]?\s*[|:)]\s*(.+)$")
 AI_REFRESH_LOCK = asyncio.Lock()
 
 
 def _build_prompt(status_context: dict) -> str:
-    """Build AI prompt from status context data."""
-    prompt_parts = [
-        "당신은 대학 기숙사 세탁실 이용 시간을 추천하는 AI입니다.",
-        "다음 정보를 바탕으로 **언제 세탁하면 좋을지** **무조건 한 줄**로 추천해주세요.",
-        "현재 상황을 간단히 언급하고, 혼잡도 통계를 분석하여 가장 한산한 시간대(요일+시간)를 추천하세요.",
-        "자연스럽고 친근한 말투로 작성하되, 미래 예측 형태로 작성해주세요.",
-        "",
-        "# 현재 세탁실 상황",
-    ]
+    """Build AI prompt from status context data (server-side digest, bounded size)."""
+    return compile_prompt(status_context)
 
-    # Time context
-    time_ctx = status_context.get("time", {})
-    if time_ctx:
-        weekday = time_ctx.get("weekday", "")
-        hour = time_ctx.get("hour", 0)
-        period = "오전" if hour < 12 else "오후"
-        hour_12 = hour if hour <= 12 else hour - 12
-        if hour_12 == 0:
-            hour_12 = 12
-        prompt_parts.append(f"- 현재 시간: {weekday}요일 {period} {hour_12}시")
-        if time_ctx.get("is_holiday"):
-            prompt_parts.append("- 오늘은 공휴일입니다")
-
-    # Weather context (전체 정보)
-    weather = status_context.get("weather")
-    if weather:
-        weather_lines = ["- 날씨 상세:"]
-        
-        # 기온
-        temp = weather.get("temperature")
-        if temp is not None:
-            weather_lines.append(f"  * 현재 기온: {temp}°C")
-        min_temp = weather.get("min_temperature")
-        max_temp = weather.get("max_temperature")
-        if min_temp is not None or max_temp is not None:
-            temp_range = []
-            if min_temp is not None:
-                temp_range.append(f"최저 {min_temp}°C")
-            if max_temp is not None:
-                temp_range.append(f"최고 {max_temp}°C")
-            weather_lines.append(f"  * 예상 기온: {', '.join(temp_range)}")
-        
-        # 강수
-        pop = weather.get("precipitation_probability")
-        if pop is not None:
-            weather_lines.append(f"  * 강수확률: {pop}%")
-        pty = weather.get("precipitation_type")
-        if pty and pty != "없음":
-            weather_lines.append(f"  * 강수형태: {pty}")
-        pcp = weather.get("precipitation_amount")
-        if pcp and pcp != "강수없음":
-            weather_lines.append(f"  * 강수량: {pcp}")
-        sno = weather.get("snow_amount")
-        if sno and sno != "적설없음":
-            weather_lines.append(f"  * 적설량: {sno}")
-        
-        # 하늘 상태
-        sky = weather.get("sky_condition")
-        if sky:
-            weather_lines.append(f"  * 하늘: {sky}")
-        
-        # 바람
-        wind_speed = weather.get("wind_speed")
-        wind_dir = weather.get("wind_direction")
-        if wind_speed is not None:
-            wind_info = f"풍속 {wind_speed}m/s"
-            if wind_dir is not None:
-                wind_info += f", 풍향 {wind_dir}°"
-            weather_lines.append(f"  * 바람: {wind_info}")
-        
-        # 습도
-        humidity = weather.get("humidity")
-        if humidity is not None:
-            weather_lines.append(f"  * 습도: {humidity}%")
-        
-        if len(weather_lines) > 1:
-            prompt_parts.extend(weather_lines)
-
-    # Room summaries
-    rooms = status_context.get("rooms", [])
-    if rooms:
-        prompt_parts.append("- 세탁실별 현황:")
-        for room in rooms:
-            room_name = room.get("room_name")
-            available = room.get("machines_idle", 0)
-            total = room.get("machines_total", 0)
-            busy = room.get("machines_busy", 0)
-            estimated_wait = room.get("estimated_wait_minutes")
-            
-            room_info = f"  * {room_name}: 사용 가능 {available}/{total}대"
-            if busy > 0:
-                room_info += f", 사용 중 {busy}대"
-            if estimated_wait and estimated_wait > 0:
-                room_info += f", 예상 대기 {int(estimated_wait)}분"
-            prompt_parts.append(room_info)
-
-    # Totals
-    totals = status_context.get("totals", {})
-    if totals:
-        prompt_parts.append(f"- 전체: 사용 가능 {totals.get('machines_idle', 0)}대 / 총 {totals.get('machines_total', 0)}대")
-        
-        # Active reservations
-        active_res = totals.get("reservations_total", 0)
-        if active_res > 0:
-            prompt_parts.append(f"- 활성 예약: {active_res}건")
-
-    # Recent alerts
-    alerts = status_context.get("alerts", {})
-    recent_finished = alerts.get("recent_finished_count", 0)
-    if recent_finished > 0:
-        prompt_parts.append(f"- 최근 완료: {recent_finished}건")
-
-    # Congestion statistics (요일별/시간별 혼잡도 - 전체 시간대)
-    congestion = status_context.get("congestion_stats")
-    if congestion:
-        prompt_parts.append("- 혼잡도 통계 (요일별/시간별 평균 사용 대수, 전체 시간대):")
-        for day, hours in congestion.items():
-            if isinstance(hours, list) and len(hours) == 24:
-                hour_str = ", ".join([f"{i}시:{hours[i]}대" for i in range(24)])
-                prompt_parts.append(f"  * {day}: {hour_str}")
-
-    prompt_parts.append("")
-    prompt_parts.append(
-        "위 정보를 바탕으로 **언제 세탁하면 좋을지** 한 줄로 추천해주세요. "
-        "혼잡도 통계를 분석하여 가장 한산한 시간대(요일과 시간)를 찾고, "
-        "'Y요일 Z시가 가장 한산할 것 같아요!' 또는 "
-        "'지금보다 오늘 저녁 8시가 더 쾌적할 것 같아요!' 같은 식으로 **미래 시간대를 추천**해주세요. "
-        "친근한 말투와 이모지를 적절히 사용하면 좋습니다."
-    )
-
-    return "\n".join(prompt_parts)
-
-
-def _call_google_gemini(prompt: str, model: str, api_key: str, count: int = 5) -> list[str]:
+
+def _call_google_gemini(prompt: str, model: str, api_key: str, count: int = 5, max_lines: int = 1) -> list[str]:
     """Call Google Gemini API for multiple text generation responses.
     
     Args:
@@ -165,12 +57,13 @@ def _call_google_gemini(prompt: str, model: str, api_key: str, count: int = 5) -
         model: Model name
         api_key: API key
         count: Number of responses to generate (default: 5)
+        max_lines: Lines per response (>1 = batch mode, one line per room)
     
     Returns:
         List of generated responses
     """
     try:
-        client = genai.Client(api_key=api_key)
+        client = http_clients.genai(api_key)
         
         # System instruction for time recommendation
         system_instruction = (
@@ -179,7 +72,7 @@ def _call_google_gemini(prompt: str, model: str, api_key: str, count: int = 5) -
             "혼잡도 통계를 분석하여 가장 한산한 미래 시간대(요일+시간)를 추천하세요. "
             "'내일 금요일 저녁 8시가 한산할 것 같아요!' 또는 '오늘 밤 10시 이후가 쾌적할 거예요!' 같은 식으로 "
             "**미래 예측** 형태로 추천해주세요. 이모지를 적절히 활용하세요."
-        )
+        ) if max_lines == 1 else BATCH_SYSTEM_INSTRUCTION
         
         # Configure with multiple candidates
         config = types.GenerateContentConfig(
@@ -193,11 +86,12 @@ def _call_google_gemini(prompt: str, model: str, api_key: str, count: int = 5) -
         
         logger.debug(f"[Gemini] Sending prompt to {model} (requesting {count} responses)")
         
-        response = client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config,
-        )
+        with http_clients.observe("gemini"):
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config,
+            )
         
         # Extract all candidate responses
         results = []
@@ -232,6 +126,7 @@ def _call_openrouter_chat(
     api_key: str,
     base_url: str,
     count: int = 5,
+    max_lines: int = 1,
 ) -> list[str]:
     """Call OpenRouter (OpenAI-compatible) chat completion API for multiple tips.
 
@@ -241,15 +136,13 @@ def _call_openrouter_chat(
         api_key: OpenRouter API key.
         base_url: OpenRouter base URL (default: https://openrouter.ai/api/v1).
         count: Number of candidate responses to request.
+        max_lines: Lines per response (>1 = batch mode, one line per room).
 
     Returns:
         List of generated one-line tips.
     """
     try:
-        client = OpenAI(
-            base_url=base_url,
-            api_key=api_key,
-        )
+        client = http_clients.openai(base_url, api_key)
 
         system_instruction = (
             "당신은 대학 기숙사 세탁실 이용 시간을 추천하는 AI입니다. "
@@ -257,11 +150,11 @@ def _call_openrouter_chat(
             "혼잡도 통계를 분석하여 가장 한산한 미래 시간대(요일+시간)를 추천하세요. "
             "'내일 금요일 저녁 8시가 한산할 것 같아요!' 또는 '오늘 밤 10시 이후가 쾌적할 거예요!' 같은 식으로 "
             "미래 예측 형태로 추천해주세요. 이모지를 적절히 활용하세요."
-        )
+        ) if max_lines == 1 else BATCH_SYSTEM_INSTRUCTION
 
         logger.debug(f"[OpenRouter] Sending prompt to {model} (requesting {count} responses)")
 
-        response = client.chat.completions.create(
+        request = dict(
             model=model,
             messages=[
                 {"role": "system", "content": system_instruction},
@@ -272,6 +165,15 @@ def _call_openrouter_chat(
             extra_body={"reasoning": {"enabled": True}},
         )
 
+        if AI_STREAMING:
+            with http_clients.observe("openrouter"):
+                results = _read_openrouter_stream(client.chat.completions.create(stream=True, **request), count, max_lines)
+            logger.debug(f"[OpenRouter] Total streamed responses: {len(results)}")
+            return results
+
+        with http_clients.observe("openrouter"):
+            response = client.chat.completions.create(**request)
+
         results: list[str] = []
         if hasattr(response, "choices") and response.choices:
             for idx, choice in enumerate(response.choices, start=1):
@@ -289,23 +191,89 @@ def _call_openrouter_chat(
         return []
 
 
-def _call_ollama(prompt: str, model: str, base_url: str) -> Optional[str]:
+def _head_lines(text: str, max_lines: int = 1) -> tuple[str, bool]:
+    """(앞쪽 max_lines줄, 그만큼 줄이 끝났는지). 빈 줄은 무시."""
+    *finished, tail = text.split("\n")
+    lines = [line.strip() for line in finished if line.strip()]
+    if len(lines) >= max_lines:
+        return "\n".join(lines[:max_lines]), True
+    if tail.strip():
+        lines.append(tail.strip())
+    return "\n".join(lines), False
+
+
+def _read_openrouter_stream(stream, count: int, max_lines: int = 1) -> list[str]:
+    """choice별로 델타를 모으고, 모든 choice가 max_lines줄을 채우면 스트림을 닫는다 (TIP은 세탁실당 한 줄)."""
+    texts: dict[int, str] = {}
+    done: set[int] = set()
+    try:
+        for chunk in stream:
+            for choice in chunk.choices or []:
+                idx = choice.index
+                if idx in done:
+                    continue
+                texts[idx] = texts.get(idx, "") + ((choice.delta.content if choice.delta else None) or "")
+                if choice.finish_reason or _head_lines(texts[idx], max_lines)[1]:
+                    done.add(idx)
+            if len(done) >= count:
+                break
+    finally:
+        stream.close()
+    return [text for text in (_head_lines(texts[idx], max_lines)[0] for idx in sorted(texts)) if text]
+
+
+def _read_ollama_stream(response, max_lines: int = 1) -> str:
+    """Ollama NDJSON 스트림에서 max_lines줄이 끝나거나 done이 오면 읽기 중단."""
+    text = ""
+    for raw in response.iter_lines():
+        if not raw:
+            continue
+        data = json.loads(raw)
+        text += data.get("response", "")
+        if data.get("done") or _head_lines(text, max_lines)[1]:
+            break
+    return _head_lines(text, max_lines)[0]
+
+
+def _call_ollama(
+    prompt: str,
+    model: str,
+    base_url: str,
+    timeout: Optional[float] = None,
+    max_lines: int = 1,
+) -> Optional[str]:
     """Call Ollama API for text generation."""
     url = f"{base_url.rstrip('/')}/api/generate"
     
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
+        "stream": AI_STREAMING,
         "options": {
             "temperature": 0.7,
-            "num_predict": 200,
+            # 배치 모드는 세탁실 수만큼 줄이 늘어나므로 생성 길이도 늘림
+            "num_predict": 200 if max_lines == 1 else 100 * max_lines,
         }
     }
     
+    request_kwargs = {"json": payload}
+    if timeout is not None:
+        request_kwargs["timeout"] = timeout
+
     try:
-        response = requests.post(url, json=payload, timeout=30)
-        response.raise_for_status()
+        if AI_STREAMING:
+            with http_clients.observe("ollama"):
+                with http_clients.http().stream("POST", url, **request_kwargs) as response:
+                    response.raise_for_status()
+                    generated_text = _read_ollama_stream(response, max_lines)
+            if generated_text:
+                return generated_text
+            logger.warning("Ollama stream ended without text")
+            return None
+
+        with http_clients.observe("ollama"):
+            response = http_clients.http().post(url, **request_kwargs)
+            response.raise_for_status()
         data = response.json()
         
         generated_text = data.get("response", "").strip()
@@ -319,84 +287,97 @@ def _call_ollama(prompt: str, model: str, base_url: str) -> Optional[str]:
         return None
 
 
-def _fetch_cached_tip() -> Optional[str]:
-    """Fetch a random cached tip if available and not expired."""
-    try:
-        now_ts = int(time.time())
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT tip_message FROM ai_tip_cache WHERE fetched_at >= %s",
-                (now_ts - CACHE_DURATION_SECONDS,)
-            )
-            rows = cursor.fetchall() or []
-            
-            if rows:
-                # Return random tip from cache
-                selected = random.choice(rows)
-                tip = selected["tip_message"]
-                logger.debug(f"[Cache] Returning cached tip: {tip}")
-                return tip
-            
+def _call_ollama_many(prompt: str, model: str, base_url: str, count: int = 5, max_lines: int = 1) -> list[str]:
+    """Ollama 후보 count개를 OLLAMA_PARALLELISM개씩 동시에 요청.
+
+    OLLAMA_DEADLINE_SECONDS 안에 끝난 후보만 반환 (일부만 받아도 그대로 사용).
+    각 요청의 제한 시간도 남은 마감 시간으로 줄여, 마감 후 스레드가 오래 남지 않게 한다.
+    """
+    deadline = time.monotonic() + OLLAMA_DEADLINE_SECONDS
+
+    def _one() -> Optional[str]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
             return None
+        return _call_ollama(prompt, model, base_url, timeout=remaining, max_lines=max_lines)
+
+    results: list[str] = []
+    executor = ThreadPoolExecutor(max_workers=min(OLLAMA_PARALLELISM, count), thread_name_prefix="ollama")
+    try:
+        pending = {executor.submit(_one) for _ in range(count)}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                text = future.result()
+                if text:
+                    results.append(text)
+        if pending:
+            logger.warning(f"[Ollama] Deadline {OLLAMA_DEADLINE_SECONDS}s reached: {len(results)}/{count} candidates")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    logger.debug(f"[Ollama] Total responses received: {len(results)}")
+    return results
+
+
+def _context_room_ids(status_context: dict) -> list[int]:
+    """status_context에 들어 있는 세탁실 ID (세탁실 요약 순서)."""
+    return [int(r["room_id"]) for r in status_context.get("rooms") or [] if r.get("room_id") is not None]
+
+
+def _rooms_fresh(room_ids: list[int]) -> bool:
+    """모든 세탁실 TIP이 TTL 안에 생성되었는지 (세탁실이 없으면 False)."""
+    oldest = int(time.time()) - CACHE_DURATION_SECONDS
+    return bool(room_ids) and all(tip_pool.fetched_at(r) >= oldest for r in room_ids)
+
+
+def _fetch_cached_tip(room_id: Optional[int] = None, force_check: bool = False) -> Optional[str]:
+    """Return a random cached tip for the room if available and not expired (in-memory tip pool)."""
+    try:
+        tip_pool.refresh(force=force_check)
     except Exception as exc:
         logger.warning(f"Cache fetch failed: {exc}")
-        return None
+    tip = tip_pool.random_tip(room_id, max_age_seconds=CACHE_DURATION_SECONDS)
+    if tip:
+        logger.debug(f"[Cache] Returning cached tip (room {room_id}): {tip}")
+    return tip
 
 
-def get_tip_from_cache_no_ttl() -> Optional[str]:
-    """Fetch a random cached tip from DB without TTL filtering.
+def get_tip_from_cache_no_ttl(room_id: Optional[int] = None) -> Optional[str]:
+    """Return a random cached tip for the room without TTL filtering (in-memory tip pool).
 
     Used by the /tip endpoint so that user requests never trigger new AI calls
     as long as there is at least one cached tip available.
+    room_id=None picks from every room.
     """
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT tip_message FROM ai_tip_cache")
-            rows = cursor.fetchall() or []
-
-            if not rows:
-                return None
-
-            selected = random.choice(rows)
-            tip = selected.get("tip_message")
-            if tip:
-                logger.debug(f"[Cache] Returning cached tip (no TTL): {tip}")
-            return tip
+        tip_pool.refresh()
     except Exception as exc:
         logger.warning(f"Cache (no TTL) fetch failed: {exc}")
-        return None
+    tip = tip_pool.random_tip(room_id)
+    if tip:
+        logger.debug(f"[Cache] Returning cached tip (no TTL, room {room_id}): {tip}")
+    return tip
 
 
-def _store_tips_to_cache(tips: list[str]) -> None:
-    """Store multiple tips to cache, clearing old ones."""
+def _store_tips_to_cache(tips_by_room: dict[int, list[str]]) -> None:
+    """Store tips per room, replacing each room's old ones (single multi-row INSERT)."""
     try:
-        now_ts = int(time.time())
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Clear old cache
-            cursor.execute("DELETE FROM ai_tip_cache")
-            
-            # Insert new tips
-            for tip in tips:
-                cursor.execute(
-                    "INSERT INTO ai_tip_cache (tip_message, fetched_at) VALUES (%s, %s)",
-                    (tip, now_ts)
-                )
-            
-            conn.commit()
-            logger.debug(f"[Cache] Stored {len(tips)} tips to cache")
+        tip_pool.store(tips_by_room)
+        logger.debug(f"[Cache] Stored {sum(len(t) for t in tips_by_room.values())} tips for {len(tips_by_room)} rooms")
     except Exception as exc:
         logger.error(f"Cache store failed: {exc}")
 
 
-def _build_status_context_for_room1() -> dict:
-    """Build minimal status_context dict for room_id=1 using DB + cached weather.
+def _build_status_context_for_rooms() -> dict:
+    """Build status_context for every room using DB + cached weather/congestion.
 
     This is used for background AI tip refresh so that heavy AI calls depend
     only on /update and not on user-facing endpoints like /tip.
+    Room summaries come from the forecast query (one query for all rooms).
     """
     now_dt = datetime.now(tz=KST)
     now_ts = int(time.time())
@@ -422,203 +403,260 @@ def _build_status_context_for_room1() -> dict:
     # Weather from DB cache only
     weather_context = get_kma_weather_from_cache_only(now_dt)
 
-    room_summary = {
-        "room_id": 1,
-        "room_name": "",
-        "machines_total": 0,
-        "machines_busy": 0,
-        "machines_idle": 0,
-        "avg_remaining_minutes": None,
-        "max_remaining_minutes": None,
-        "reservation_count": 0,
-        "notify_count": 0,
-        "estimated_wait_minutes": None,
-    }
-
-    recent_finished_count = 0
-    active_notify_subscriptions = 0
+    forecasts: list[dict] = []
+    try:
+        forecasts = build_forecasts(now_dt=now_dt)
+    except Exception as exc:
+        logger.warning(f"Forecast failed for rooms: {exc}")
+
+    rooms = [
+        {
+            "room_id": fc["room_id"],
+            "room_name": fc["room_name"],
+            "machines_total": fc["machines_total"],
+            "machines_busy": fc["machines_busy"],
+            "machines_idle": max(fc["machines_total"] - fc["machines_busy"], 0),
+            "reservation_count": fc["reservation_count"],
+            "estimated_wait_minutes": fc["slots"][0]["predicted_wait_minutes"] if fc["slots"] else None,
+        }
+        for fc in forecasts
+    ]
 
     # 기본 혼잡도 통계 (모두 0)
     days = ["월", "화", "수", "목", "금", "토", "일"]
     congestion_stats = {d: [0] * 24 for d in days}
+    recent_finished_count = 0
 
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor(dictionary=True)
-
-            # Machines in room 1
-            cursor.execute(
-                """
-                SELECT m.status,
-                       COALESCE(rt.room_name, m.room_name) AS room_name
-                FROM machine_table m
-                LEFT JOIN room_table rt ON m.room_id = rt.room_id
-                WHERE m.room_id = %s
-                """,
-                (1,),
-            )
-            machines = cursor.fetchall() or []
-
-            total = len(machines)
-            busy_statuses = {"WASHING", "SPINNING", "DRYING"}
-            busy = 0
-            room_name = ""
-
-            for m in machines:
-                status = (m.get("status") or "").upper()
-                if not room_name:
-                    room_name = m.get("room_name") or ""
-                if status in busy_statuses:
-                    busy += 1
-
-            idle = max(total - busy, 0)
-
-            room_summary["room_name"] = room_name
-            room_summary["machines_total"] = total
-            room_summary["machines_busy"] = busy
-            room_summary["machines_idle"] = idle
-
-            # Reservation count for room 1
-            cursor.execute(
-                "SELECT COUNT(*) AS cnt FROM reservation_table WHERE room_id = %s AND isreserved = 1",
-                (1,),
-            )
-            row = cursor.fetchone()
-            reservation_count = int(row.get("cnt") or 0) if row else 0
-            room_summary["reservation_count"] = reservation_count
-
-            # Notify subscription count for room 1
-            cursor.execute(
-                """
-                SELECT COUNT(*) AS cnt
-                FROM notify_subscriptions ns
-                JOIN machine_table m ON ns.machine_uuid = m.machine_uuid
-                WHERE m.room_id = %s
-                """,
-                (1,),
-            )
-            row = cursor.fetchone()
-            notify_count = int(row.get("cnt") or 0) if row else 0
-            room_summary["notify_count"] = notify_count
-            active_notify_subscriptions = notify_count
-
             # Recent finished count in last 30 minutes
-            lookback_ts = now_ts - 1800
             cursor.execute(
-                """
-                SELECT COUNT(*) AS cnt
-                FROM machine_table
-                WHERE room_id = %s AND status = %s AND timestamp >= %s
-                """,
-                (1, "FINISHED", lookback_ts),
+                "SELECT COUNT(*) AS cnt FROM machine_table WHERE status = %s AND timestamp >= %s",
+                ("FINISHED", now_ts - 1800),
             )
             row = cursor.fetchone()
             recent_finished_count = int(row.get("cnt") or 0) if row else 0
+    except Exception as exc:
+        logger.warning(f"Recent finished count failed: {exc}")
 
-            # Congestion stats from busy_table
-            try:
-                cursor.execute("SELECT busy_day, busy_time, busy_count FROM busy_table")
-                rows = cursor.fetchall() or []
-
-                congestion_stats = {d: [0] * 24 for d in days}
-                for r in rows:
-                    day = str(r.get("busy_day") or "")
-                    hour = r.get("busy_time")
-                    count = r.get("busy_count")
-                    try:
-                        hour_int = int(hour)
-                    except Exception:
-                        continue
-                    if day in congestion_stats and 0 <= hour_int <= 23:
-                        congestion_stats[day][hour_int] = int(count or 0)
-            except Exception as exc:
-                logger.warning(f"Congestion stats fetch failed (AI): {exc}")
+    # Congestion stats from the in-memory busy_table matrix
+    try:
+        congestion_matrix.ensure_loaded()
+        congestion_stats = congestion_matrix.snapshot()
     except Exception as exc:
-        logger.warning(f"Status context fetch failed for room 1: {exc}")
+        logger.warning(f"Congestion stats fetch failed (AI): {exc}")
 
     totals = {
-        "machines_total": room_summary["machines_total"],
-        "machines_busy": room_summary["machines_busy"],
-        "machines_idle": room_summary["machines_idle"],
-        "reservations_total": room_summary["reservation_count"],
-        "notify_total": room_summary["notify_count"],
-    }
-
-    alerts = {
-        "recent_finished_count": recent_finished_count,
-        "active_notify_subscriptions": active_notify_subscriptions,
+        "machines_total": sum(r["machines_total"] for r in rooms),
+        "machines_busy": sum(r["machines_busy"] for r in rooms),
+        "machines_idle": sum(r["machines_idle"] for r in rooms),
+        "reservations_total": sum(r["reservation_count"] for r in rooms),
     }
 
-    status_context = {
+    return {
         "time": time_context,
         "weather": weather_context,
         "totals": totals,
-        "rooms": [room_summary],
-        "alerts": alerts,
+        "rooms": rooms,
+        "alerts": {"recent_finished_count": recent_finished_count},
         "congestion_stats": congestion_stats,
+        "forecast": forecasts,
     }
 
-    return status_context
-
 
 async def refresh_ai_tip_if_needed() -> None:
-    """Background task to refresh AI tip cache when expired.
-
-    - Checks TTL using the same logic as _fetch_cached_tip (CACHE_DURATION_SECONDS).
-    - If expired, builds status_context for room 1 and calls generate_summary
-      in a worker thread so that heavy OpenRouter/Gemini calls do not block
-      the event loop.
-    - DB access remains synchronous inside the worker thread.
+    """Refresh AI tips for every room when any room's tips expired (called by refresh_scheduler).
+
+    - Checks TTL per room (CACHE_DURATION_SECONDS).
+    - If expired, builds status_context for all rooms and calls generate_summary
+      in worker threads so that DB reads and heavy OpenRouter/Gemini calls do
+      not block the event loop. All rooms are generated in one provider call.
+    - Freshness is checked against the in-memory tip pool; generate_summary
+      takes a cross-worker GET_LOCK so only one process calls the AI.
     """
     async with AI_REFRESH_LOCK:
         try:
-            cached = _fetch_cached_tip()
-            if cached:
-                logger.debug("[AI Refresh] Cache still fresh, skipping refresh")
+            status_context = await asyncio.to_thread(_build_status_context_for_rooms)
+            await asyncio.to_thread(tip_pool.refresh)
+            if _rooms_fresh(_context_room_ids(status_context)):
+                logger.debug("[AI Refresh] Cache still fresh for every room, skipping refresh")
                 return
-        except Exception as exc:
-            logger.warning(f"[AI Refresh] Cache check failed: {exc}")
-            return
-
-        status_context = _build_status_context_for_room1()
-
-        try:
             await asyncio.to_thread(generate_summary, status_context)
             logger.info("[AI Refresh] generate_summary completed")
         except Exception as exc:
             logger.warning(f"[AI Refresh] Background generate_summary failed: {exc}")
 
 
-def generate_summary(status_context: dict) -> Optional[str]:
-    """Generate one-line summary of laundry room status using configured AI provider.
+# 진행 중인 생성: 생성 대상 세탁실 집합 → (task, 생성을 시작한 요청의 room_id)
+_generation_tasks: dict[frozenset[int], tuple[asyncio.Task, Optional[int]]] = {}
+_deadline_stats = {"in_time": 0, "deadline_exceeded": 0, "joined": 0, "completed": 0, "failed": 0}
+
+
+def _on_generation_done(rooms: frozenset[int], task: asyncio.Task) -> None:
+    entry = _generation_tasks.get(rooms)
+    if entry is not None and entry[0] is task:
+        del _generation_tasks[rooms]
+    if task.cancelled() or task.exception() is not None:
+        _deadline_stats["failed"] += 1
+        if not task.cancelled():
+            logger.warning(f"[AI Deadline] Background generation failed: {task.exception()}")
+    else:
+        _deadline_stats["completed"] += 1
+
+
+def _running_generation(wanted: frozenset[int]) -> Optional[tuple[asyncio.Task, Optional[int]]]:
+    """wanted 세탁실을 모두 생성 중인 진행 중 task (없으면 None)."""
+    for rooms, entry in _generation_tasks.items():
+        if not entry[0].done() and wanted <= rooms:
+            return entry
+    return None
+
+
+async def generate_summary_within(status_context: dict, timeout: float, room_id: Optional[int] = None) -> Optional[str]:
+    """generate_summary를 최대 timeout초만 기다린다.
+
+    - 시간 안에 끝나면 room_id 세탁실 TIP 반환, 넘으면 None (생성은 백그라운드로 계속되어 캐시를 채움)
+    - 이 프로세스에서 요청한 세탁실까지 생성 중인 task가 있으면 새로 시작하지 않고 함께 기다림
+      (생성된 TIP은 세탁실별로 풀에 저장되므로, 끝난 뒤 풀에서 요청한 세탁실 TIP을 꺼낸다)
+    - 다른 요청이 시작한 생성의 반환값은 그 요청의 세탁실 TIP이므로 쓰지 않는다
+    """
+    rooms = frozenset(_context_room_ids(status_context))
+    entry = _running_generation(frozenset((room_id,)) if room_id is not None else rooms)
+    if entry is None:
+        task = asyncio.create_task(asyncio.to_thread(generate_summary, status_context, room_id))
+        entry = _generation_tasks[rooms] = (task, room_id)
+        task.add_done_callback(lambda t: _on_generation_done(rooms, t))
+    else:
+        _deadline_stats["joined"] += 1
+    task, owner_room_id = entry
+
+    try:
+        result = await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, timeout))
+    except asyncio.TimeoutError:
+        _deadline_stats["deadline_exceeded"] += 1
+        logger.info(f"[AI Deadline] Tip not ready within {timeout:.2f}s, continuing in background")
+        return None
+    _deadline_stats["in_time"] += 1
+    return tip_pool.random_tip(room_id) or (result if owner_room_id == room_id else None)
+
+
+def get_tip_deadline_stats() -> dict:
+    return {**_deadline_stats, "running": sum(1 for task, _ in _generation_tasks.values() if not task.done())}
+
+
+def _local_tips(status_context: dict) -> dict[int, str]:
+    """세탁실별 통계 예측 한 줄 추천 (LLM 미사용 시 그대로 사용, LLM 실패 시 폴백)."""
+    tips = {}
+    for fc in status_context.get("forecast") or []:
+        tip = forecast_tip_message([fc])
+        if tip:
+            tips[int(fc["room_id"])] = tip
+    return tips
+
+
+def _pick_tip(tips_by_room: dict[int, list[str]], room_id: Optional[int]) -> Optional[str]:
+    """room_id 세탁실 TIP 하나 (room_id가 None일 때만 아무 세탁실 TIP). 다른 세탁실 TIP은 돌려주지 않는다."""
+    if room_id is not None:
+        tips = tips_by_room.get(room_id)
+    else:
+        tips = [tip for room_tips in tips_by_room.values() for tip in room_tips]
+    return random.choice(tips) if tips else None
+
+
+def _parse_room_lines(texts: list[str], room_ids: list[int]) -> dict[int, list[str]]:
+    """배치 응답("세탁실ID|추천 문장" 줄들)을 세탁실별 TIP 목록으로. 모르는 ID/형식이 아닌 줄은 무시."""
+    known = set(room_ids)
+    tips: dict[int, list[str]] = {}
+    for text in texts:
+        for line in text.splitlines():
+            match = ROOM_LINE_RE.match(line)
+            if not match:
+                continue
+            room_id, tip = int(match.group(1)), match.group(2).strip()
+            if room_id in known and tip:
+                tips.setdefault(room_id, []).append(tip)
+    return tips
+
+
+def generate_summary(status_context: dict, room_id: Optional[int] = None) -> Optional[str]:
+    """Generate one-line laundry tips for every room in status_context using configured AI provider.
     
-    Uses 10-minute cache: returns random cached tip if available, otherwise generates 5+ new tips.
+    Returns a cached tip when every room's tips are fresh, otherwise generates 5 candidates
+    per room (one provider call for all rooms) and stores them per room.
+    
+    With AI_PROVIDER=local (or when the AI call fails) the deterministic forecast
+    tip for each room from status_context["forecast"] is used instead.
     
     Args:
-        status_context: Dict containing time, weather, rooms, totals, alerts, etc.
+        status_context: Dict containing time, weather, rooms, totals, alerts, forecast, etc.
+        room_id: Room whose tip is returned (default: first room in status_context).
     
     Returns:
         Generated summary string or None if generation fails.
     """
+    room_ids = _context_room_ids(status_context)
+    if room_id is None and room_ids:
+        room_id = room_ids[0]
+
     # Try cache first
-    cached = _fetch_cached_tip()
-    if cached:
-        return cached
-    
-    logger.info("[Cache] Cache expired or empty, generating new tips")
+    try:
+        tip_pool.refresh()
+    except Exception as exc:
+        logger.warning(f"Cache fetch failed: {exc}")
+    if _rooms_fresh(room_ids):
+        return tip_pool.random_tip(room_id)
+
+    # 여러 워커가 동시에 만료를 감지해도 AI 호출은 한 곳에서만
+    with tip_generation_lock() as acquired:
+        if not acquired:
+            logger.info("[Cache] Another worker is generating tips, serving existing tip")
+            return get_tip_from_cache_no_ttl(room_id) or _local_tips(status_context).get(room_id)
+
+        # 잠금을 기다리는 사이 다른 워커가 저장했을 수 있으므로 세대 재확인
+        cached = _fetch_cached_tip(room_id, force_check=True)
+        if cached and _rooms_fresh(room_ids):
+            return cached
+
+        return _generate_tips(status_context, room_ids, room_id)
+
+
+def _generate_tips(status_context: dict, room_ids: list[int], room_id: Optional[int]) -> Optional[str]:
+    """Call the configured AI provider once for all rooms, store the new tips per room and return one for room_id."""
+    logger.info(f"[Cache] Cache expired or empty, generating new tips for rooms {room_ids}")
     
     provider = os.getenv("AI_PROVIDER", "openrouter").lower()
     
-    if provider not in {"google", "ollama", "openrouter"}:
+    if provider not in {"google", "ollama", "openrouter", "local"}:
         logger.warning(
-            f"Invalid AI_PROVIDER: {provider}. Must be 'google', 'ollama', or 'openrouter'."
+            f"Invalid AI_PROVIDER: {provider}. Must be 'google', 'ollama', 'openrouter' or 'local'."
         )
         return None
-    
-    prompt = _build_prompt(status_context)
+
+    local_tips = _local_tips(status_context)
+    local_tip = local_tips.get(room_id) if room_id is not None else None
+    if provider == "local":
+        if local_tips:
+            _store_tips_to_cache({r: [tip] for r, tip in local_tips.items()})
+        return local_tip
+
+    # 양자화한 입력이 같았던 적이 있으면 그때 만든 TIP 재사용 (AI 호출 없음)
+    fingerprint = context_fingerprint(status_context, provider)
+    memo_tips = tip_memo.get(fingerprint)
+    if memo_tips:
+        logger.info(f"[Memo] Reusing tips for {len(memo_tips)} rooms, context {fingerprint}")
+        _store_tips_to_cache(memo_tips)
+        return _pick_tip(memo_tips, room_id)
+
+    # 세탁실이 여럿이면 한 번의 호출로 세탁실마다 한 줄씩 받는다 (비용은 세탁실 수와 무관하게 거의 일정)
+    batch = len(room_ids) > 1
+    max_lines = len(room_ids) if batch else 1
+    prompt = compile_batch_prompt(status_context) if batch else _build_prompt(status_context)
+    prompt_metrics.record(provider if not batch else f"{provider}:batch", prompt)
     logger.debug(f"AI prompt ({provider}):\n{prompt}")
     
     tips = []
+    started = time.perf_counter()
     
     if provider == "google":
         api_key = os.getenv("GEMINI_API_KEY")
@@ -626,19 +664,16 @@ def generate_summary(status_context: dict) -> Optional[str]:
         
         if not api_key:
             logger.warning("GEMINI_API_KEY not configured")
-            return None
+            return local_tip
         
-        tips = _call_google_gemini(prompt, model, api_key, count=5)
+        tips = _call_google_gemini(prompt, model, api_key, count=5, max_lines=max_lines)
 
     elif provider == "ollama":
         base_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
         model = os.getenv("OLLAMA_MODEL", "llama3.2:latest")
         
-        # Ollama: generate multiple times
-        for _ in range(5):
-            result = _call_ollama(prompt, model, base_url)
-            if result:
-                tips.append(result)
+        # Ollama: 후보별 요청을 동시에 보내고 마감까지 받은 것만 사용
+        tips = _call_ollama_many(prompt, model, base_url, count=5, max_lines=max_lines)
     
     elif provider == "openrouter":
         api_key = os.getenv("OPENROUTER_API_KEY")
@@ -647,12 +682,19 @@ def generate_summary(status_context: dict) -> Optional[str]:
 
         if not api_key:
             logger.warning("OPENROUTER_API_KEY not configured")
-            return None
-
-        tips = _call_openrouter_chat(prompt, model, api_key, base_url, count=5)
-    
-    if tips:
-        _store_tips_to_cache(tips)
-        return random.choice(tips)
+            return local_tip
+
+        tips = _call_openrouter_chat(prompt, model, api_key, base_url, count=5, max_lines=max_lines)
+
+    if batch:
+        tips_by_room = _parse_room_lines(tips, room_ids)
+    else:
+        tips_by_room = {room_ids[0]: tips} if tips and room_ids else {}
+    if tips_by_room:
+        tip_memo.put(fingerprint, tips_by_room, time.perf_counter() - started)
+        # 응답에서 빠진 세탁실은 통계 예측 문장으로 채움
+        stored = {**{r: [tip] for r, tip in local_tips.items()}, **tips_by_room}
+        _store_tips_to_cache(stored)
+        return _pick_tip(stored, room_id)
     
-    return None
+    return local_tip
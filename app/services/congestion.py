@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+from array import array
+from contextlib import suppress
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+from loguru import logger
+
+from app.database import get_db_connection
+from app.services.state_version import bump_version
+
+# 다른 워커/직접 DB 수정과의 차이를 맞추기 위한 전체 재적재 주기 (0이면 비활성화)
+CONGESTION_RELOAD_SECONDS = float(os.getenv("CONGESTION_RELOAD_SECONDS", "300"))
+# 최근 N주 슬라이딩 윈도우로 미리 집계해 둘 주 수 목록 (쉼표 구분, 예: "4,12")
+CONGESTION_WINDOW_WEEKS = tuple(sorted({
+    int(v) for v in os.getenv("CONGESTION_WINDOW_WEEKS", "4,12").split(",") if v.strip() and int(v) > 0
+}))
+# 지수 감쇠 반감기 (주). 1주 지날 때마다 기존 값에 0.5 ** (1 / 반감기)를 곱한다
+CONGESTION_DECAY_HALF_LIFE_WEEKS = float(os.getenv("CONGESTION_DECAY_HALF_LIFE_WEEKS", "4"))
+
+DAYS = ("월", "화", "수", "목", "금", "토", "일")
+HOURS = 24
+CELLS = len(DAYS) * HOURS
+_DAY_INDEX = {d: i for i, d in enumerate(DAYS)}
+
+KST = pytz.timezone("Asia/Seoul")
+
+_DECAY_PER_WEEK = 0.5 ** (1.0 / CONGESTION_DECAY_HALF_LIFE_WEEKS) if CONGESTION_DECAY_HALF_LIFE_WEEKS > 0 else 0.0
+# 메모리에 주 단위 버킷을 보관하는 기간: 가장 긴 윈도우, 그리고 감쇠 가중치가 0.001 미만이 되는 기간
+_RETENTION_WEEKS = max(
+    max(CONGESTION_WINDOW_WEEKS, default=1),
+    math.ceil(CONGESTION_DECAY_HALF_LIFE_WEEKS * 10),
+)
+
+# (주 인덱스, 요일 인덱스 0=월, 시간 0~23)
+Cell = Tuple[int, int, int]
+
+
+def week_index(day: date) -> int:
+    """월요일 시작 주 번호 (date.toordinal() 1 = 0001-01-01 월요일)."""
+    return (day.toordinal() - 1) // 7
+
+
+def week_start(week: int) -> date:
+    return date.fromordinal(week * 7 + 1)
+
+
+def current_week() -> int:
+    return week_index(datetime.now(KST).date())
+
+
+def parse_window(window: str) -> str:
+    """"all" | "decay" | "<N>w" (N은 CONGESTION_WINDOW_WEEKS 중 하나). 그 외는 ValueError."""
+    window = (window or "all").strip().lower()
+    if window in ("all", "decay"):
+        return window
+    if window.endswith("w") and window[:-1].isdigit() and int(window[:-1]) in CONGESTION_WINDOW_WEEKS:
+        return window
+    allowed = ", ".join(["all", "decay"] + [f"{n}w" for n in CONGESTION_WINDOW_WEEKS])
+    raise ValueError(f"window must be one of: {allowed}")
+
+
+def _zeros() -> array:
+    return array("i", bytes(4 * CELLS))
+
+
+def _to_json(values) -> bytes:
+    result = {day: list(values[i * HOURS:(i + 1) * HOURS]) for i, day in enumerate(DAYS)}
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CongestionMatrix:
+    """busy_table(요일 × 시간 사용 횟수)의 인메모리 사본.
+
+    - 7×24 int32 배열 하나로 보관 (array('i'), 168칸)
+    - 기동 시 한 번 적재하고, /update FINISHED가 busy_table upsert 커밋 후 같은 칸을 +1
+    - /statistics/congestion 응답 JSON을 미리 직렬화해 두고 값이 바뀔 때만 다시 만든다
+    - 재적재 중(SELECT ~ 교체 사이)에 들어온 증가분은 기록해 두었다가 교체 직전에 새 배열에 다시 더한다
+    """
+
+    def __init__(self):
+        self._counts = _zeros()
+        self._json: Optional[bytes] = None
+        self._lock = threading.Lock()
+        # 재적재 중에 들어온 증가분 (칸 목록). 교체 직전에 새 배열에 다시 적용한다
+        self._journal: Optional[List[List[Cell]]] = None
+        self.loaded = False
+        self._stats = {"reloads": 0, "increments": 0, "serializations": 0, "replayed": 0}
+
+    def load(self) -> None:
+        """busy_table을 다시 읽어 배열을 교체.
+
+        increment는 busy_table 커밋 후에 호출되므로 SELECT 이후 커밋된 증가분은 스냅샷에 없다.
+        읽는 동안 들어온 증가분을 새 배열에 다시 더해 재적재로 사라지지 않게 한다.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SELECT busy_day, busy_time, busy_count FROM busy_table")
+                rows = cursor.fetchall() or []
+
+            counts = _zeros()
+            for row in rows:
+                day = _DAY_INDEX.get(str(row.get("busy_day") or ""))
+                try:
+                    hour = int(row.get("busy_time"))
+                except Exception:
+                    continue
+                if day is not None and 0 <= hour < HOURS:
+                    counts[day * HOURS + hour] = int(row.get("busy_count") or 0)
+
+            with self._lock:
+                journal = self._journal or []
+                for cells in journal:
+                    for _week, day, hour in cells:
+                        counts[day * HOURS + hour] += 1
+                changed = counts != self._counts
+                self._counts = counts
+                if changed:
+                    self._json = None
+                self.loaded = True
+                self._stats["reloads"] += 1
+                self._stats["replayed"] += len(journal)
+        finally:
+            with self._lock:
+                self._journal = None
+        if changed:
+            bump_version("congestion", "reload")
+        logger.info(f"📊 혼잡도 행렬 적재: busy_table {len(rows)}행, replayed={len(journal)}")
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+
+    def increment(self, cells: Iterable[Cell]) -> None:
+        """커밋된 busy_table upsert와 같은 칸들을 +1."""
+        cells = list(cells)
+        with self._lock:
+            for _week, day, hour in cells:
+                self._counts[day * HOURS + hour] += 1
+                self._stats["increments"] += 1
+            self._json = None
+            if self._journal is not None:
+                self._journal.append(cells)
+
+    def snapshot(self, hour_from: int = 0, hour_to: int = HOURS - 1) -> Dict[str, List[int]]:
+        """요일 → 24길이 리스트. 범위 밖 시간은 0으로 채운다."""
+        with self._lock:
+            counts = self._counts
+            result = {}
+            for i, day in enumerate(DAYS):
+                row = counts[i * HOURS:(i + 1) * HOURS].tolist()
+                if hour_from > 0 or hour_to < HOURS - 1:
+                    row = [v if hour_from <= h <= hour_to else 0 for h, v in enumerate(row)]
+                result[day] = row
+            return result
+
+    def to_json(self) -> bytes:
+        """/statistics/congestion 응답 본문 (변경 전까지 재사용)."""
+        with self._lock:
+            if self._json is None:
+                self._json = _to_json(self._counts)
+                self._stats["serializations"] += 1
+            return self._json
+
+    def relative(self) -> Optional[List[float]]:
+        """칸별 값 / 최댓값 (0~1). 전부 0이면 None."""
+        with self._lock:
+            peak = max(self._counts)
+            return [v / peak for v in self._counts] if peak > 0 else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": self.loaded,
+                "total": sum(self._counts),
+            }
+
+
+congestion_matrix = CongestionMatrix()
+
+
+class _RoomAggregate:
+    """세탁실 하나의 주 단위 버킷과 미리 계산된 집계(전체/최근 N주/지수 감쇠)."""
+
+    __slots__ = ("week", "buckets", "total", "windows", "decayed", "json")
+
+    def __init__(self, week: int):
+        self.week = week
+        self.buckets: Dict[int, array] = {}
+        self.total = _zeros()
+        self.windows: Dict[int, array] = {n: _zeros() for n in CONGESTION_WINDOW_WEEKS}
+        self.decayed = array("d", bytes(8 * CELLS))
+        self.json: Dict[str, bytes] = {}
+
+    def advance(self, week: int) -> None:
+        """현재 주를 week로 이동: 윈도우에서 빠지는 버킷을 빼고 감쇠를 곱한다."""
+        if week <= self.week:
+            return
+        if week - self.week > _RETENTION_WEEKS:
+            # 오래 비어 있던 세탁실: 남아 있는 버킷이 없으므로 초기화
+            self.week = week
+            self.buckets.clear()
+            self.windows = {n: _zeros() for n in CONGESTION_WINDOW_WEEKS}
+            self.decayed = array("d", bytes(8 * CELLS))
+        while self.week < week:
+            self.week += 1
+            for n, agg in self.windows.items():
+                expired = self.buckets.get(self.week - n)
+                if expired is not None:
+                    for i, v in enumerate(expired):
+                        if v:
+                            agg[i] -= v
+            decayed = self.decayed
+            for i in range(CELLS):
+                decayed[i] *= _DECAY_PER_WEEK
+        for old_week in [w for w in self.buckets if w <= self.week - _RETENTION_WEEKS]:
+            del self.buckets[old_week]
+        self.json.clear()
+
+    def add(self, week: int, idx: int, count: int = 1, with_total: bool = True) -> None:
+        age = self.week - week
+        if age < 0:
+            return
+        if age < _RETENTION_WEEKS:
+            bucket = self.buckets.get(week)
+            if bucket is None:
+                bucket = self.buckets[week] = _zeros()
+            bucket[idx] += count
+            self.decayed[idx] += count * _DECAY_PER_WEEK ** age
+            for n, agg in self.windows.items():
+                if age < n:
+                    agg[idx] += count
+        if with_total:
+            self.total[idx] += count
+        self.json.clear()
+
+    def to_json(self, window: str) -> bytes:
+        blob = self.json.get(window)
+        if blob is None:
+            if window == "all":
+                values = self.total
+            elif window == "decay":
+                values = [round(v, 2) for v in self.decayed]
+            else:
+                values = self.windows[int(window[:-1])]
+            blob = self.json[window] = _to_json(values)
+        return blob
+
+
+class WeeklyCongestion:
+    """세탁실별 주 단위 혼잡도 (congestion_weekly_table의 인메모리 집계).
+
+    - 세탁실마다 (주, 요일, 시간) 버킷을 보관하고 전체 누적 / 최근 N주 / 지수 감쇠 집계를
+      증가분으로 유지한다. 주가 바뀔 때만 빠지는 버킷을 빼고 감쇠를 곱한다.
+    - room_id=None 파티션은 전체 세탁실 합계
+    - 조회는 (세탁실, 윈도우)별로 캐시된 JSON을 돌려주므로 요청 수와 무관하게 상수 시간
+    - 재적재 중(SELECT ~ 교체 사이)에 들어온 증가분은 기록해 두었다가 교체 직전에 새 집계에 다시 더한다
+    """
+
+    def __init__(self):
+        self._rooms: Dict[Optional[int], _RoomAggregate] = {}
+        self._lock = threading.Lock()
+        # 재적재 중에 들어온 증가분 (세탁실, 칸 목록). 교체 직전에 새 집계에 다시 적용한다
+        self._journal: Optional[List[Tuple[int, List[Cell]]]] = None
+        self.loaded = False
+        self._stats = {"reloads": 0, "increments": 0, "serializations": 0, "replayed": 0}
+
+    @staticmethod
+    def _add_cells(rooms: Dict[Optional[int], _RoomAggregate], room_key: int, week: int, cells: List[Cell]) -> None:
+        """세탁실과 전체(None) 파티션에 칸들을 +1 (없는 파티션은 만들고, 있으면 week로 이동)."""
+        targets = []
+        for key in (room_key, None):
+            agg = rooms.get(key)
+            if agg is None:
+                agg = rooms[key] = _RoomAggregate(week)
+            else:
+                agg.advance(week)
+            targets.append(agg)
+        for cell_week, day, hour in cells:
+            for agg in targets:
+                agg.add(cell_week, day * HOURS + hour)
+
+    def load(self) -> None:
+        """congestion_weekly_table을 다시 읽어 세탁실별 집계를 교체.
+
+        CongestionMatrix.load와 같이 읽는 동안 들어온 증가분을 새 집계에 다시 더한 뒤 교체하고,
+        캐시된 응답/ETag가 새 값으로 바뀌도록 congestion 버전을 올린다.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            rooms, recent = self._read()
+            with self._lock:
+                journal = self._journal or []
+                week = current_week()
+                for room_key, cells in journal:
+                    self._add_cells(rooms, room_key, week, cells)
+                self._rooms = rooms
+                self.loaded = True
+                self._stats["reloads"] += 1
+                self._stats["replayed"] += len(journal)
+        finally:
+            with self._lock:
+                self._journal = None
+        bump_version("congestion", "weekly reload")
+        logger.info(
+            f"📊 세탁실별 혼잡도 적재: {len(rooms) - (None in rooms)}개 세탁실, 최근 {recent}행, replayed={len(journal)}"
+        )
+
+    def _read(self) -> Tuple[Dict[Optional[int], _RoomAggregate], int]:
+        """DB에서 새 집계를 만든다 (락 밖에서 호출). (세탁실별 집계, 최근 행 수)."""
+        week = current_week()
+        since = week_start(week - _RETENTION_WEEKS + 1)
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT room_id, busy_day, busy_time, SUM(busy_count) AS cnt
+                FROM congestion_weekly_table
+                GROUP BY room_id, busy_day, busy_time
+                """
+            )
+            totals = cursor.fetchall() or []
+            cursor.execute(
+                """
+                SELECT room_id, week_start, busy_day, busy_time, busy_count
+                FROM congestion_weekly_table
+                WHERE week_start >= %s
+                """,
+                (since,),
+            )
+            recent = cursor.fetchall() or []
+
+        rooms: Dict[Optional[int], _RoomAggregate] = {}
+
+        def _agg(room_id):
+            if room_id not in rooms:
+                rooms[room_id] = _RoomAggregate(week)
+            return rooms[room_id]
+
+        for row in totals:
+            idx = int(row["busy_day"]) * HOURS + int(row["busy_time"])
+            cnt = int(row.get("cnt") or 0)
+            for key in (int(row["room_id"]), None):
+                _agg(key).total[idx] += cnt
+        for row in recent:
+            idx = int(row["busy_day"]) * HOURS + int(row["busy_time"])
+            row_week = week_index(row["week_start"])
+            cnt = int(row.get("busy_count") or 0)
+            for key in (int(row["room_id"]), None):
+                _agg(key).add(row_week, idx, cnt, with_total=False)
+        return rooms, len(recent)
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+
+    def increment(self, room_id: Optional[int], cells: Iterable[Cell]) -> None:
+        week = current_week()
+        room_key = int(room_id) if room_id is not None else 0
+        cells = list(cells)
+        with self._lock:
+            self._add_cells(self._rooms, room_key, week, cells)
+            self._stats["increments"] += len(cells)
+            if self._journal is not None:
+                self._journal.append((room_key, cells))
+
+    def to_json(self, room_id: Optional[int], window: str) -> bytes:
+        week = current_week()
+        with self._lock:
+            agg = self._rooms.get(room_id)
+            if agg is None:
+                return _to_json(_zeros())
+            agg.advance(week)
+            cached = window in agg.json
+            blob = agg.to_json(window)
+            if not cached:
+                self._stats["serializations"] += 1
+            return blob
+
+    def weekly_rates(self, room_id: Optional[int]) -> Optional[List[float]]:
+        """칸별 주당 평균 사용 대수 (가장 짧은 윈도우, 윈도우가 없으면 감쇠 가중 평균). 데이터가 없으면 None."""
+        week = current_week()
+        with self._lock:
+            agg = self._rooms.get(room_id)
+            if agg is None:
+                return None
+            agg.advance(week)
+            if CONGESTION_WINDOW_WEEKS:
+                n = CONGESTION_WINDOW_WEEKS[0]
+                values = agg.windows[n]
+                return [v / n for v in values] if any(values) else None
+            weight = sum(_DECAY_PER_WEEK ** k for k in range(_RETENTION_WEEKS)) or 1.0
+            return [v / weight for v in agg.decayed] if any(agg.decayed) else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": self.loaded,
+                "rooms": len([k for k in self._rooms if k is not None]),
+                "buckets": sum(len(a.buckets) for k, a in self._rooms.items() if k is not None),
+            }
+
+
+weekly_congestion = WeeklyCongestion()
+
+
+def record_congestion(room_id: Optional[int], cells: Iterable[Cell]) -> None:
+    """커밋된 busy_table / congestion_weekly_table 증가분을 두 인메모리 집계에 반영."""
+    cells = list(cells)
+    congestion_matrix.increment(cells)
+    weekly_congestion.increment(room_id, cells)
+
+
+def congestion_json(room_id: Optional[int], window: str) -> bytes:
+    """/statistics/congestion 응답 본문.
+
+    room_id 없이 window=all이면 기존 busy_table 전체 누적(세탁실 구분 이전 데이터 포함),
+    그 외에는 세탁실별 주 단위 집계에서 응답한다.
+    """
+    if room_id is None and window == "all":
+        return congestion_matrix.to_json()
+    return weekly_congestion.to_json(room_id, window)
+
+
+def load_congestion() -> None:
+    congestion_matrix.load()
+    weekly_congestion.load()
+
+
+def ensure_congestion_loaded() -> None:
+    congestion_matrix.ensure_loaded()
+    weekly_congestion.ensure_loaded()
+
+_reload_task: asyncio.Task | None = None
+
+
+async def _reload_loop():
+    try:
+        while True:
+            await asyncio.sleep(CONGESTION_RELOAD_SECONDS)
+            try:
+                await asyncio.to_thread(load_congestion)
+            except Exception:
+                logger.exception("congestion_matrix: reload failed")
+    except asyncio.CancelledError:
+        raise
+
+
+async def start_congestion_matrix():
+    """기동 시 두 집계 적재 + 주기적 재적재 시작. 적재 실패 시 첫 조회 때 다시 시도."""
+    global _reload_task
+    try:
+        await asyncio.to_thread(load_congestion)
+    except Exception as e:
+        logger.error(f"❌ 혼잡도 행렬 적재 실패 (첫 조회 시 재시도): {e}")
+    if CONGESTION_RELOAD_SECONDS > 0 and (_reload_task is None or _reload_task.done()):
+        _reload_task = asyncio.create_task(_reload_loop())
+
+
+async def stop_congestion_matrix():
+    global _reload_task
+    if not _reload_task:
+        return
+    _reload_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await _reload_task
+    _reload_task = None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from loguru import logger
+
+from app.database import get_db_connection
+
+CYCLE_QUERY_MAX_LIMIT = 1000
+
+
+def _positive_seconds(start: Optional[int], end: Optional[int]) -> Optional[int]:
+    if start is None or end is None:
+        return None
+    seconds = int(end) - int(start)
+    return seconds if seconds > 0 else None
+
+
+def record_cycle(
+    cursor,
+    *,
+    machine_id: int,
+    machine_uuid: Optional[int],
+    room_id: Optional[int],
+    machine_type: Optional[str],
+    course_name: Optional[str],
+    started_at: Optional[int],
+    spinning_at: Optional[int],
+    finished_at: Optional[int],
+    wash_avg_magnitude: Optional[float] = None,
+    wash_max_magnitude: Optional[float] = None,
+    spin_max_magnitude: Optional[float] = None,
+) -> bool:
+    """완료된 사이클 1건을 wash_cycle_table에 기록 (FINISHED 트랜잭션 안에서 호출).
+
+    (machine_id, started_at) 유니크 키로 같은 사이클의 FINISHED가 반복 수신되어도 한 번만 기록.
+    시작 시각(first_update)이 없으면 사이클 경계를 알 수 없으므로 기록하지 않는다.
+    """
+    if started_at is None or finished_at is None:
+        logger.warning(f"사이클 기록 스킵: machine_id={machine_id}, started_at={started_at}, finished_at={finished_at}")
+        return False
+
+    # 탈수 시작 시각이 이번 사이클 범위 밖이면 (이전 사이클 값) 무시
+    if spinning_at is not None and not (int(started_at) <= int(spinning_at) <= int(finished_at)):
+        spinning_at = None
+
+    cursor.execute(
+        """
+        INSERT IGNORE INTO wash_cycle_table
+            (machine_id, machine_uuid, room_id, machine_type, course_name,
+             started_at, spinning_at, finished_at,
+             washing_seconds, spinning_seconds, total_seconds,
+             wash_avg_magnitude, wash_max_magnitude, spin_max_magnitude)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        (
+            machine_id, machine_uuid, room_id, machine_type or "washer", course_name,
+            int(started_at), int(spinning_at) if spinning_at is not None else None, int(finished_at),
+            _positive_seconds(started_at, spinning_at),
+            _positive_seconds(spinning_at, finished_at),
+            _positive_seconds(started_at, finished_at),
+            wash_avg_magnitude, wash_max_magnitude, spin_max_magnitude,
+        ),
+    )
+    inserted = cursor.rowcount == 1
+    if inserted:
+        logger.info(f"사이클 기록 완료: machine_id={machine_id}, started_at={started_at}, finished_at={finished_at}")
+    else:
+        logger.info(f"사이클 중복 기록 스킵: machine_id={machine_id}, started_at={started_at}")
+    return inserted
+
+
+def fetch_cycles(
+    room_id: Optional[int] = None,
+    machine_id: Optional[int] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """finished_at 기준 최신순 사이클 목록 (room/machine + 시간 범위 인덱스 사용)."""
+    clauses = []
+    params: list = []
+    if room_id is not None:
+        clauses.append("room_id = %s")
+        params.append(room_id)
+    if machine_id is not None:
+        clauses.append("machine_id = %s")
+        params.append(machine_id)
+    if since is not None:
+        clauses.append("finished_at >= %s")
+        params.append(since)
+    if until is not None:
+        clauses.append("finished_at < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(max(1, min(int(limit), CYCLE_QUERY_MAX_LIMIT)))
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"""
+            SELECT cycle_id, machine_id, room_id, machine_type, course_name,
+                   started_at, spinning_at, finished_at,
+                   washing_seconds, spinning_seconds, total_seconds,
+                   wash_avg_magnitude, wash_max_magnitude, spin_max_magnitude
+            FROM wash_cycle_table
+            {where}
+            ORDER BY finished_at DESC
+            LIMIT %s
+            """,
+            tuple(params),
+        )
+        return cursor.fetchall() or []
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.database import get_db_connection
+
+# 키(코스/세탁기 × 구간)별로 보관하는 최근 완료 사이클 수
+DURATION_SAMPLE_SIZE = int(os.getenv("DURATION_SAMPLE_SIZE", "200"))
+# 이 개수 이상 쌓여야 추정값으로 사용 (그 전에는 고정값/time_table 사용)
+DURATION_MIN_SAMPLES = int(os.getenv("DURATION_MIN_SAMPLES", "5"))
+# DB 저장 주기 (초)
+DURATION_MODEL_FLUSH_SECONDS = float(os.getenv("DURATION_MODEL_FLUSH_SECONDS", "60"))
+# 이상치 필터링: 현재 중앙값의 ±50% 범위만 수락
+DURATION_OUTLIER_RATIO = 0.5
+# 물리적으로 불가능한 값 제외 (분)
+DURATION_MAX_MINUTES = 300
+
+SEGMENTS = ("washing", "spinning", "total")
+
+# (scope, scope_key, segment) — scope는 "course" 또는 "machine"
+# machine의 scope_key는 "machine_id:코스명" (코스를 모르는 표본만 "machine_id")
+_Key = Tuple[str, str, str]
+
+
+def _machine_key(machine_id: int, course_name: Optional[str], segment: str) -> _Key:
+    """세탁기 표본 키. 코스마다 소요 시간이 다르므로 코스별로 나눈다."""
+    scope_key = f"{int(machine_id)}:{course_name}" if course_name else str(int(machine_id))
+    return ("machine", scope_key, segment)
+
+
+class _Samples:
+    __slots__ = ("values", "quantiles", "rejected")
+
+    def __init__(self, values=()):
+        self.values: Deque[int] = deque(values, maxlen=DURATION_SAMPLE_SIZE)
+        self.quantiles: Optional[Tuple[int, int]] = None
+        self.rejected = 0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        n = len(self.values)
+        if n < DURATION_MIN_SAMPLES:
+            self.quantiles = None
+            return
+        ordered = sorted(self.values)
+        self.quantiles = (ordered[round(0.5 * (n - 1))], ordered[round(0.9 * (n - 1))])
+
+    def add(self, minutes: int) -> bool:
+        if self.quantiles is not None:
+            median = self.quantiles[0]
+            if abs(minutes - median) > median * DURATION_OUTLIER_RATIO:
+                self.rejected += 1
+                return False
+        self.values.append(minutes)
+        self._refresh()
+        return True
+
+
+class DurationModel:
+    """완료된 사이클의 세탁/탈수/전체 소요 시간을 학습하는 온라인 모델.
+
+    - 코스별, 세탁기별로 최근 DURATION_SAMPLE_SIZE개 표본을 보관
+    - 표본이 들어올 때마다 중앙값/p90을 미리 계산해 두므로 조회는 dict 접근만 한다
+    - 세탁기×코스 표본이 충분하면 그 값을, 아니면 코스 값을 사용 (코스를 모를 때만 세탁기 전체 값)
+    - 변경된 키만 주기적으로 duration_model_table에 저장, 기동 시 복원
+    """
+
+    def __init__(self):
+        self._samples: Dict[_Key, _Samples] = {}
+        self._dirty: set[_Key] = set()
+        self._lock = threading.Lock()
+        self._stats = {"observed": 0, "rejected": 0, "flushed": 0}
+
+    def observe(self, machine_id: Optional[int], course_name: Optional[str], segment: str, minutes: int) -> None:
+        """완료 사이클 한 구간의 소요 시간(분) 기록."""
+        if segment not in SEGMENTS or minutes is None:
+            return
+        minutes = int(minutes)
+        if minutes <= 0 or minutes > DURATION_MAX_MINUTES:
+            logger.warning(f"duration_model: 범위 밖 값 무시 segment={segment} minutes={minutes}")
+            return
+
+        keys = []
+        if course_name:
+            keys.append(("course", str(course_name), segment))
+        if machine_id is not None:
+            keys.append(_machine_key(machine_id, course_name, segment))
+
+        with self._lock:
+            for key in keys:
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = _Samples()
+                if samples.add(minutes):
+                    self._stats["observed"] += 1
+                else:
+                    self._stats["rejected"] += 1
+                    logger.info(f"duration_model: 이상치 제외 {key} minutes={minutes} median={samples.quantiles[0]}")
+                self._dirty.add(key)
+
+    def lookup(self, machine_id: Optional[int], course_name: Optional[str], segment: str) -> Optional[Tuple[int, int]]:
+        """(중앙값, p90) 분 단위. 표본이 부족하면 None."""
+        samples = None
+        if machine_id is not None:
+            samples = self._samples.get(_machine_key(machine_id, course_name, segment))
+        if (samples is None or samples.quantiles is None) and course_name:
+            samples = self._samples.get(("course", str(course_name), segment))
+        return samples.quantiles if samples is not None else None
+
+    # ---------- 저장/복원 ----------
+
+    def load(self) -> None:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT scope, scope_key, segment, samples, rejected FROM duration_model_table")
+            rows = cursor.fetchall() or []
+
+        loaded: Dict[_Key, _Samples] = {}
+        for row in rows:
+            raw = row.get("samples")
+            if isinstance(raw, (bytes, bytearray)):
+                raw = raw.decode("utf-8")
+            values = json.loads(raw) if isinstance(raw, str) else (raw or [])
+            samples = _Samples(int(v) for v in values)
+            samples.rejected = int(row.get("rejected") or 0)
+            loaded[(row["scope"], row["scope_key"], row["segment"])] = samples
+
+        with self._lock:
+            self._samples = loaded
+            self._dirty.clear()
+        logger.info(f"📈 duration_model 복원: {len(loaded)}개 키")
+
+    def flush(self) -> int:
+        """변경된 키만 DB에 upsert. 저장한 키 수 반환."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty = self._dirty
+            self._dirty = set()
+            rows = [
+                (scope, scope_key, segment, json.dumps(list(self._samples[(scope, scope_key, segment)].values)),
+                 self._samples[(scope, scope_key, segment)].rejected)
+                for scope, scope_key, segment in dirty
+            ]
+
+        now_ts = int(time.time())
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO duration_model_table (scope, scope_key, segment, samples, rejected, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE samples = VALUES(samples), rejected = VALUES(rejected), updated_at = VALUES(updated_at)
+                    """,
+                    [row + (now_ts,) for row in rows],
+                )
+                conn.commit()
+        except Exception:
+            # 실패한 키는 다음 주기에 다시 저장
+            with self._lock:
+                self._dirty |= dirty
+            raise
+
+        with self._lock:
+            self._stats["flushed"] += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "keys": len(self._samples),
+                "ready_keys": sum(1 for s in self._samples.values() if s.quantiles is not None),
+                "dirty": len(self._dirty),
+            }
+
+
+duration_model = DurationModel()
+
+_flush_task: asyncio.Task | None = None
+
+
+async def _flush_loop():
+    try:
+        while True:
+            await asyncio.sleep(DURATION_MODEL_FLUSH_SECONDS)
+            try:
+                flushed = await asyncio.to_thread(duration_model.flush)
+                if flushed:
+                    logger.info(f"duration_model: {flushed}개 키 저장")
+            except Exception:
+                logger.exception("duration_model: flush failed")
+    except asyncio.CancelledError:
+        raise
+
+
+async def start_duration_model():
+    """기동 시 저장된 표본 복원 + 주기 저장 루프 시작."""
+    global _flush_task
+    try:
+        await asyncio.to_thread(duration_model.load)
+    except Exception as e:
+        logger.error(f"❌ duration_model 복원 실패 (빈 모델로 시작): {e}")
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_duration_model():
+    global _flush_task
+    if _flush_task:
+        _flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _flush_task
+        _flush_task = None
+    try:
+        await asyncio.to_thread(duration_model.flush)
+    except Exception as e:
+        logger.error(f"❌ duration_model 종료 저장 실패: {e}")
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pytz
+
+from app.database import get_db_connection
+from app.services.congestion import DAYS, HOURS, congestion_matrix, weekly_congestion
+from app.services.duration_model import duration_model
+from app.utils.timer import SPINNING_MINUTES, WASHING_MINUTES, TimerEstimator
+
+# 기본/최대 예측 구간 (시간)
+FORECAST_DEFAULT_HOURS = int(os.getenv("FORECAST_DEFAULT_HOURS", "12"))
+FORECAST_MAX_HOURS = int(os.getenv("FORECAST_MAX_HOURS", "48"))
+# 추천 대상 운영 시간 (시작 시각 기준, 양 끝 포함)
+FORECAST_OPEN_HOUR = int(os.getenv("FORECAST_OPEN_HOUR", "9"))
+FORECAST_CLOSE_HOUR = int(os.getenv("FORECAST_CLOSE_HOUR", "21"))
+# 학습된 소요 시간이 없을 때 세탁 1회 길이 (분)
+DEFAULT_CYCLE_MINUTES = WASHING_MINUTES + SPINNING_MINUTES
+
+KST = pytz.timezone("Asia/Seoul")
+BUSY_STATUSES = {"WASHING", "SPINNING", "DRYING"}
+
+
+def _nth_free_minute(remaining: Sequence[int], cycle_minutes: int, n: int) -> int:
+    """세탁기들이 remaining 분 뒤 비고 이후 cycle_minutes마다 다시 빈다고 볼 때 n번째(0부터) 빈 시점."""
+    heap = list(remaining)
+    heapq.heapify(heap)
+    free_at = 0
+    for _ in range(n + 1):
+        free_at = heapq.heappop(heap)
+        heapq.heappush(heap, free_at + cycle_minutes)
+    return free_at
+
+
+def forecast_room(room: dict, rates: Optional[Sequence[float]], now_dt: datetime, hours: int) -> dict:
+    """세탁실 하나의 다음 hours시간 예상 사용 대수/대기 시간과 추천 시간대 (DB 접근 없음).
+
+    room: room_id, room_name, total, remaining(사용 중 세탁기별 남은 분), reservations, cycle_minutes
+    rates: 7×24 칸별 예상 사용 대수 (과거 통계). None이면 현재 사용 중인 세탁기만 반영
+    """
+    total = room["total"]
+    remaining = sorted(room["remaining"])
+    queue = room["reservations"]
+    cycle = room["cycle_minutes"]
+
+    # 지금: 빈 세탁기가 예약 인원보다 많으면 대기 없음, 아니면 (예약 - 빈 대수)번째로 비는 시점
+    idle = total - len(remaining)
+    if total <= 0:
+        wait_now = None
+    elif idle > queue:
+        wait_now = 0
+    else:
+        wait_now = _nth_free_minute(remaining + [0] * idle, cycle, queue - idle)
+    slots = [{
+        "start": now_dt.isoformat(),
+        "weekday": DAYS[now_dt.weekday()],
+        "hour": now_dt.hour,
+        "expected_busy": float(len(remaining)),
+        "predicted_wait_minutes": wait_now,
+    }]
+
+    next_hour = now_dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    for k in range(hours):
+        slot_dt = next_hour + timedelta(hours=k)
+        offset = (slot_dt - now_dt).total_seconds() / 60
+        live_busy = sum(1 for r in remaining if r > offset)
+        hist_busy = min(total, rates[slot_dt.weekday() * HOURS + slot_dt.hour]) if rates is not None else 0.0
+        expected = float(max(live_busy, hist_busy))
+        # 현재 예약 대기열은 세탁 1회 길이에 걸쳐 소진된다고 본다
+        demand = expected + queue * math.exp(-offset / cycle)
+        if total <= 0:
+            wait = None
+        elif demand < total:
+            wait = 0
+        else:
+            wait = int(round(cycle * (demand - total + 1) / total))
+        slots.append({
+            "start": slot_dt.isoformat(),
+            "weekday": DAYS[slot_dt.weekday()],
+            "hour": slot_dt.hour,
+            "expected_busy": round(expected, 2),
+            "predicted_wait_minutes": wait,
+        })
+
+    candidates = [
+        (i, s) for i, s in enumerate(slots)
+        if s["predicted_wait_minutes"] is not None and FORECAST_OPEN_HOUR <= s["hour"] <= FORECAST_CLOSE_HOUR
+    ] or [(i, s) for i, s in enumerate(slots) if s["predicted_wait_minutes"] is not None]
+    recommended = min(candidates, key=lambda c: (c[1]["predicted_wait_minutes"], c[1]["expected_busy"], c[0]))[1] if candidates else None
+
+    return {
+        "room_id": room["room_id"],
+        "room_name": room["room_name"],
+        "machines_total": total,
+        "machines_busy": len(remaining),
+        "reservation_count": queue,
+        "cycle_minutes": cycle,
+        "slots": slots,
+        "recommended": recommended,
+    }
+
+
+def _room_rates(room_id: int, total: int) -> Optional[List[float]]:
+    """세탁실 주 단위 통계가 있으면 주당 평균 사용 대수, 없으면 전체 busy_table 비율 × 세탁기 수."""
+    rates = weekly_congestion.weekly_rates(room_id)
+    if rates is not None:
+        return rates
+    relative = congestion_matrix.relative()
+    return [v * total for v in relative] if relative is not None else None
+
+
+def fetch_room_states(room_ids: Optional[Iterable[int]] = None, user_id: Optional[int] = None, now_ts: Optional[int] = None) -> List[dict]:
+    """세탁실별 현재 상태(세탁기 수, 사용 중 세탁기별 남은 시간, 예약 수, 세탁 1회 길이). 쿼리 1회."""
+    now_ts = now_ts or int(time.time())
+    if room_ids is not None:
+        room_ids = [int(r) for r in room_ids]
+        if not room_ids:
+            return []
+        where = f"m.room_id IN ({','.join(['%s'] * len(room_ids))})"
+        params: tuple = tuple(room_ids)
+    elif user_id is not None:
+        where = "m.room_id IN (SELECT room_id FROM room_subscriptions WHERE user_id = %s)"
+        params = (user_id,)
+    else:
+        where = "m.room_id IS NOT NULL"
+        params = ()
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"""
+            SELECT m.machine_id,
+                   m.room_id,
+                   COALESCE(rt.room_name, m.room_name) AS room_name,
+                   m.status,
+                   m.machine_type,
+                   m.course_name,
+                   UNIX_TIMESTAMP(m.first_update) AS first_ts,
+                   UNIX_TIMESTAMP(m.updated_at) AS updated_ts,
+                   tt.avg_time,
+                   COALESCE(rr.cnt, 0) AS reservation_count
+            FROM machine_table m
+            LEFT JOIN room_table rt ON rt.room_id = m.room_id
+            LEFT JOIN (
+                SELECT course_name, MAX(avg_time) AS avg_time FROM time_table GROUP BY course_name
+            ) tt ON tt.course_name = m.course_name
+            LEFT JOIN (
+                SELECT room_id, COUNT(*) AS cnt FROM reservation_table WHERE isreserved = 1 GROUP BY room_id
+            ) rr ON rr.room_id = m.room_id
+            WHERE {where}
+            """,
+            params,
+        )
+        rows = cursor.fetchall() or []
+
+    course_avg = {r["course_name"]: int(r["avg_time"]) for r in rows if r.get("course_name") and r.get("avg_time") is not None}
+    estimates = TimerEstimator(course_avg, model=duration_model).estimate_rows(rows, now_ts)
+
+    rooms: Dict[int, dict] = {}
+    cycles: Dict[int, List[int]] = {}
+    for row, (timer, _avg, _elapsed, _p90) in zip(rows, estimates):
+        room_id = int(row["room_id"])
+        room = rooms.get(room_id)
+        if room is None:
+            room = rooms[room_id] = {
+                "room_id": room_id,
+                "room_name": row.get("room_name") or "",
+                "total": 0,
+                "remaining": [],
+                "reservations": int(row.get("reservation_count") or 0),
+            }
+            cycles[room_id] = []
+        room["total"] += 1
+
+        learned = duration_model.lookup(row.get("machine_id"), row.get("course_name"), "total")
+        if learned is not None:
+            cycles[room_id].append(learned[0])
+
+        status = (row.get("status") or "").upper()
+        if status in BUSY_STATUSES:
+            left = timer if timer is not None else DEFAULT_CYCLE_MINUTES // 2
+            if status == "WASHING" and row.get("machine_type") != "dryer":
+                # 세탁 구간 뒤 탈수 구간까지 남은 시간
+                spin = duration_model.lookup(row.get("machine_id"), row.get("course_name"), "spinning")
+                left += spin[0] if spin is not None else SPINNING_MINUTES
+            room["remaining"].append(int(left))
+
+    for room_id, room in rooms.items():
+        room["cycle_minutes"] = int(median(cycles[room_id])) if cycles[room_id] else DEFAULT_CYCLE_MINUTES
+    return list(rooms.values())
+
+
+def build_forecasts(
+    room_ids: Optional[Iterable[int]] = None,
+    user_id: Optional[int] = None,
+    hours: int = FORECAST_DEFAULT_HOURS,
+    now_dt: Optional[datetime] = None,
+) -> List[dict]:
+    """세탁실별 예측 목록 (DB 조회 1회 + 인메모리 계산)."""
+    now_dt = now_dt or datetime.now(KST)
+    hours = max(1, min(int(hours), FORECAST_MAX_HOURS))
+    rooms = fetch_room_states(room_ids, user_id, int(now_dt.timestamp()))
+    return [forecast_room(room, _room_rates(room["room_id"], room["total"]), now_dt, hours) for room in rooms]
+
+
+def _slot_label(slot: dict, now_dt: datetime) -> str:
+    slot_dt = datetime.fromisoformat(slot["start"])
+    days_ahead = (slot_dt.date() - now_dt.date()).days
+    day = "오늘" if days_ahead == 0 else "내일" if days_ahead == 1 else f"{slot['weekday']}요일"
+    hour = slot["hour"]
+    period = "오전" if hour < 12 else "오후"
+    hour_12 = hour if hour <= 12 else hour - 12
+    return f"{day} {period} {hour_12 or 12}시"
+
+
+def forecast_tip_message(forecasts: List[dict], now_dt: Optional[datetime] = None) -> Optional[str]:
+    """예측 결과로 만든 한 줄 추천 (LLM 없이 쓰는 TIP / AI 실패 시 폴백)."""
+    now_dt = now_dt or datetime.now(KST)
+    best = None
+    for fc in forecasts:
+        slot = fc.get("recommended")
+        if slot is None:
+            continue
+        key = (slot["predicted_wait_minutes"], slot["start"])
+        if best is None or key < best[0]:
+            best = (key, fc, slot)
+    if best is None:
+        return None
+
+    _, fc, slot = best
+    room = fc["room_name"] or "세탁실"
+    if slot["start"] == fc["slots"][0]["start"] and slot["predicted_wait_minutes"] == 0:
+        idle = fc["machines_total"] - fc["machines_busy"]
+        return f"지금 {room}에 빈 세탁기가 {idle}대 있어요! 바로 세탁하기 좋은 타이밍이에요 🧺"
+    wait = slot["predicted_wait_minutes"]
+    wait_text = "대기 없이" if wait == 0 else f"예상 대기 {wait}분으로"
+    return f"{_slot_label(slot, now_dt)}쯤이 {wait_text} 가장 한산할 것 같아요 ({room}) 🧺"
+
+
+def congestion_tip_message(congestion: Optional[dict], now_dt: Optional[datetime] = None) -> Optional[str]:
+    """혼잡도 통계만으로 만든 한 줄 추천: 다음 24시간 중 운영 시간 안에서 가장 한산한 시간대."""
+    if not congestion:
+        return None
+    now_dt = now_dt or datetime.now(KST)
+    next_hour = now_dt.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    best = None
+    for k in range(HOURS):
+        slot_dt = next_hour + timedelta(hours=k)
+        if not FORECAST_OPEN_HOUR <= slot_dt.hour <= FORECAST_CLOSE_HOUR:
+            continue
+        hours = congestion.get(DAYS[slot_dt.weekday()])
+        if not isinstance(hours, list) or len(hours) != HOURS:
+            continue
+        if best is None or hours[slot_dt.hour] < best[0]:
+            best = (hours[slot_dt.hour], slot_dt)
+    if best is None:
+        return None
+    _, slot_dt = best
+    slot = {"start": slot_dt.isoformat(), "weekday": DAYS[slot_dt.weekday()], "hour": slot_dt.hour}
+    return f"{_slot_label(slot, now_dt)}쯤이 평소 가장 한산한 시간대예요 🧺"
+
+
+def forecast_prompt_line(forecasts: List[dict], now_dt: Optional[datetime] = None) -> Optional[str]:
+    """LLM 프롬프트용 추천 결과 요약 (LLM은 이 결과를 자연스럽게 다듬기만 한다)."""
+    now_dt = now_dt or datetime.now(KST)
+    parts = []
+    for fc in forecasts:
+        slot = fc.get("recommended")
+        if slot is None:
+            continue
+        when = "지금" if slot["start"] == fc["slots"][0]["start"] else _slot_label(slot, now_dt)
+        parts.append(f"{fc['room_name'] or fc['room_id']}: {when} (예상 대기 {slot['predicted_wait_minutes']}분, 예상 사용 {slot['expected_busy']}대)")
+    return "; ".join(parts) if parts else None
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+from loguru import logger
+from openai import OpenAI
+
+from app.utils.metrics import LatencyHistogram
+
+# 외부 API 공용 커넥션 풀 크기 (keep-alive 유지 개수 / 최대 동시 연결)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+# 연결 수립 제한 시간 / AI 호출(Gemini, OpenRouter, Ollama) 전체 제한 시간 (초)
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+AI_HTTP_TIMEOUT_SECONDS = float(os.getenv("AI_HTTP_TIMEOUT_SECONDS", "30"))
+# 기상청 API 제한 시간 (초)
+KMA_HTTP_TIMEOUT_SECONDS = float(os.getenv("KMA_HTTP_TIMEOUT_SECONDS", "10"))
+# h2 패키지가 있을 때만 HTTP/2 사용 (없으면 HTTP/1.1 keep-alive)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+
+UPSTREAMS = ("gemini", "openrouter", "ollama", "kma")
+
+
+class HttpClients:
+    """외부 API 호출용 클라이언트 레지스트리.
+
+    - httpx.Client 하나(커넥션 풀)를 KMA/Ollama 직접 호출과 OpenAI/Gemini SDK가 함께 사용
+    - SDK 클라이언트는 (base_url, api_key)별로 한 번만 만들고 재사용
+    - 업스트림별 지연시간 히스토그램과 오류 수 기록
+    - 호출은 워커 스레드에서 이뤄지므로 동기 클라이언트를 스레드 간 공유
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http: httpx.Client | None = None
+        self._openai: Dict[Tuple[str, str], OpenAI] = {}
+        self._genai: Dict[str, genai.Client] = {}
+        self._latency = {name: LatencyHistogram() for name in UPSTREAMS}
+        self._errors = {name: 0 for name in UPSTREAMS}
+
+    def http(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None or self._http.is_closed:
+                self._http = httpx.Client(
+                    http2=HTTP2_ENABLED,
+                    timeout=httpx.Timeout(AI_HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                )
+            return self._http
+
+    def openai(self, base_url: str, api_key: str) -> OpenAI:
+        http_client = self.http()
+        with self._lock:
+            client = self._openai.get((base_url, api_key))
+            if client is None:
+                client = self._openai[(base_url, api_key)] = OpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    http_client=http_client,
+                    timeout=AI_HTTP_TIMEOUT_SECONDS,
+                )
+            return client
+
+    def genai(self, api_key: str) -> genai.Client:
+        http_client = self.http()
+        with self._lock:
+            client = self._genai.get(api_key)
+            if client is None:
+                client = self._genai[api_key] = genai.Client(
+                    api_key=api_key,
+                    http_options=types.HttpOptions(
+                        httpx_client=http_client,
+                        timeout=int(AI_HTTP_TIMEOUT_SECONDS * 1000),  # ms
+                    ),
+                )
+            return client
+
+    @contextmanager
+    def observe(self, upstream: str) -> Iterator[None]:
+        """with 블록 소요 시간을 upstream 히스토그램에 기록 (예외 시 오류 수도 증가)."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._errors[upstream] += 1
+            raise
+        finally:
+            self._latency[upstream].observe(time.perf_counter() - started)
+
+    def close(self) -> None:
+        with self._lock:
+            http_client, self._http = self._http, None
+            self._openai.clear()
+            self._genai.clear()
+        if http_client is not None:
+            http_client.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            errors = dict(self._errors)
+            open_ = self._http is not None and not self._http.is_closed
+        return {
+            "http2": HTTP2_ENABLED,
+            "open": open_,
+            "upstreams": {
+                name: {**self._latency[name].snapshot(), "errors": errors[name]} for name in UPSTREAMS
+            },
+        }
+
+
+http_clients = HttpClients()
+
+
+async def start_http_clients():
+    """기동 시 커넥션 풀 생성 (첫 외부 호출이 클라이언트 생성 비용을 내지 않도록)."""
+    http_clients.http()
+    logger.info(f"HTTP clients ready http2={HTTP2_ENABLED} max_connections={HTTP_MAX_CONNECTIONS}")
+
+
+async def stop_http_clients():
+    await asyncio.to_thread(http_clients.close)
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
+import io
+import json
 import os
+import threading
 import time
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import pytz
-import requests
 from loguru import logger
 
 from app.database import get_db_connection
+from app.services.http_clients import KMA_HTTP_TIMEOUT_SECONDS, http_clients
 
 KST = pytz.timezone("Asia/Seoul")
 PTY_MAP = {
@@ -27,6 +31,8 @@ SKY_MAP = {
     4: "흐림",
 }
 CACHE_DURATION_SECONDS = 3600  # 1시간
+# 메모리의 예보가 현재 발표보다 뒤처졌을 때 weather_cache를 다시 읽는 최소 간격 (초)
+WEATHER_CACHE_RELOAD_SECONDS = float(os.getenv("WEATHER_CACHE_RELOAD_SECONDS", "60"))
 WEATHER_REFRESH_LOCK = asyncio.Lock()
 
 
@@ -89,58 +95,173 @@ def _get_base_time(now: datetime) -> tuple[str, str]:
     return base_date, base_time
 
 
-def _fetch_from_cache(base_date: str, base_time: str, nx: int, ny: int, now_ts: int, now_dt: datetime) -> Optional[dict]:
-    """Check if valid cached weather data exists in DB and return closest forecast."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            # 캐시가 유효한지 확인
-            cursor.execute(
-                """
-                SELECT fetched_at FROM weather_cache
-                WHERE base_date = %s AND base_time = %s AND nx = %s AND ny = %s
-                ORDER BY fetched_at DESC
-                LIMIT 1
-                """,
-                (base_date, base_time, nx, ny),
-            )
-            cache_check = cursor.fetchone()
-            
-            if not cache_check or (now_ts - cache_check.get("fetched_at", 0)) >= CACHE_DURATION_SECONDS:
+# 기상청 예보 category → (weather_cache 컬럼, 값 변환). PCP/SNO는 "강수없음" 같은 문자열 그대로
+CATEGORY_COLUMNS = {
+    "TMP": ("tmp", _safe_float),
+    "TMN": ("tmn", _safe_float),
+    "TMX": ("tmx", _safe_float),
+    "POP": ("pop", _safe_int),
+    "PTY": ("pty", _safe_int),
+    "PCP": ("pcp", str),
+    "SNO": ("sno", str),
+    "SKY": ("sky", _safe_int),
+    "VEC": ("vec", _safe_int),
+    "WSD": ("wsd", _safe_float),
+    "UUU": ("uuu", _safe_float),
+    "VVV": ("vvv", _safe_float),
+    "REH": ("reh", _safe_int),
+    "WAV": ("wav", _safe_float),
+}
+WEATHER_COLUMNS = tuple(column for column, _ in CATEGORY_COLUMNS.values())
+
+
+def _pivot_items(items: Iterable[tuple], base_date: str, base_time: str) -> List[dict]:
+    """(fcstDate, fcstTime, category, fcstValue) 흐름을 한 번 훑으며 예보 시간대별 weather_cache 행으로 모은다."""
+    slots: Dict[tuple[str, str], dict] = {}
+    for fcst_date, fcst_time, category, value in items:
+        target = CATEGORY_COLUMNS.get(category)
+        if target is None or not fcst_date or not fcst_time or value is None or value == "":
+            continue
+        row = slots.get((fcst_date, fcst_time))
+        if row is None:
+            row = slots[(fcst_date, fcst_time)] = {
+                "base_date": base_date,
+                "base_time": base_time,
+                "fcst_date": fcst_date,
+                "fcst_time": fcst_time,
+                **dict.fromkeys(WEATHER_COLUMNS),
+            }
+        column, convert = target
+        row[column] = convert(str(value))
+    return list(slots.values())
+
+
+class ForecastCache:
+    """최신 발표(base_time) 단기예보의 인메모리 사본.
+
+    - (fcst_date, fcst_time) → 시간대 행 dict. 현재 시각 조회는 (오늘, HH00) 키 한 번으로 끝남
+    - 현재 시간대가 없으면 (발표 직후 등) 정렬된 키에서 가장 가까운 미래 시간대
+    - 새 발표를 받으면 통째로 교체. weather_cache 테이블은 저장과 콜드 스타트/다른 워커 반영용
+    """
+
+    def __init__(self):
+        self._base: Optional[tuple[str, str, int, int]] = None
+        self._fetched_at = 0
+        self._slots: Dict[tuple[str, str], dict] = {}
+        self._keys: List[tuple[str, str]] = []
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "replacements": 0, "db_loads": 0, "db_load_failures": 0}
+
+    def replace(self, base_date: str, base_time: str, nx: int, ny: int, rows: List[dict], fetched_at: int) -> bool:
+        """발표 하나의 시간대 행으로 교체. 같은 격자의 더 오래된 발표면 무시하고 False."""
+        slots = {(r["fcst_date"], r["fcst_time"]): r for r in rows}
+        if not slots:
+            return False
+        with self._lock:
+            if self._base is not None and self._base[2:] == (nx, ny) and (base_date, base_time) < self._base[:2]:
+                return False
+            self._base = (base_date, base_time, nx, ny)
+            self._fetched_at = fetched_at
+            self._slots = slots
+            self._keys = sorted(slots)
+            self._stats["replacements"] += 1
+        return True
+
+    def is_fresh(self, base_date: str, base_time: str, nx: int, ny: int, now_ts: int) -> bool:
+        """해당 발표를 들고 있고 CACHE_DURATION_SECONDS 안에 받은 것인지."""
+        with self._lock:
+            return self._base == (base_date, base_time, nx, ny) and now_ts - self._fetched_at < CACHE_DURATION_SECONDS
+
+    def base(self, nx: int, ny: int) -> Optional[tuple[str, str]]:
+        with self._lock:
+            if self._base is None or self._base[2:] != (nx, ny):
                 return None
-            
-            # 현재 시각과 가장 가까운 예보 시간대 데이터 조회
-            current_date = now_dt.strftime("%Y%m%d")
-            current_time = now_dt.strftime("%H%M")
-            
-            cursor.execute(
-                """
-                SELECT * FROM weather_cache
-                WHERE base_date = %s AND base_time = %s AND nx = %s AND ny = %s
-                  AND (fcst_date > %s OR (fcst_date = %s AND fcst_time >= %s))
-                ORDER BY fcst_date, fcst_time
-                LIMIT 1
-                """,
-                (base_date, base_time, nx, ny, current_date, current_date, current_time),
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                logger.info(f"Weather cache hit: {base_date} {base_time}, fcst: {row.get('fcst_date')} {row.get('fcst_time')}")
-                return row
-            
-            return None
-    except Exception as exc:
-        logger.warning(f"Weather cache read failed: {exc}")
-        return None
+            return self._base[:2]
+
+    def lookup(self, nx: int, ny: int, now: datetime) -> Optional[dict]:
+        """현재 시간대 예보 행 (없으면 가장 가까운 미래 시간대)."""
+        localized = now.astimezone(KST)
+        key = (localized.strftime("%Y%m%d"), localized.strftime("%H00"))
+        with self._lock:
+            if self._base is None or self._base[2:] != (nx, ny):
+                self._stats["misses"] += 1
+                return None
+            row = self._slots.get(key)
+            if row is None:
+                idx = bisect.bisect_left(self._keys, key)
+                row = self._slots[self._keys[idx]] if idx < len(self._keys) else None
+            self._stats["hits" if row is not None else "misses"] += 1
+            return row
+
+    def load_from_db(self, nx: int, ny: int, base: Optional[tuple[str, str]] = None) -> bool:
+        """weather_cache에서 발표 하나(base가 없으면 격자의 최신 발표)를 읽어 교체."""
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            self._stats["db_loads"] += 1
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor(dictionary=True, buffered=True)
+                if base is None:
+                    cursor.execute(
+                        """
+                        SELECT base_date, base_time FROM weather_cache
+                        WHERE nx = %s AND ny = %s
+                        ORDER BY base_date DESC, base_time DESC
+                        LIMIT 1
+                        """,
+                        (nx, ny),
+                    )
+                    latest = cursor.fetchone()
+                    if not latest:
+                        return False
+                    base = (latest["base_date"], latest["base_time"])
+                cursor.execute(
+                    """
+                    SELECT * FROM weather_cache
+                    WHERE base_date = %s AND base_time = %s AND nx = %s AND ny = %s
+                    """,
+                    (base[0], base[1], nx, ny),
+                )
+                rows = cursor.fetchall() or []
+        except Exception as exc:
+            logger.warning(f"Weather cache read failed: {exc}")
+            with self._lock:
+                self._stats["db_load_failures"] += 1
+            return False
+        if not rows:
+            return False
+        fetched_at = max(int(r.get("fetched_at") or 0) for r in rows)
+        replaced = self.replace(base[0], base[1], nx, ny, rows, fetched_at)
+        if replaced:
+            logger.info(f"Weather cache loaded from DB: {base[0]} {base[1]}, {len(rows)} time slots")
+        return replaced
+
+    def reload_due(self) -> bool:
+        with self._lock:
+            return time.monotonic() - self._loaded_at >= WEATHER_CACHE_RELOAD_SECONDS
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "base": "".join(self._base[:2]) if self._base else None,
+                "slots": len(self._slots),
+                "fetched_at": self._fetched_at,
+            }
+
+
+forecast_cache = ForecastCache()
 
 
 def get_kma_weather_from_cache_only(now: Optional[datetime] = None) -> Optional[dict[str, Optional[float | str]]]:
-    """Return latest cached weather from DB without calling external KMA API.
+    """Return latest cached weather from memory without calling external KMA API.
 
     Used by /load and /tip so that user-driven requests never hit the KMA API
-    directly. This function does NOT enforce any TTL; it simply returns the
-    closest future (or current) forecast from the existing cache.
+    directly. This function does NOT enforce any TTL; it returns the current
+    hour (or closest future) slot of the newest forecast held in memory.
+    weather_cache is read only on cold start or when this worker is behind the
+    current base time (at most once per WEATHER_CACHE_RELOAD_SECONDS).
     """
     if now is None:
         now = datetime.now(tz=KST)
@@ -154,154 +275,81 @@ def get_kma_weather_from_cache_only(now: Optional[datetime] = None) -> Optional[
 
     nx = int(nx_str)
     ny = int(ny_str)
-    base_date, base_time = _get_base_time(now)
-
+    # 다른 워커가 새 발표를 받았을 수 있으므로 뒤처져 있으면 DB에서 다시 읽음
+    if forecast_cache.base(nx, ny) != _get_base_time(now) and forecast_cache.reload_due():
+        forecast_cache.load_from_db(nx, ny)
+
+    row = forecast_cache.lookup(nx, ny, now)
+    return _format_weather_context(row) if row else None
+
+
+def _iter_json_items(content: bytes) -> Iterator[tuple]:
+    """dataType=JSON 응답의 item들을 (fcstDate, fcstTime, category, fcstValue)로."""
+    response = json.loads(content).get("response") or {}
+    header = response.get("header") or {}
+    if header.get("resultCode") not in (None, "00"):
+        raise ValueError(f"KMA error {header.get('resultCode')}: {header.get('resultMsg')}")
+    items = ((response.get("body") or {}).get("items") or {}).get("item") or []
+    for item in items:
+        yield item.get("fcstDate"), item.get("fcstTime"), item.get("category"), item.get("fcstValue")
+
+
+def _iter_xml_items(content: bytes) -> Iterator[tuple]:
+    """XML 응답(인증 오류 등 JSON 대신 XML이 올 때)을 iterparse로 item마다 읽고 바로 버린다."""
+    for _, elem in ET.iterparse(io.BytesIO(content)):
+        if elem.tag == "resultCode" and elem.text not in (None, "00"):
+            raise ValueError(f"KMA error {elem.text}")
+        if elem.tag != "item":
+            continue
+        fields = {child.tag: child.text for child in elem}
+        yield fields.get("fcstDate"), fields.get("fcstTime"), fields.get("category"), fields.get("fcstValue")
+        elem.clear()
+
+
+def _parse_forecast(content: bytes, base_date: str, base_time: str) -> Optional[List[dict]]:
+    """KMA 응답(JSON, XML이면 XML)을 예보 시간대별 weather_cache 행 목록으로."""
+    items = _iter_xml_items(content) if content.lstrip()[:1] == b"<" else _iter_json_items(content)
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-
-            current_date = now.strftime("%Y%m%d")
-            current_time = now.strftime("%H%M")
-
-            cursor.execute(
-                """
-                SELECT * FROM weather_cache
-                WHERE base_date = %s AND base_time = %s AND nx = %s AND ny = %s
-                  AND (fcst_date > %s OR (fcst_date = %s AND fcst_time >= %s))
-                ORDER BY fcst_date, fcst_time
-                LIMIT 1
-                """,
-                (base_date, base_time, nx, ny, current_date, current_date, current_time),
-            )
-
-            row = cursor.fetchone()
-            if row:
-                logger.info(
-                    f"Weather cache-only hit: {base_date} {base_time}, fcst: {row.get('fcst_date')} {row.get('fcst_time')}"
-                )
-                return _format_weather_context(row)
-
-            return None
-    except Exception as exc:
-        logger.warning(f"Weather cache-only read failed: {exc}")
+        rows = _pivot_items(items, base_date, base_time)
+    except (ValueError, ET.ParseError) as exc:
+        # json.JSONDecodeError는 ValueError의 하위 클래스
+        logger.error(f"KMA response parsing failed: {exc}")
         return None
-
-
-def _parse_xml_forecast(xml_text: str) -> Optional[list[dict]]:
-    """Parse KMA XML response and group by forecast date+time.
-    
-    Returns:
-        List of dicts with fcst_date, fcst_time, and categories
-    """
-    try:
-        root = ET.fromstring(xml_text)
-        items = root.findall(".//item")
-        
-        if not items:
-            logger.warning("No items found in XML response")
-            return None
-        
-        # fcst_date + fcst_time별로 그룹화
-        forecasts: dict[tuple[str, str], dict[str, str]] = {}
-        
-        for item in items:
-            fcst_date = item.findtext("fcstDate")
-            fcst_time = item.findtext("fcstTime")
-            category = item.findtext("category")
-            value = item.findtext("fcstValue")
-            
-            if not all([fcst_date, fcst_time, category, value]):
-                continue
-            
-            key = (fcst_date, fcst_time)
-            if key not in forecasts:
-                forecasts[key] = {}
-            
-            forecasts[key][category] = value
-        
-        # 리스트로 변환
-        result = []
-        for (fcst_date, fcst_time), categories in forecasts.items():
-            result.append({
-                "fcst_date": fcst_date,
-                "fcst_time": fcst_time,
-                "categories": categories,
-            })
-        
-        logger.info(f"Parsed {len(result)} forecast time slots")
-        return result
-    except ET.ParseError as exc:
-        logger.error(f"XML parsing failed: {exc}")
+    if not rows:
+        logger.warning("No items found in KMA response")
         return None
+    logger.info(f"Parsed {len(rows)} forecast time slots")
+    return rows
 
 
-def _store_to_cache(base_date: str, base_time: str, nx: int, ny: int, forecasts: list[dict], now_ts: int) -> None:
-    """Store all forecast time slots to DB cache.
+def _store_to_cache(base_date: str, base_time: str, nx: int, ny: int, rows: list[dict], now_ts: int) -> None:
+    """Store all forecast time slots to DB cache with a single multi-row upsert.
     
     Args:
-        forecasts: List of dicts with fcst_date, fcst_time, categories
+        rows: List of slot dicts built by _pivot_items
     """
+    if not rows:
+        return
+    columns = ("base_date", "base_time", "fcst_date", "fcst_time", "nx", "ny", "fetched_at") + WEATHER_COLUMNS
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    params = []
+    for row in rows:
+        params.extend((base_date, base_time, row["fcst_date"], row["fcst_time"], nx, ny, now_ts))
+        params.extend(row[column] for column in WEATHER_COLUMNS)
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            stored_count = 0
-            for forecast in forecasts:
-                fcst_date = forecast["fcst_date"]
-                fcst_time = forecast["fcst_time"]
-                categories = forecast["categories"]
-                
-                cursor.execute(
-                    """
-                    INSERT INTO weather_cache
-                    (base_date, base_time, fcst_date, fcst_time, nx, ny, fetched_at,
-                     tmp, tmn, tmx, pop, pty, pcp, sno, sky, vec, wsd, uuu, vvv, reh, wav)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        fetched_at = VALUES(fetched_at),
-                        tmp = VALUES(tmp),
-                        tmn = VALUES(tmn),
-                        tmx = VALUES(tmx),
-                        pop = VALUES(pop),
-                        pty = VALUES(pty),
-                        pcp = VALUES(pcp),
-                        sno = VALUES(sno),
-                        sky = VALUES(sky),
-                        vec = VALUES(vec),
-                        wsd = VALUES(wsd),
-                        uuu = VALUES(uuu),
-                        vvv = VALUES(vvv),
-                        reh = VALUES(reh),
-                        wav = VALUES(wav)
-                    """,
-                    (
-                        base_date,
-                        base_time,
-                        fcst_date,
-                        fcst_time,
-                        nx,
-                        ny,
-                        now_ts,
-                        _safe_float(categories.get("TMP")),
-                        _safe_float(categories.get("TMN")),
-                        _safe_float(categories.get("TMX")),
-                        _safe_int(categories.get("POP")),
-                        _safe_int(categories.get("PTY")),
-                        categories.get("PCP"),
-                        categories.get("SNO"),
-                        _safe_int(categories.get("SKY")),
-                        _safe_int(categories.get("VEC")),
-                        _safe_float(categories.get("WSD")),
-                        _safe_float(categories.get("UUU")),
-                        _safe_float(categories.get("VVV")),
-                        _safe_int(categories.get("REH")),
-                        _safe_float(categories.get("WAV")),
-                    ),
-                )
-                stored_count += 1
-            
+            cursor.execute(
+                f"""
+                INSERT INTO weather_cache ({", ".join(columns)})
+                VALUES {", ".join([row_placeholder] * len(rows))}
+                ON DUPLICATE KEY UPDATE
+                    {", ".join(f"{column} = VALUES({column})" for column in ("fetched_at",) + WEATHER_COLUMNS)}
+                """,
+                tuple(params),
+            )
             conn.commit()
-            logger.info(f"Weather cache stored: {base_date} {base_time}, {stored_count} time slots")
+            logger.info(f"Weather cache stored: {base_date} {base_time}, {len(rows)} time slots")
     except Exception as exc:
         logger.error(f"Weather cache store failed: {exc}")
 
@@ -358,17 +406,20 @@ def fetch_kma_weather(now: Optional[datetime] = None) -> Optional[dict[str, Opti
     base_date, base_time = _get_base_time(now)
     now_ts = int(time.time())
     
-    # 1. Check cache
-    cached = _fetch_from_cache(base_date, base_time, nx, ny, now_ts, now)
-    if cached:
-        return _format_weather_context(cached)
+    # 1. Check memory, then DB (다른 워커가 이미 받았을 수 있음)
+    if not forecast_cache.is_fresh(base_date, base_time, nx, ny, now_ts):
+        forecast_cache.load_from_db(nx, ny, (base_date, base_time))
+    if forecast_cache.is_fresh(base_date, base_time, nx, ny, now_ts):
+        cached = forecast_cache.lookup(nx, ny, now)
+        if cached:
+            return _format_weather_context(cached)
     
     # 2. Fetch from API
     url = "https://apihub.kma.go.kr/api/typ02/openApi/VilageFcstInfoService_2.0/getVilageFcst"
     params = {
         "pageNo": 1,
         "numOfRows": 1000,
-        "dataType": "XML",
+        "dataType": "JSON",
         "base_date": base_date,
         "base_time": base_time,
         "nx": nx,
@@ -377,62 +428,41 @@ def fetch_kma_weather(now: Optional[datetime] = None) -> Optional[dict[str, Opti
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        xml_text = response.text
+        with http_clients.observe("kma"):
+            response = http_clients.http().get(url, params=params, timeout=KMA_HTTP_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        content = response.content
     except Exception as exc:
         logger.warning(f"KMA API request failed: {exc}")
         return None
     
-    # 3. Parse XML (모든 시간대)
-    forecasts = _parse_xml_forecast(xml_text)
-    if not forecasts:
+    # 3. Parse (category를 시간대별 행으로 한 번에 피벗)
+    rows = _parse_forecast(content, base_date, base_time)
+    if not rows:
         return None
     
-    # 4. Store all to cache
-    _store_to_cache(base_date, base_time, nx, ny, forecasts, now_ts)
+    # 4. Store all to cache (다중 행 upsert 한 번, 조회는 메모리)
+    _store_to_cache(base_date, base_time, nx, ny, rows, now_ts)
+    forecast_cache.replace(base_date, base_time, nx, ny, rows, now_ts)
     
-    # 5. Return closest forecast to current time
-    cached = _fetch_from_cache(base_date, base_time, nx, ny, now_ts, now)
-    if cached:
-        return _format_weather_context(cached)
-    
-    # Fallback: use first forecast
-    first = forecasts[0]
-    categories = first["categories"]
-    return _format_weather_context({
-        "base_date": base_date,
-        "base_time": base_time,
-        "fcst_date": first["fcst_date"],
-        "fcst_time": first["fcst_time"],
-        "tmp": _safe_float(categories.get("TMP")),
-        "tmn": _safe_float(categories.get("TMN")),
-        "tmx": _safe_float(categories.get("TMX")),
-        "pop": _safe_int(categories.get("POP")),
-        "pty": _safe_int(categories.get("PTY")),
-        "pcp": categories.get("PCP"),
-        "sno": categories.get("SNO"),
-        "sky": _safe_int(categories.get("SKY")),
-        "vec": _safe_int(categories.get("VEC")),
-        "wsd": _safe_float(categories.get("WSD")),
-        "uuu": _safe_float(categories.get("UUU")),
-        "vvv": _safe_float(categories.get("VVV")),
-        "reh": _safe_int(categories.get("REH")),
-        "wav": _safe_float(categories.get("WAV")),
-    })
-
-
-async def refresh_weather_if_needed() -> None:
-    """Background task to refresh KMA weather cache when TTL has expired.
-
-    This function is intended to be triggered from /update. It runs
-    fetch_kma_weather in a worker thread so that external HTTP calls do
+    # 5. Return current hour forecast (없으면 첫 시간대)
+    cached = forecast_cache.lookup(nx, ny, now) or rows[0]
+    return _format_weather_context(cached)
+
+
+async def refresh_weather_if_needed() -> bool:
+    """Refresh KMA weather cache when TTL has expired (called by refresh_scheduler).
+
+    Runs fetch_kma_weather in a worker thread so that external HTTP calls do
     not block the event loop. TTL enforcement is handled inside
     fetch_kma_weather via CACHE_DURATION_SECONDS.
+
+    Returns True when weather for the current base time is available.
     """
     async with WEATHER_REFRESH_LOCK:
         now = datetime.now(tz=KST)
         try:
-            await asyncio.to_thread(fetch_kma_weather, now)
+            return await asyncio.to_thread(fetch_kma_weather, now) is not None
         except Exception as exc:
             logger.warning(f"Weather background refresh failed: {exc}")
+            return False
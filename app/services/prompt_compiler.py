@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.services.congestion import DAYS, HOURS
+from app.services.forecast import forecast_prompt_line
+
+# 프롬프트 최대 길이 (문자). 넘으면 우선순위가 낮은 섹션(요일별 요약 → 주간 순위)부터 뺀다
+PROMPT_MAX_CHARS = int(os.getenv("PROMPT_MAX_CHARS", "1200"))
+# 한산/혼잡 시간대 순위 개수
+PROMPT_TOP_SLOTS = int(os.getenv("PROMPT_TOP_SLOTS", "3"))
+# 요일별 요약에서 "한산한 시간"을 고를 생활 시간대 (시작 시각 기준, 양 끝 포함)
+PROMPT_DAY_FROM_HOUR = 8
+PROMPT_DAY_TO_HOUR = 23
+
+HEADER = [
+    "대학 기숙사 세탁실 이용 시간 추천: 아래 요약을 보고 언제 세탁하면 좋을지 **한 줄**로 추천해주세요.",
+    "친근한 말투와 이모지, 미래 시간대(요일+시간) 예측 형태로 작성하세요.",
+]
+
+BATCH_HEADER = [
+    "대학 기숙사 세탁실 이용 시간 추천: 아래 세탁실마다 언제 세탁하면 좋을지 각각 **한 줄**로 추천해주세요.",
+    "친근한 말투와 이모지, 미래 시간대(요일+시간) 예측 형태로 작성하세요.",
+]
+
+
+def _hour_label(hour: int) -> str:
+    period = "오전" if hour < 12 else "오후"
+    hour_12 = hour if hour <= 12 else hour - 12
+    return f"{period} {hour_12 or 12}시"
+
+
+def _num(value: float) -> str:
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _delta(value: float) -> str:
+    """지금 대비 차이 (예: -3.5대, +1대)."""
+    return f"{'-' if value < 0 else '+'}{_num(abs(value))}대"
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 입력 토큰 수 (ASCII 4자당 1토큰, 한글 등 그 외 문자는 1자당 1토큰)."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _weather_line(weather: Optional[dict]) -> Optional[str]:
+    """세탁/건조 판단에 필요한 날씨만 한 줄로 (기온, 하늘, 강수, 높은 습도/강풍)."""
+    if not weather:
+        return None
+    parts = []
+    temp = weather.get("temperature")
+    if temp is not None:
+        span = [f"{k} {_num(v)}" for k, v in (("최저", weather.get("min_temperature")), ("최고", weather.get("max_temperature"))) if v is not None]
+        parts.append(f"{_num(temp)}°C" + (f"({'/'.join(span)})" if span else ""))
+    if weather.get("sky_condition"):
+        parts.append(weather["sky_condition"])
+    pty = weather.get("precipitation_type")
+    if pty and pty != "없음":
+        parts.append(pty)
+    pop = weather.get("precipitation_probability")
+    if pop is not None:
+        parts.append(f"강수확률 {pop}%")
+    humidity = weather.get("humidity")
+    if humidity is not None and humidity >= 80:
+        parts.append(f"습도 {humidity}%")
+    wind = weather.get("wind_speed")
+    if wind is not None and wind >= 9:
+        parts.append(f"강풍 {_num(wind)}m/s")
+    return f"- 날씨: {', '.join(parts)}" if parts else None
+
+
+def _room_lines(status_context: dict) -> List[str]:
+    lines = []
+    for room in status_context.get("rooms") or []:
+        line = f"- {room.get('room_name') or room.get('room_id')}: 빈 세탁기 {room.get('machines_idle', 0)}/{room.get('machines_total', 0)}대"
+        if room.get("reservation_count"):
+            line += f", 예약 {room['reservation_count']}건"
+        wait = room.get("estimated_wait_minutes")
+        if wait and wait > 0:
+            line += f", 예상 대기 {int(wait)}분"
+        lines.append(line)
+    recent = (status_context.get("alerts") or {}).get("recent_finished_count", 0)
+    if recent > 0:
+        lines.append(f"- 최근 30분 완료: {recent}건")
+    return lines
+
+
+def _cells(congestion: dict) -> Optional[List[float]]:
+    """요일별 24칸 dict → 168칸 리스트 (월 0시부터)."""
+    cells: List[float] = []
+    for day in DAYS:
+        hours = congestion.get(day)
+        if not isinstance(hours, list) or len(hours) != HOURS:
+            return None
+        cells.extend(float(v or 0) for v in hours)
+    return cells
+
+
+def _congestion_sections(cells: Sequence[float], weekday: int, hour: int) -> List[Tuple[int, List[str]]]:
+    """(우선순위, 줄 목록). 우선순위가 낮을수록 길이 제한 때 먼저 남는다."""
+    now_idx = weekday * HOURS + hour
+    now_value = cells[now_idx]
+
+    def label(idx: int) -> str:
+        return f"{DAYS[idx // HOURS]} {_hour_label(idx % HOURS)}"
+
+    # 지금부터 24시간: 가장 한산한 칸과 지금 대비 차이
+    upcoming = [(now_idx + k) % len(cells) for k in range(1, HOURS + 1)]
+    quiet_next = sorted(upcoming, key=lambda i: (cells[i], (i - now_idx) % len(cells)))[:PROMPT_TOP_SLOTS]
+    next_line = ", ".join(f"{label(i)} {_num(cells[i])}대({_delta(cells[i] - now_value)})" for i in quiet_next)
+    sections = [(0, [f"- 지금 시간대 평균 {_num(now_value)}대 사용", f"- 24시간 내 한산: {next_line}"])]
+
+    # 주간 전체 순위 (같은 값이면 가까운 미래 우선)
+    order = sorted(range(len(cells)), key=lambda i: (cells[i], (i - now_idx) % len(cells)))
+    quiet = ", ".join(f"{label(i)} {_num(cells[i])}대" for i in order[:PROMPT_TOP_SLOTS])
+    busy = ", ".join(f"{label(i)} {_num(cells[i])}대" for i in order[::-1][:PROMPT_TOP_SLOTS])
+    sections.append((1, [f"- 주간 한산: {quiet}", f"- 주간 혼잡: {busy}"]))
+
+    # 요일별 모양: 평균, 피크, 생활 시간대 중 가장 한산한 시간
+    day_lines = []
+    for d, day in enumerate(DAYS):
+        row = cells[d * HOURS:(d + 1) * HOURS]
+        peak = max(range(HOURS), key=lambda h: row[h])
+        low = min(range(PROMPT_DAY_FROM_HOUR, PROMPT_DAY_TO_HOUR + 1), key=lambda h: row[h])
+        day_lines.append(f"  {day}: 평균 {_num(sum(row) / HOURS)}, 피크 {peak}시 {_num(row[peak])}, 한산 {low}시 {_num(row[low])}")
+    sections.append((2, ["- 요일별 혼잡도(대):"] + day_lines))
+    return sections
+
+
+def _now_lines(status_context: dict) -> List[str]:
+    time_ctx = status_context.get("time") or {}
+    lines = []
+    if time_ctx.get("weekday"):
+        hour = int(time_ctx.get("hour", 0) or 0)
+        lines.append(f"- 현재: {time_ctx['weekday']}요일 {_hour_label(hour)}" + (" (공휴일)" if time_ctx.get("is_holiday") else ""))
+    weather_line = _weather_line(status_context.get("weather"))
+    if weather_line:
+        lines.append(weather_line)
+    return lines
+
+
+def _congestion_digest(status_context: dict) -> List[Tuple[int, List[str]]]:
+    time_ctx = status_context.get("time") or {}
+    weekday_label = time_ctx.get("weekday")
+    cells = _cells(status_context.get("congestion_stats") or {})
+    if cells is None or weekday_label not in DAYS:
+        return []
+    return _congestion_sections(cells, DAYS.index(weekday_label), int(time_ctx.get("hour", 0) or 0))
+
+
+def _fit(lines: List[str], sections: List[Tuple[int, List[str]]], footer: List[str], max_chars: int) -> str:
+    """길이 제한: 우선순위가 낮은(숫자가 큰) 섹션부터 제외."""
+    sections = sorted(sections, key=lambda s: s[0])
+    while True:
+        body = lines + [line for _, section in sections for line in section]
+        prompt = "\n".join(body + [""] + footer)
+        if len(prompt) <= max_chars or not sections:
+            return prompt
+        sections.pop()
+
+
+def compile_prompt(status_context: dict) -> str:
+    """status_context를 서버에서 요약한 길이 제한 프롬프트.
+
+    - 예측 추천 결과가 있으면 그 결과만 전달 (LLM은 문장만 다듬음)
+    - 없으면 168칸 혼잡도 표 대신 24시간 내 한산한 칸(지금 대비 차이), 주간 순위, 요일별 요약
+    - PROMPT_MAX_CHARS를 넘으면 우선순위가 낮은 섹션부터 제외. 필수 줄(현재/세탁실/예측)과 마지막 지시문은
+      자르지 않으므로 세탁실이 아주 많으면 제한보다 길어질 수 있음
+    """
+    lines = list(HEADER) + _now_lines(status_context) + _room_lines(status_context)
+
+    sections: List[Tuple[int, List[str]]] = []
+    forecast_line = forecast_prompt_line(status_context.get("forecast") or [])
+    if forecast_line:
+        lines.append(f"- 통계 예측 추천 시간대: {forecast_line}")
+        footer = ["위 추천 시간대를 바꾸지 말고 현재 상황과 함께 한 줄로 자연스럽게 다듬어주세요."]
+    else:
+        sections = _congestion_digest(status_context)
+        footer = ["위 통계에서 가장 한산한 미래 시간대를 골라 'Y요일 Z시가 한산할 것 같아요!'처럼 추천해주세요."]
+    return _fit(lines, sections, footer, PROMPT_MAX_CHARS)
+
+
+def compile_batch_prompt(status_context: dict) -> str:
+    """여러 세탁실 TIP을 한 번에 받는 프롬프트. 응답은 세탁실마다 "세탁실ID|추천 문장" 한 줄.
+
+    세탁실 줄은 항상 넣고 (세탁실 수만큼 길어짐), 혼잡도 요약 섹션만 PROMPT_MAX_CHARS에 맞춰 줄인다.
+    """
+    forecasts = {fc["room_id"]: fc for fc in status_context.get("forecast") or []}
+    lines = list(BATCH_HEADER) + _now_lines(status_context)
+
+    needs_digest = False
+    for room in status_context.get("rooms") or []:
+        room_id = room.get("room_id")
+        line = f"- [{room_id}] {room.get('room_name') or room_id}: 빈 세탁기 {room.get('machines_idle', 0)}/{room.get('machines_total', 0)}대"
+        if room.get("reservation_count"):
+            line += f", 예약 {room['reservation_count']}건"
+        forecast_line = forecast_prompt_line([forecasts[room_id]]) if room_id in forecasts else None
+        if forecast_line:
+            line += f" / 예측 추천: {forecast_line.split(': ', 1)[-1]}"
+        else:
+            needs_digest = True
+        lines.append(line)
+
+    recent = (status_context.get("alerts") or {}).get("recent_finished_count", 0)
+    if recent > 0:
+        lines.append(f"- 최근 30분 완료: {recent}건")
+
+    sections = _congestion_digest(status_context) if needs_digest else []
+    footer = [
+        "예측 추천이 있는 세탁실은 그 시간대를 바꾸지 말고 다듬기만, 없는 세탁실은 혼잡도 요약에서 한산한 미래 시간대를 고르세요.",
+        "다른 말 없이 세탁실마다 한 줄씩 '세탁실ID|추천 문장' 형식으로 답하세요. 예: 1|오늘 오후 9시쯤이 한산할 것 같아요 🧺",
+    ]
+    return _fit(lines, sections, footer, PROMPT_MAX_CHARS)
+
+
+class PromptMetrics:
+    """프로바이더별 프롬프트 크기 (문자 수, 추정 토큰 수) 누적."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_provider: Dict[str, dict] = {}
+
+    def record(self, provider: str, prompt: str) -> int:
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            entry = self._by_provider.setdefault(provider, {"prompts": 0, "chars": 0, "tokens": 0, "max_tokens": 0})
+            entry["prompts"] += 1
+            entry["chars"] += len(prompt)
+            entry["tokens"] += tokens
+            entry["max_tokens"] = max(entry["max_tokens"], tokens)
+        logger.info(f"[Prompt] {provider}: {len(prompt)} chars, ~{tokens} tokens")
+        return tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                provider: {
+                    **entry,
+                    "avg_chars": round(entry["chars"] / entry["prompts"], 1),
+                    "avg_tokens": round(entry["tokens"] / entry["prompts"], 1),
+                }
+                for provider, entry in self._by_provider.items()
+            }
+
+
+prompt_metrics = PromptMetrics()
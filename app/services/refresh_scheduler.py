@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+
+from app.services.ai_summary import CACHE_DURATION_SECONDS, refresh_ai_tip_if_needed
+from app.services.kma_weather import KST, _get_base_time, refresh_weather_if_needed
+from app.services.tip_pool import tip_pool
+
+# 스케줄러가 깨어나 갱신 필요 여부를 확인하는 최대 간격 (초)
+REFRESH_TICK_SECONDS = float(os.getenv("REFRESH_TICK_SECONDS", "30"))
+# 상태 변경 신호를 첫 신호 후 이만큼 모았다가 한 번에 반영 (초)
+TIP_REFRESH_DEBOUNCE_SECONDS = float(os.getenv("TIP_REFRESH_DEBOUNCE_SECONDS", "10"))
+# TTL이 지난 TIP을 다시 만들기 위한 최소 상태 변경 수 (이보다 적으면 TIP_MAX_AGE까지 유지)
+TIP_REFRESH_MIN_CHANGES = int(os.getenv("TIP_REFRESH_MIN_CHANGES", "3"))
+# 상태 변경이 없어도 이 시간이 지나면 TIP 재생성 (시간대/날씨 반영, 초)
+TIP_MAX_AGE_SECONDS = int(os.getenv("TIP_MAX_AGE_SECONDS", "1800"))
+# 기상청 단기예보 발표 시각(02, 05, ... 23시) 후 API에 반영되기까지 기다리는 시간 (분)
+KMA_RELEASE_DELAY_MINUTES = int(os.getenv("KMA_RELEASE_DELAY_MINUTES", "10"))
+# 날씨 갱신 실패 시 재시도 간격 (초)
+WEATHER_RETRY_SECONDS = float(os.getenv("WEATHER_RETRY_SECONDS", "300"))
+
+_scheduler_task: asyncio.Task | None = None
+_scheduler_wakeup: asyncio.Event | None = None
+_pending_changes = 0
+_first_pending_at = 0.0
+_tip_attempt_at = float("-inf")
+_weather_base: Optional[tuple[str, str]] = None
+_weather_retry_at = 0.0
+_stats = {
+    "signals": 0,
+    "ticks": 0,
+    "tip_refreshes": 0,
+    "tip_skipped_minor": 0,
+    "weather_refreshes": 0,
+    "weather_failures": 0,
+}
+
+
+def signal_state_changed() -> None:
+    """/update 커밋 후 호출: 변경 건수만 올리고 스케줄러를 깨운다 (DB/태스크 생성 없음)."""
+    global _pending_changes, _first_pending_at
+    _stats["signals"] += 1
+    _pending_changes += 1
+    if _pending_changes > 1:
+        return
+    # 첫 변경만 루프를 깨워 모으는 구간 타이머를 잡게 한다
+    _first_pending_at = time.monotonic()
+    if _scheduler_wakeup is not None:
+        _scheduler_wakeup.set()
+
+
+def _released_base(now: datetime) -> tuple[str, str]:
+    """API에 이미 올라왔을 최신 발표 (base_date, base_time)."""
+    return _get_base_time(now - timedelta(minutes=KMA_RELEASE_DELAY_MINUTES))
+
+
+def _weather_configured() -> bool:
+    return bool(os.getenv("KMA_AUTH_KEY") and os.getenv("KMA_NX") and os.getenv("KMA_NY"))
+
+
+async def _maybe_refresh_weather() -> None:
+    """새 발표가 나왔을 때만 갱신. 실패하면 WEATHER_RETRY_SECONDS 뒤 재시도."""
+    global _weather_base, _weather_retry_at
+    if not _weather_configured():
+        return
+    base = _released_base(datetime.now(tz=KST))
+    if base == _weather_base or time.monotonic() < _weather_retry_at:
+        return
+    if await refresh_weather_if_needed():
+        _weather_base = base
+        _weather_retry_at = 0.0
+        _stats["weather_refreshes"] += 1
+    else:
+        _weather_retry_at = time.monotonic() + WEATHER_RETRY_SECONDS
+        _stats["weather_failures"] += 1
+
+
+async def _maybe_refresh_tip() -> None:
+    """TTL이 지났고 (상태 변경이 충분히 쌓였거나 TIP_MAX_AGE를 넘겼을 때) TIP 재생성."""
+    global _pending_changes, _tip_attempt_at
+    # AI 호출 실패가 이어져도 TTL 간격보다 자주 재시도하지 않음
+    if time.monotonic() - _tip_attempt_at < CACHE_DURATION_SECONDS:
+        return
+    # 다른 워커가 저장한 TIP도 반영된 나이로 판단
+    await asyncio.to_thread(tip_pool.refresh)
+    age = int(time.time()) - tip_pool.fetched_at()
+    if age < CACHE_DURATION_SECONDS:
+        return
+
+    changes = _pending_changes
+    if age < TIP_MAX_AGE_SECONDS:
+        if changes < TIP_REFRESH_MIN_CHANGES:
+            _stats["tip_skipped_minor"] += 1
+            return
+        if time.monotonic() - _first_pending_at < TIP_REFRESH_DEBOUNCE_SECONDS:
+            return
+
+    _pending_changes -= changes
+    _tip_attempt_at = time.monotonic()
+    await refresh_ai_tip_if_needed()
+    _stats["tip_refreshes"] += 1
+
+
+def _next_timeout() -> float:
+    """변경 신호가 대기 중이면 모으는 구간이 끝나는 시점에 맞춰 깨어난다.
+
+    구간이 이미 지났는데 재생성하지 않은 경우(변경 수 부족, TIP이 아직 신선함)는 평소 주기로 돌아간다.
+    변경 수는 그대로 두어 다음 주기에 계속 누적된다.
+    """
+    if _pending_changes:
+        window_left = TIP_REFRESH_DEBOUNCE_SECONDS - (time.monotonic() - _first_pending_at)
+        if window_left > 0:
+            return max(0.5, min(REFRESH_TICK_SECONDS, window_left))
+    return REFRESH_TICK_SECONDS
+
+
+async def _scheduler_loop():
+    logger.info(
+        f"Refresh scheduler started tick={REFRESH_TICK_SECONDS}s debounce={TIP_REFRESH_DEBOUNCE_SECONDS}s "
+        f"min_changes={TIP_REFRESH_MIN_CHANGES} tip_max_age={TIP_MAX_AGE_SECONDS}s"
+    )
+    assert _scheduler_wakeup is not None
+    try:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(_scheduler_wakeup.wait(), timeout=_next_timeout())
+            _scheduler_wakeup.clear()
+            _stats["ticks"] += 1
+            try:
+                await _maybe_refresh_weather()
+            except Exception:
+                logger.exception("refresh_scheduler: weather refresh failed")
+            try:
+                await _maybe_refresh_tip()
+            except Exception:
+                logger.exception("refresh_scheduler: tip refresh failed")
+    except asyncio.CancelledError:
+        logger.info("Refresh scheduler cancelled")
+        raise
+
+
+async def start_refresh_scheduler():
+    global _scheduler_task, _scheduler_wakeup
+    if _scheduler_task and not _scheduler_task.done():
+        return
+    _scheduler_wakeup = asyncio.Event()
+    _scheduler_task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_refresh_scheduler():
+    global _scheduler_task, _scheduler_wakeup
+    if not _scheduler_task:
+        return
+    _scheduler_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await _scheduler_task
+    _scheduler_task = None
+    _scheduler_wakeup = None
+
+
+def get_refresh_scheduler_stats() -> dict:
+    return {
+        **_stats,
+        "pending_changes": _pending_changes,
+        "weather_base": "".join(_weather_base) if _weather_base else None,
+        "tip_fetched_at": tip_pool.fetched_at(),
+    }
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+from loguru import logger
+
+# 데이터 종류별 프로세스 전역 버전.
+# - state: 세탁기 상태/구독/예약 (/load, /rooms)
+# - congestion: 혼잡도 통계 (busy_table)
+# - tip: AI 팁 캐시 세대 (ai_tip_cache)
+# 상태 기반 응답 캐시/ETag는 이 값이 같으면 이전 결과를 재사용한다.
+_versions: Dict[str, int] = {"state": 0, "congestion": 0, "tip": 0}
+_lock = threading.Lock()
+
+
+def get_version(name: str) -> int:
+    return _versions.get(name, 0)
+
+
+def bump_version(name: str, reason: str = "") -> int:
+    """변경 커밋 후 호출 → 이전 버전으로 캐시된 응답/ETag를 모두 무효화."""
+    with _lock:
+        version = _versions.get(name, 0) + 1
+        _versions[name] = version
+    logger.debug(f"{name}_version → {version} ({reason})")
+    return version
+
+
+def get_state_version() -> int:
+    return get_version("state")
+
+
+def bump_state_version(reason: str = "") -> int:
+    return bump_version("state", reason)
+
+
+def get_versions() -> Dict[str, int]:
+    with _lock:
+        return dict(_versions)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.services.congestion import DAYS, HOURS
+
+# 지문별 TIP LRU 최대 항목 수 / 항목 유효 시간 (초). 지문에 요일+시간이 있어 같은 주의 같은 시간대에 재사용된다
+TIP_MEMO_MAX_ENTRIES = int(os.getenv("TIP_MEMO_MAX_ENTRIES", "256"))
+TIP_MEMO_TTL_SECONDS = int(os.getenv("TIP_MEMO_TTL_SECONDS", str(7 * 24 * 3600)))
+# 지문에 넣는 한산한 시간대 개수
+TIP_MEMO_QUIET_SLOTS = int(os.getenv("TIP_MEMO_QUIET_SLOTS", "3"))
+
+
+def _bucket(value: Optional[float], bounds: tuple) -> Optional[int]:
+    """bounds 경계로 나눈 구간 번호 (None은 그대로)."""
+    if value is None:
+        return None
+    return sum(1 for b in bounds if value >= b)
+
+
+def _occupancy(room: dict) -> list:
+    total = room.get("machines_total") or 0
+    busy = room.get("machines_busy") or 0
+    ratio = busy / total if total else None
+    # 사용률: 0 / ~1/3 / ~2/3 / 그 이상 / 만석, 예약: 0 / 1~2 / 3+
+    occupancy = None if ratio is None else (4 if ratio >= 1 else _bucket(ratio, (1e-9, 1 / 3, 2 / 3)))
+    return [room.get("room_id"), occupancy, _bucket(room.get("reservation_count") or 0, (1, 3))]
+
+
+def _weather_class(weather: Optional[dict]) -> Optional[list]:
+    """/tip(WeatherContext)과 스케줄러(날씨 캐시 dict) 양쪽에 있는 필드만 사용."""
+    if not weather:
+        return None
+    return [
+        weather.get("precipitation_type") or "없음",
+        weather.get("sky_condition_code"),
+        _bucket(weather.get("precipitation_probability"), (30, 60)),
+        # 기온: 영하 / 0~10 / 10~20 / 20~28 / 28+
+        _bucket(weather.get("temperature"), (0, 10, 20, 28)),
+    ]
+
+
+def _quiet_slots(status_context: dict) -> list:
+    """추천 입력이 되는 한산한 시간대: 예측 추천 결과가 있으면 그것, 없으면 혼잡도 표 상위 k칸."""
+    forecasts = status_context.get("forecast") or []
+    if forecasts:
+        slots = []
+        for fc in forecasts:
+            slot = fc.get("recommended")
+            if slot is not None:
+                wait = _bucket(slot["predicted_wait_minutes"], (1, 15, 30, 60))
+                slots.append([fc.get("room_id"), slot["weekday"], slot["hour"], wait])
+        return slots
+
+    congestion = status_context.get("congestion_stats") or {}
+    cells = [
+        (hours[h], DAYS.index(day), h)
+        for day, hours in congestion.items()
+        if day in DAYS and isinstance(hours, list) and len(hours) == HOURS
+        for h in range(HOURS)
+    ]
+    return [[d, h] for _, d, h in sorted(cells)[:TIP_MEMO_QUIET_SLOTS]]
+
+
+def context_fingerprint(status_context: dict, provider: str = "") -> str:
+    """TIP 생성 입력의 양자화된 정규 지문 (같은 지문이면 같은 TIP을 재사용해도 되는 상황)."""
+    time_ctx = status_context.get("time") or {}
+    canonical = {
+        "p": provider,
+        "t": [time_ctx.get("weekday"), time_ctx.get("hour"), bool(time_ctx.get("is_holiday"))],
+        "r": sorted((_occupancy(r) for r in status_context.get("rooms") or []), key=str),
+        "w": _weather_class(status_context.get("weather")),
+        "q": _quiet_slots(status_context),
+    }
+    raw = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class TipMemo:
+    """지문 → 세탁실별 생성 TIP 목록 LRU (프로세스 내).
+
+    - 적중하면 AI를 호출하지 않고 이전 TIP을 재사용
+    - 미스 때 잰 생성 시간 평균으로 적중이 아낀 호출 수/시간을 추정
+    """
+
+    def __init__(self, max_entries: int = TIP_MEMO_MAX_ENTRIES, ttl_seconds: int = TIP_MEMO_TTL_SECONDS):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Dict[int, List[str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._generation_seconds = 0.0
+        self._generations = 0
+
+    def get(self, fingerprint: str) -> Optional[Dict[int, List[str]]]:
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and time.time() - entry[0] >= self._ttl:
+                del self._entries[fingerprint]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self._stats["hits"] += 1
+            return {room_id: list(tips) for room_id, tips in entry[1].items()}
+
+    def put(self, fingerprint: str, tips_by_room: Dict[int, List[str]], generation_seconds: Optional[float] = None) -> None:
+        if not tips_by_room:
+            return
+        with self._lock:
+            self._entries[fingerprint] = (time.time(), {room_id: list(tips) for room_id, tips in tips_by_room.items()})
+            self._entries.move_to_end(fingerprint)
+            self._stats["stores"] += 1
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            if generation_seconds is not None:
+                self._generation_seconds += generation_seconds
+                self._generations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            avg_generation = self._generation_seconds / self._generations if self._generations else None
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                "avg_generation_ms": round(avg_generation * 1000, 1) if avg_generation is not None else None,
+                "saved_ai_calls": self._stats["hits"],
+                "saved_seconds_estimate": round(self._stats["hits"] * avg_generation, 1) if avg_generation is not None else None,
+            }
+
+
+tip_memo = TipMemo()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from app.database import get_db_connection
+from app.services.state_version import bump_version
+
+# ai_tip_cache 세대(MAX(id)) 확인 주기 (초). 이 간격 안에서는 DB를 전혀 조회하지 않는다
+TIP_POOL_CHECK_SECONDS = float(os.getenv("TIP_POOL_CHECK_SECONDS", "5"))
+# 워커 간 TIP 생성 단일 실행용 MySQL advisory lock 이름
+TIP_GENERATION_LOCK_NAME = os.getenv("TIP_GENERATION_LOCK_NAME", "washcall:ai_tip_generation")
+
+
+class TipPool:
+    """ai_tip_cache의 세탁실별 인메모리 사본.
+
+    - 세대 = ai_tip_cache의 MAX(id). 저장할 때마다 해당 세탁실 행을 DELETE 후 새 id로 INSERT하므로 세대가 바뀐다
+    - TIP_POOL_CHECK_SECONDS마다 세대만 확인하고, 바뀐 경우에만 전체 TIP을 다시 읽는다
+    - 조회(random/fresh)는 메모리에서 random.choice만 수행
+    - 세대가 바뀌면 tip 버전을 올려 /tip ETag를 무효화 (다른 워커가 저장한 경우 포함)
+    """
+
+    def __init__(self):
+        self._tips: Dict[int, List[str]] = {}
+        self._fetched_at: Dict[int, int] = {}
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "generation_checks": 0, "reloads": 0, "stores": 0}
+
+    def _apply(
+        self,
+        generation: Optional[int],
+        tips: Dict[int, List[str]],
+        fetched_at: Dict[int, int],
+        replace: bool,
+    ) -> None:
+        """replace=True면 전체 교체(재적재), False면 주어진 세탁실만 교체(저장)."""
+        with self._lock:
+            changed = generation != self._generation
+            self._generation = generation
+            if replace:
+                self._tips, self._fetched_at = tips, fetched_at
+            else:
+                self._tips = {**self._tips, **tips}
+                self._fetched_at = {**self._fetched_at, **fetched_at}
+            self._checked_at = time.monotonic()
+        if changed:
+            bump_version("tip", "tip_pool_generation")
+
+    def refresh(self, force: bool = False) -> None:
+        """세대 확인 주기가 지났거나 force면 세대를 확인하고, 바뀐 경우에만 다시 읽는다."""
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < TIP_POOL_CHECK_SECONDS:
+                return
+            self._checked_at = time.monotonic()
+            known = self._generation
+            self._stats["generation_checks"] += 1
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            cursor.execute("SELECT MAX(id) AS generation FROM ai_tip_cache")
+            row = cursor.fetchone()
+            generation = row.get("generation") if row else None
+            if generation == known:
+                return
+            cursor.execute("SELECT room_id, tip_message, fetched_at FROM ai_tip_cache")
+            rows = cursor.fetchall() or []
+
+        tips: Dict[int, List[str]] = {}
+        fetched_at: Dict[int, int] = {}
+        for r in rows:
+            if not r.get("tip_message"):
+                continue
+            room_id = int(r["room_id"])
+            tips.setdefault(room_id, []).append(r["tip_message"])
+            fetched_at[room_id] = max(fetched_at.get(room_id, 0), int(r.get("fetched_at") or 0))
+        with self._lock:
+            self._stats["reloads"] += 1
+        self._apply(generation, tips, fetched_at, replace=True)
+        logger.debug(f"[TipPool] generation {known} → {generation} ({len(rows)} tips, {len(tips)} rooms)")
+
+    def random_tip(self, room_id: Optional[int] = None, max_age_seconds: Optional[int] = None) -> Optional[str]:
+        """세탁실의 TIP 중 하나 (room_id가 None이면 전체 세탁실 중). max_age_seconds보다 오래된 TIP은 무시."""
+        with self._lock:
+            rooms = [room_id] if room_id is not None else list(self._tips)
+            oldest = int(time.time()) - max_age_seconds if max_age_seconds is not None else None
+            tips = [
+                tip
+                for r in rooms
+                if oldest is None or self._fetched_at.get(r, 0) >= oldest
+                for tip in self._tips.get(r, ())
+            ]
+            if tips:
+                self._stats["hits"] += 1
+                return random.choice(tips)
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, tips_by_room: Dict[int, List[str]]) -> None:
+        """해당 세탁실의 기존 TIP을 지우고 새 TIP을 한 번의 다중 행 INSERT로 저장 (같은 트랜잭션)."""
+        tips_by_room = {int(r): list(t) for r, t in tips_by_room.items() if t}
+        if not tips_by_room:
+            return
+        now_ts = int(time.time())
+        rows = [(room_id, tip, now_ts) for room_id, tips in tips_by_room.items() for tip in tips]
+        with get_db_connection() as conn:
+            cursor = conn.cursor(buffered=True)
+            cursor.execute(
+                f"DELETE FROM ai_tip_cache WHERE room_id IN ({','.join(['%s'] * len(tips_by_room))})",
+                tuple(tips_by_room),
+            )
+            cursor.execute(
+                "INSERT INTO ai_tip_cache (room_id, tip_message, fetched_at) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(rows)),
+                tuple(v for row in rows for v in row),
+            )
+            cursor.execute("SELECT MAX(id) FROM ai_tip_cache")
+            row = cursor.fetchone()
+            conn.commit()
+        with self._lock:
+            self._stats["stores"] += 1
+        self._apply(row[0] if row else None, tips_by_room, {r: now_ts for r in tips_by_room}, replace=False)
+
+    def fetched_at(self, room_id: Optional[int] = None) -> int:
+        """세탁실 TIP이 생성된 시각 (room_id가 None이면 가장 오래된 세탁실 기준, 없으면 0)."""
+        with self._lock:
+            if room_id is not None:
+                return self._fetched_at.get(room_id, 0)
+            return min(self._fetched_at.values(), default=0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "generation": self._generation,
+                "rooms": len(self._tips),
+                "tips": sum(len(t) for t in self._tips.values()),
+                "oldest_fetched_at": min(self._fetched_at.values(), default=0),
+            }
+
+
+tip_pool = TipPool()
+
+_lock_stats = {"acquired": 0, "skipped": 0, "errors": 0}
+
+
+@contextmanager
+def tip_generation_lock() -> Iterator[bool]:
+    """여러 워커 중 하나만 TIP을 생성하도록 GET_LOCK(이름, 0)으로 잠금 시도.
+
+    잠금을 얻으면 True, 다른 워커가 생성 중이면 기다리지 않고 False.
+    잠금은 커넥션(세션) 단위이므로 생성이 끝날 때까지 커넥션 하나를 점유한다.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor(buffered=True)
+        locked = False
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (TIP_GENERATION_LOCK_NAME,))
+            row = cursor.fetchone()
+            locked = bool(row and row[0] == 1)
+            acquired = locked
+            _lock_stats["acquired" if locked else "skipped"] += 1
+        except Exception as exc:
+            # 잠금을 확인할 수 없으면 기존처럼 잠금 없이 생성
+            logger.warning(f"[TipPool] GET_LOCK failed, generating without lock: {exc}")
+            _lock_stats["errors"] += 1
+            acquired = True
+
+        try:
+            yield acquired
+        finally:
+            if locked:
+                try:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (TIP_GENERATION_LOCK_NAME,))
+                    cursor.fetchone()
+                except Exception as exc:
+                    logger.warning(f"[TipPool] RELEASE_LOCK failed: {exc}")
+
+
+def get_tip_pool_stats() -> dict:
+    return {**tip_pool.stats(), "generation_lock": dict(_lock_stats)}
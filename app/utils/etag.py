@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from typing import Optional
+
+from fastapi import Response
+
+# 프로세스마다 다른 값 → 재시작/다른 워커에서 발급한 ETag와 우연히 일치하지 않도록
+BOOT_ID = uuid.uuid4().hex
+
+
+def make_etag(*parts) -> str:
+    """데이터 버전 조합으로 strong ETag 생성."""
+    raw = "|".join([BOOT_ID, *(str(p) for p in parts)])
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더(쉼표 구분 목록, W/ 접두사, *)가 etag와 일치하는지."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
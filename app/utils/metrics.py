@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Sequence
+
+# 기본 지연시간 버킷 경계 (ms)
+DEFAULT_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """스레드 안전한 누적 지연시간 히스토그램 (count/sum/max + 버킷별 개수)."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self._bounds = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = max(0.0, seconds * 1000.0)
+        idx = bisect.bisect_left(self._bounds, ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{int(b)}ms": c for b, c in zip(self._bounds, self._counts)}
+            buckets["inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "avg_ms": round(self._sum_ms / self._count, 2) if self._count else None,
+                "max_ms": round(self._max_ms, 2) if self._count else None,
+                "buckets": buckets,
+            }
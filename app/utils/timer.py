@@ -1,41 +1,98 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from typing import Iterable, List, Mapping, Optional, Protocol, Tuple
 
-import time
-from loguru import logger
 
+# 상태별 고정 평균 소요 시간 (분). 학습된 소요 시간이 없을 때 사용
+WASHING_MINUTES = 36
+SPINNING_MINUTES = 10
+DRYER_DRYING_MINUTES = 45
 
-def compute_remaining_minutes(
-    first_ts: Optional[int],
-    avg_minutes: Optional[int],
-    now_ts: Optional[int] = None,
-) -> Tuple[Optional[int], bool]:
-    """Compute remaining minutes and whether the elapsed time was invalid/negative."""
-    if avg_minutes is None:
-        return (None, False)
+# 상태 → (duration_model 구간, 고정값)
+_FIXED_MINUTES = {"WASHING": ("washing", WASHING_MINUTES), "SPINNING": ("spinning", SPINNING_MINUTES)}
 
-    if now_ts is None:
-        now_ts = int(time.time())
 
-    if first_ts is None:
-        return (avg_minutes, False)
+class DurationLookup(Protocol):
+    def lookup(self, machine_id: Optional[int], course_name: Optional[str], segment: str) -> Optional[Tuple[int, int]]:
+        ...
 
-    try:
-        first_int = int(first_ts)
-    except Exception:
-        logger.warning("timer: invalid first_update value=%s", first_ts)
-        return (None, False)
 
-    elapsed_seconds = now_ts - first_int
-    if elapsed_seconds < 0:
-        logger.warning("timer: negative elapsed (first_ts=%s now_ts=%s)", first_ts, now_ts)
-        return (None, True)
+# (timer, avg_minutes, elapsed_time_minutes, timer_p90)
+TimerEstimate = Tuple[Optional[int], Optional[int], Optional[int], Optional[int]]
 
-    elapsed_minutes = elapsed_seconds // 60
-    remaining = avg_minutes - elapsed_minutes
-    if remaining < 0:
-        logger.info("timer: remaining time negative (elapsed=%s, avg=%s)", elapsed_minutes, avg_minutes)
-        return (None, True)
 
-    return (remaining, False)
+class TimerEstimator:
+    """세탁기 여러 대의 남은 시간을 한 번에 계산하는 배치 추정기.
+
+    - WASHING / SPINNING / DRYING(건조기): elapsed는 updated_at 기준
+    - DRYING(세탁기): elapsed는 first_update 기준, 코스 전체 소요 시간 사용
+    - 그 외 상태는 (None, None, None, None)
+
+    소요 시간은 model(duration_model)에 학습된 세탁기별/코스별 중앙값을 우선 쓰고,
+    표본이 부족하면 고정값(36/10/45분) 또는 course_avg(time_table avg_time)를 쓴다.
+    timer는 중앙값 기준, timer_p90은 p90 기준 남은 시간 (학습값이 없으면 None).
+    """
+
+    def __init__(self, course_avg: Optional[Mapping[str, int]] = None, model: Optional[DurationLookup] = None):
+        self.course_avg: Mapping[str, int] = course_avg or {}
+        self.model = model
+
+    def estimate_rows(self, rows: Iterable[Mapping], now_ts: int) -> List[TimerEstimate]:
+        """DB 행(machine_id, status, machine_type, course_name, first_ts, updated_ts) 목록을 한 번에 계산.
+
+        코스 평균/고정 시간 조회를 루프 밖으로 빼고, 상태별 분기만 남긴 단일 패스.
+        """
+        course_avg = self.course_avg
+        lookup = self.model.lookup if self.model is not None else None
+        fixed = _FIXED_MINUTES
+        none: TimerEstimate = (None, None, None, None)
+        out: List[TimerEstimate] = []
+        append = out.append
+
+        for r in rows:
+            status = (r.get("status") or "").upper()
+            phase = fixed.get(status)
+            if phase is not None:
+                segment, avg = phase
+                ts = r.get("updated_ts")
+            elif status == "DRYING":
+                segment = "total"
+                if r.get("machine_type") == "dryer":
+                    avg = DRYER_DRYING_MINUTES
+                    ts = r.get("updated_ts")
+                else:
+                    # DRYING(세탁기): 코스 전체 소요 시간 + first_update 기준, 코스가 없으면 타이머 없음
+                    course = r.get("course_name")
+                    if not course:
+                        append(none)
+                        continue
+                    avg = course_avg.get(course)
+                    ts = r.get("first_ts")
+            else:
+                append(none)
+                continue
+
+            p90 = None
+            if lookup is not None:
+                learned = lookup(r.get("machine_id"), r.get("course_name"), segment)
+                if learned is not None:
+                    avg, p90 = learned
+
+            if segment == "total" and r.get("machine_type") != "dryer" and not (avg and ts):
+                append((None, avg, None, None))
+                continue
+            if not ts:
+                append((avg, avg, 0, p90))
+                continue
+            minutes = (now_ts - int(ts)) // 60
+            append((
+                avg - minutes if avg > minutes else 0,
+                avg,
+                minutes,
+                (p90 - minutes if p90 > minutes else 0) if p90 is not None else None,
+            ))
+
+        return out
+
+    def estimate_one(self, row: Mapping, now_ts: int) -> TimerEstimate:
+        return self.estimate_rows((row,), now_ts)[0]
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# /load 응답 캐시 최대 항목 수 (LRU)
+LOAD_CACHE_MAX_ENTRIES = int(os.getenv("LOAD_CACHE_MAX_ENTRIES", "2000"))
+
+
+class LoadResponseCache:
+    """(user_id, role, state_version, 분 단위 버킷) → /load 응답 LRU 캐시.
+
+    - 상태 변경(/update, /notify_me, /reserve, 구독 변경 등)은 state_version을 올려
+      이전 키를 자연스럽게 무효화한다 (오래된 항목은 LRU로 밀려남)
+    - 분 버킷이 바뀌면 타이머/최근 완료 수가 달라지므로 새로 계산
+    - 항목마다 생성에 든 DB 조회 시간을 같이 저장해 적중 시 절약한 시간으로 집계
+    """
+
+    def __init__(self, max_entries: int = LOAD_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_db_ms = 0.0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            self._saved_db_ms += entry[1]
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, db_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, db_seconds * 1000.0)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 4) if total else None,
+                "saved_db_ms": round(self._saved_db_ms, 2),
+            }
+
+
+load_cache = LoadResponseCache()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from app.database import get_db_connection
+
+# 최근 완료 집계 구간 (초)
+RECENT_FINISHED_LOOKBACK_SECONDS = 1800
+
+# /load에 필요한 데이터를 한 번의 왕복으로 가져오는 결합 쿼리.
+# - u: 사용자 1행 (구독 세탁실이 없어도 예약 여부는 반환되도록 드라이빙 테이블로 사용)
+# - 세탁실/코스 평균/알림 구독은 세탁기 행에 LEFT JOIN
+# - 세탁실 단위 집계(예약 수, 알림 수, 최근 완료 수)는 구독 세탁실로 제한한 파생 테이블
+_LOAD_SNAPSHOT_SQL = """
+    SELECT u.user_reserved,
+           m.machine_id,
+           m.machine_uuid,
+           m.room_id,
+           COALESCE(rt.room_name, m.room_name) AS room_name,
+           m.machine_name,
+           m.status,
+           m.machine_type,
+           m.course_name,
+           UNIX_TIMESTAMP(m.first_update) AS first_ts,
+           m.spinning_update,
+           UNIX_TIMESTAMP(m.updated_at) AS updated_ts,
+           tt.avg_time,
+           tt.avg_washing_time,
+           tt.avg_spinning_time,
+           ns.machine_uuid IS NOT NULL AS is_notify,
+           COALESCE(rr.cnt, 0) AS room_reservation_count,
+           COALESCE(rn.cnt, 0) AS room_notify_count,
+           COALESCE(rf.cnt, 0) AS room_recent_finished
+    FROM (
+        SELECT %(user_id)s AS user_id,
+               (SELECT COALESCE(MAX(isreserved), 0) FROM reservation_table WHERE user_id = %(user_id)s) AS user_reserved
+    ) u
+    LEFT JOIN room_subscriptions rs ON rs.user_id = u.user_id
+    LEFT JOIN machine_table m ON m.room_id = rs.room_id
+    LEFT JOIN room_table rt ON rt.room_id = m.room_id
+    LEFT JOIN (
+        SELECT course_name,
+               MAX(avg_time) AS avg_time,
+               MAX(avg_washing_time) AS avg_washing_time,
+               MAX(avg_spinning_time) AS avg_spinning_time
+        FROM time_table
+        GROUP BY course_name
+    ) tt ON tt.course_name = m.course_name
+    LEFT JOIN notify_subscriptions ns ON ns.user_id = u.user_id AND ns.machine_uuid = m.machine_uuid
+    LEFT JOIN (
+        SELECT room_id, COUNT(*) AS cnt
+        FROM reservation_table
+        WHERE isreserved = 1
+          AND room_id IN (SELECT room_id FROM room_subscriptions WHERE user_id = %(user_id)s)
+        GROUP BY room_id
+    ) rr ON rr.room_id = m.room_id
+    LEFT JOIN (
+        SELECT m2.room_id, COUNT(*) AS cnt
+        FROM notify_subscriptions ns2
+        JOIN machine_table m2 ON ns2.machine_uuid = m2.machine_uuid
+        WHERE m2.room_id IN (SELECT room_id FROM room_subscriptions WHERE user_id = %(user_id)s)
+        GROUP BY m2.room_id
+    ) rn ON rn.room_id = m.room_id
+    LEFT JOIN (
+        SELECT room_id, COUNT(*) AS cnt
+        FROM machine_table
+        WHERE status = 'FINISHED'
+          AND timestamp >= %(lookback_ts)s
+          AND room_id IN (SELECT room_id FROM room_subscriptions WHERE user_id = %(user_id)s)
+        GROUP BY room_id
+    ) rf ON rf.room_id = m.room_id
+"""
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def fetch_load_snapshot(user_id: int, now_ts: int, cursor=None):
+    """/load 데이터를 결합 쿼리 1회로 조회.
+
+    반환값은 기존 순차 헬퍼들과 같은 모양:
+    (rows, (course_avg_map, course_washing_map, course_spinning_map), notify_set, isreserved,
+     (room_reservation_counts, room_notify_counts, recent_finished_count))
+    """
+    params = {"user_id": user_id, "lookback_ts": now_ts - RECENT_FINISHED_LOOKBACK_SECONDS}
+    if cursor is None:
+        with get_db_connection() as conn:
+            cur = conn.cursor(dictionary=True)
+            cur.execute(_LOAD_SNAPSHOT_SQL, params)
+            records = cur.fetchall() or []
+    else:
+        cursor.execute(_LOAD_SNAPSHOT_SQL, params)
+        records = cursor.fetchall() or []
+
+    isreserved = int(records[0].get("user_reserved") or 0) if records else 0
+    rows: list[dict] = []
+    course_avg_map: dict = {}
+    course_washing_map: dict = {}
+    course_spinning_map: dict = {}
+    notify_set: set = set()
+    room_reservation_counts: dict = {}
+    room_notify_counts: dict = {}
+    room_recent_finished: dict = {}
+
+    for rec in records:
+        # 세탁기가 없는 세탁실 구독 / 구독 없는 사용자 행
+        if rec.get("machine_uuid") is None:
+            continue
+        rows.append({
+            "machine_id": rec.get("machine_id"),
+            "machine_uuid": rec.get("machine_uuid"),
+            "room_id": rec.get("room_id"),
+            "room_name": rec.get("room_name"),
+            "machine_name": rec.get("machine_name"),
+            "status": rec.get("status"),
+            "machine_type": rec.get("machine_type"),
+            "course_name": rec.get("course_name"),
+            "first_ts": rec.get("first_ts"),
+            "spinning_update": rec.get("spinning_update"),
+            "updated_ts": rec.get("updated_ts"),
+        })
+
+        cn = rec.get("course_name")
+        if cn:
+            for target, field in (
+                (course_avg_map, "avg_time"),
+                (course_washing_map, "avg_washing_time"),
+                (course_spinning_map, "avg_spinning_time"),
+            ):
+                value = _to_int(rec.get(field))
+                if value is not None:
+                    target[cn] = value
+
+        if rec.get("is_notify"):
+            notify_set.add(rec["machine_uuid"])
+
+        room_id = rec.get("room_id")
+        if room_id is not None:
+            room_id = int(room_id)
+            room_reservation_counts[room_id] = int(rec.get("room_reservation_count") or 0)
+            room_notify_counts[room_id] = int(rec.get("room_notify_count") or 0)
+            room_recent_finished[room_id] = int(rec.get("room_recent_finished") or 0)
+
+    # 기존 쿼리와 같이 건수가 0인 세탁실은 집계 dict에 넣지 않음
+    room_reservation_counts = {k: v for k, v in room_reservation_counts.items() if v}
+    room_notify_counts = {k: v for k, v in room_notify_counts.items() if v}
+
+    return (
+        rows,
+        (course_avg_map, course_washing_map, course_spinning_map),
+        notify_set,
+        isreserved,
+        (room_reservation_counts, room_notify_counts, sum(room_recent_finished.values())),
+    )
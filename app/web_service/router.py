@@ -6,17 +6,29 @@ from statistics import mean
 import holidays
 import pytz
 from fastapi import APIRouter
-from fastapi import HTTPException, WebSocket, Query, Header
+from fastapi import HTTPException, WebSocket, Query, Header, Response
 from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
 from app.auth.security import (
-    hash_password, verify_password, issue_jwt, get_current_user, decode_jwt, is_admin
+    hash_password, verify_password, issue_jwt, get_current_user, decode_jwt, is_admin,
+    invalidate_cached_user,
 )
 from app.database import get_db_connection
-from app.services.ai_summary import generate_summary, get_tip_from_cache_no_ttl
+from app.notifications.subscriber_index import subscriber_index
+from app.services.ai_summary import TIP_DEADLINE_SECONDS, generate_summary_within, get_tip_from_cache_no_ttl
+from app.services.congestion import (
+    congestion_json, congestion_matrix, current_week, ensure_congestion_loaded, parse_window, weekly_congestion,
+)
+from app.services.cycle_history import CYCLE_QUERY_MAX_LIMIT, fetch_cycles
+from app.services.duration_model import duration_model
+from app.services.forecast import FORECAST_DEFAULT_HOURS, FORECAST_MAX_HOURS, build_forecasts, congestion_tip_message, forecast_tip_message
 from app.services.kma_weather import get_kma_weather_from_cache_only
-from app.utils.timer import compute_remaining_minutes
+from app.services.state_version import bump_state_version, get_state_version, get_version
+from app.utils.etag import etag_matches, make_etag, not_modified
+from app.utils.timer import TimerEstimator
+from app.web_service.load_cache import load_cache
+from app.web_service.load_query import fetch_load_snapshot
 from app.web_service.schemas import (
     RegisterRequest, RegisterResponse,
     LoginRequest, LoginResponse,
@@ -24,161 +36,22 @@ from app.web_service.schemas import (
     LoadRequest, LoadResponse, MachineItem,
     ReserveRequest, NotifyMeRequest,
     AdminAddDeviceRequest, SetFcmTokenRequest, AdminAddRoomRequest, AdminAddRoomResponse,
-    DeviceSubscribeRequest, CongestionResponse,
+    DeviceSubscribeRequest, CongestionResponse, CycleHistoryResponse, CycleItem,
     SurveyRequest, SurveyResponse,
     StartCourseRequest, StartCourseResponse,
     StatusContext, TimeContext, WeatherContext, TotalsContext, RoomSummary, AlertContext,
-    TipResponse,
+    TipResponse, ForecastResponse,
 )
-from app.websocket.manager import manager
+from app.websocket.manager import manager, resume_session
 
 router = APIRouter()
 
 
 # ===== /load 엔드포인트를 위한 비동기 헬퍼 함수들 =====
 
-async def _fetch_load_machines(user_id: int, role: str) -> list[dict]:
-    """Fetch machines data for /load endpoint."""
-    def _fetch():
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            query = """
-                SELECT m.machine_id,
-                       m.machine_uuid,
-                       m.room_id,
-                       COALESCE(rt.room_name, m.room_name) AS room_name,
-                       m.machine_name,
-                       m.status,
-                       m.machine_type,
-                       m.course_name,
-                       UNIX_TIMESTAMP(m.first_update) AS first_ts,
-                       m.spinning_update,
-                       UNIX_TIMESTAMP(m.updated_at) AS updated_ts
-                FROM machine_table m
-                JOIN room_subscriptions rs ON m.room_id = rs.room_id
-                LEFT JOIN room_table rt ON m.room_id = rt.room_id
-                WHERE rs.user_id = %s
-            """
-            cursor.execute(query, (user_id,))
-            return cursor.fetchall() or []
-    
-    return await run_in_threadpool(_fetch)
-
-
-async def _fetch_load_course_avgs(course_names: set[str]) -> tuple[dict, dict, dict]:
-    """Fetch course average times."""
-    def _fetch():
-        if not course_names:
-            return {}, {}, {}
-        
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            placeholders = ",".join(["%s"] * len(course_names))
-            cursor.execute(
-                f"SELECT course_name, avg_time, avg_washing_time, avg_spinning_time FROM time_table WHERE course_name IN ({placeholders})",
-                tuple(course_names),
-            )
-            
-            course_avg_map = {}
-            course_washing_map = {}
-            course_spinning_map = {}
-            
-            for row in cursor.fetchall() or []:
-                cn = row.get("course_name")
-                avg_time = row.get("avg_time")
-                avg_washing = row.get("avg_washing_time")
-                avg_spinning = row.get("avg_spinning_time")
-                
-                if cn and avg_time is not None:
-                    try:
-                        course_avg_map[cn] = int(avg_time)
-                    except Exception:
-                        pass
-                
-                if cn and avg_washing is not None:
-                    try:
-                        course_washing_map[cn] = int(avg_washing)
-                    except Exception:
-                        pass
-                
-                if cn and avg_spinning is not None:
-                    try:
-                        course_spinning_map[cn] = int(avg_spinning)
-                    except Exception:
-                        pass
-            
-            return course_avg_map, course_washing_map, course_spinning_map
-    
-    return await run_in_threadpool(_fetch)
-
-
-async def _fetch_load_notify_subs(user_id: int) -> set[str]:
-    """Fetch user's notify subscriptions."""
-    def _fetch():
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT machine_uuid FROM notify_subscriptions WHERE user_id = %s",
-                (user_id,),
-            )
-            rows = cursor.fetchall() or []
-            return {row["machine_uuid"] for row in rows}
-    
-    return await run_in_threadpool(_fetch)
-
-
-async def _fetch_load_user_reservation(user_id: int) -> int:
-    """Fetch user's reservation status."""
-    def _fetch():
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT MAX(isreserved) as max_reserved FROM reservation_table WHERE user_id = %s",
-                (user_id,),
-            )
-            row = cursor.fetchone()
-            return int(row.get("max_reserved") or 0) if row else 0
-    
-    return await run_in_threadpool(_fetch)
-
-
-async def _fetch_load_room_stats(room_ids: set[int], now_ts: int) -> tuple[dict, dict, int]:
-    """Fetch room-level statistics (reservations, notifications, recent finished)."""
-    def _fetch():
-        if not room_ids:
-            return {}, {}, 0
-        
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            placeholders = ",".join(["%s"] * len(room_ids))
-            
-            # Room reservations
-            cursor.execute(
-                f"SELECT room_id, COUNT(*) AS cnt FROM reservation_table WHERE room_id IN ({placeholders}) AND isreserved = 1 GROUP BY room_id",
-                tuple(room_ids),
-            )
-            room_reservation_counts = {int(rec.get("room_id")): int(rec.get("cnt") or 0) for rec in cursor.fetchall() or []}
-            
-            # Room notify counts
-            cursor.execute(
-                f"SELECT m.room_id, COUNT(*) AS cnt FROM notify_subscriptions ns JOIN machine_table m ON ns.machine_uuid = m.machine_uuid WHERE m.room_id IN ({placeholders}) GROUP BY m.room_id",
-                tuple(room_ids),
-            )
-            room_notify_counts = {int(rec.get("room_id")): int(rec.get("cnt") or 0) for rec in cursor.fetchall() or []}
-            
-            # Recent finished count
-            lookback_ts = now_ts - 1800
-            params = tuple(room_ids) + ("FINISHED", lookback_ts)
-            cursor.execute(
-                f"SELECT COUNT(*) AS cnt FROM machine_table WHERE room_id IN ({placeholders}) AND status = %s AND timestamp >= %s",
-                params,
-            )
-            row = cursor.fetchone()
-            recent_finished_count = int(row.get("cnt") or 0) if row else 0
-            
-            return room_reservation_counts, room_notify_counts, recent_finished_count
-    
-    return await run_in_threadpool(_fetch)
+async def _fetch_load_snapshot(user_id: int, now_ts: int):
+    """/load 데이터 전체를 결합 쿼리 1회(커넥션 1개, 왕복 1회)로 조회."""
+    return await run_in_threadpool(fetch_load_snapshot, user_id, now_ts)
 
 
 # ===== /tip 엔드포인트를 위한 비동기 헬퍼 함수들 =====
@@ -225,6 +98,8 @@ async def register(body: RegisterRequest):
         )
         
         conn.commit()
+    subscriber_index.add_room_subscriber(1, int(new_user_id))
+    bump_state_version("register")
     return RegisterResponse(message="register ok")
 
 @router.post("/login", response_model=LoginResponse)
@@ -249,6 +124,9 @@ async def login(body: LoginRequest):
             "UPDATE user_table SET user_token = %s, fcm_token = %s, last_login = %s WHERE user_id = %s",
             (token, body.fcm_token, current_time, user["user_id"]))
         conn.commit()
+        # 이전 토큰으로 캐시된 검증 결과 폐기 (토큰 교체)
+        invalidate_cached_user(int(user["user_id"]))
+        subscriber_index.set_token(int(user["user_id"]), body.fcm_token)
         
         logger.info(f"✅ 로그인: user_id={user['user_id']}, last_login={current_time}")
         
@@ -274,6 +152,7 @@ async def logout(body: LogoutRequest, authorization: str | None = Header(None)):
             "UPDATE user_table SET user_token = NULL, last_login = %s WHERE user_id = %s", 
             (current_time, user["user_id"]))
         conn.commit()
+    invalidate_cached_user(int(user["user_id"]))
     
     logger.info(f"✅ 로그아웃: user_id={user['user_id']}, last_login={current_time}")
     
@@ -313,10 +192,17 @@ async def device_subscribe_post(body: DeviceSubscribeRequest, authorization: str
                 (user_id, rid)
             )
         conn.commit()
+    subscriber_index.add_room_subscriber(rid, user_id)
+    bump_state_version("device_subscribe")
     return {"message": "subscribe ok"}
 
 @router.post("/load", response_model=LoadResponse)
-async def load(body: LoadRequest | None = None, authorization: str | None = Header(None)):
+async def load(
+    response: Response,
+    body: LoadRequest | None = None,
+    authorization: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
     """Load machine data with async DB queries."""
     token = _resolve_token(authorization, getattr(body, "access_token", None) if body else None)
     try:
@@ -333,22 +219,31 @@ async def load(body: LoadRequest | None = None, authorization: str | None = Head
     user_id = int(user["user_id"])
     now_ts = int(time.time())
 
-    # 순차 비동기 데이터 조회
-    rows = await _fetch_load_machines(user_id, role_in_jwt)
-    
-    course_names = {row.get("course_name") for row in rows if row.get("course_name")}
-    course_avg_map, course_washing_map, course_spinning_map = await _fetch_load_course_avgs(course_names)
-    
+    # 같은 분 안에서 상태 변경이 없으면 304 또는 캐시된 응답 재사용 (DB 조회 없음)
+    cache_key = (user_id, role_in_jwt, get_state_version(), now_ts // 60)
+    etag = make_etag("load", *cache_key)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    cached = load_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    db_started = time.perf_counter()
+
+    # 세탁기/코스 평균/알림 구독/예약/세탁실 집계를 한 번에 조회
+    (
+        rows,
+        (course_avg_map, course_washing_map, course_spinning_map),
+        notify_set,
+        isreserved,
+        (room_reservation_counts, room_notify_counts, recent_finished_count),
+    ) = await _fetch_load_snapshot(user_id, now_ts)
+
     # 디버깅: time_table에서 가져온 평균 시간 정보 확인
     logger.info(f"[TIMER DEBUG] course_avg_map: {course_avg_map}")
     logger.info(f"[TIMER DEBUG] course_washing_map: {course_washing_map}")
     logger.info(f"[TIMER DEBUG] course_spinning_map: {course_spinning_map}")
-    
-    notify_set = await _fetch_load_notify_subs(user_id)
-    isreserved = await _fetch_load_user_reservation(user_id)
-    
-    room_ids = {int(row["room_id"]) for row in rows if row.get("room_id") is not None}
-    room_reservation_counts, room_notify_counts, recent_finished_count = await _fetch_load_room_stats(room_ids, now_ts)
+    db_seconds = time.perf_counter() - db_started
 
     machines: list[MachineItem] = []
     room_stats: dict[int, dict] = defaultdict(lambda: {
@@ -360,61 +255,11 @@ async def load(body: LoadRequest | None = None, authorization: str | None = Head
 
     busy_statuses = {"WASHING", "SPINNING", "DRYING"}
 
-    for r in rows:
-        status = (r.get("status") or "").upper()
-        machine_type = r.get("machine_type") or "washer"
-        course_name = r.get("course_name")
-        first_ts_val = r.get("first_ts")
-        updated_ts = r.get("updated_ts")
-        first_ts_int = None
-        if first_ts_val is not None:
-            try:
-                first_ts_int = int(first_ts_val)
-            except Exception:
-                logger.warning("load: invalid first_ts value=%s for machine_id=%s", first_ts_val, r.get("machine_id"))
+    # 전체 세탁기 타이머를 한 번에 계산
+    estimates = TimerEstimator(course_avg_map, model=duration_model).estimate_rows(rows, now_ts)
 
-        timer_val: int | None = None
-        avg_minutes_val: int | None = None
-        elapsed_minutes_val: int | None = None
-        
-        if status == "WASHING":
-            # WASHING: 고정값 avg_minutes=36, elapsed는 updated_at 기준
-            avg_minutes_val = 36
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes_val = elapsed_seconds // 60
-                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-            else:
-                elapsed_minutes_val = 0
-                timer_val = 36
-        elif status == "SPINNING":
-            # SPINNING: 고정값 avg_minutes=10, elapsed는 updated_at 기준
-            avg_minutes_val = 10
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes_val = elapsed_seconds // 60
-                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-            else:
-                elapsed_minutes_val = 0
-                timer_val = 10
-        elif status == "DRYING":
-            if machine_type == "dryer":
-                # DRYING (건조기): 고정값 avg_minutes=45, elapsed는 updated_at 기준
-                avg_minutes_val = 45
-                if updated_ts:
-                    elapsed_seconds = now_ts - int(updated_ts)
-                    elapsed_minutes_val = elapsed_seconds // 60
-                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-                else:
-                    elapsed_minutes_val = 0
-                    timer_val = 45
-            elif course_name:
-                # DRYING (세탁기): 기존 로직 유지 (avg_time 사용)
-                avg_minutes_val = course_avg_map.get(course_name)
-                if avg_minutes_val and first_ts_int:
-                    elapsed_seconds = now_ts - first_ts_int
-                    elapsed_minutes_val = elapsed_seconds // 60
-                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
+    for r, (timer_val, avg_minutes_val, elapsed_minutes_val, timer_p90) in zip(rows, estimates):
+        status = (r.get("status") or "").upper()
 
         machines.append(
             MachineItem(
@@ -427,6 +272,7 @@ async def load(body: LoadRequest | None = None, authorization: str | None = Head
                 timer=timer_val,
                 avg_minutes=avg_minutes_val,
                 elapsed_time_minutes=elapsed_minutes_val,
+                timer_p90=timer_p90,
             )
         )
 
@@ -510,11 +356,13 @@ async def load(body: LoadRequest | None = None, authorization: str | None = Head
         alerts=alerts,
     )
 
-    return LoadResponse(
+    load_response = LoadResponse(
         isreserved=isreserved,
         machine_list=machines,
         status_context=status_context,
     )
+    load_cache.put(cache_key, load_response, db_seconds)
+    return load_response
 
 
 async def _fetch_machines_data(user_id: int) -> tuple[list, dict]:
@@ -524,9 +372,10 @@ async def _fetch_machines_data(user_id: int) -> tuple[list, dict]:
             cursor = conn.cursor(dictionary=True)
             cursor.execute(
                 """
-                SELECT m.machine_id, m.room_id, m.status, m.course_name,
+                SELECT m.machine_id, m.room_id, m.status, m.machine_type, m.course_name,
                        COALESCE(rt.room_name, m.room_name) AS room_name,
-                       UNIX_TIMESTAMP(m.first_update) AS first_ts
+                       UNIX_TIMESTAMP(m.first_update) AS first_ts,
+                       UNIX_TIMESTAMP(m.updated_at) AS updated_ts
                 FROM machine_table m
                 JOIN room_subscriptions rs ON m.room_id = rs.room_id
                 LEFT JOIN room_table rt ON m.room_id = rt.room_id
@@ -614,41 +463,30 @@ async def _fetch_recent_finished(now_ts: int) -> int:
 
 
 async def _fetch_congestion_stats() -> dict:
-    """Fetch congestion statistics asynchronously (9시~21시만)."""
-    def _fetch():
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute(
-                    "SELECT busy_day, busy_time, busy_count FROM busy_table WHERE busy_time BETWEEN 9 AND 21"
-                )
-                rows = cursor.fetchall() or []
-                
-                days = ["월", "화", "수", "목", "금", "토", "일"]
-                congestion_stats = {d: [0] * 24 for d in days}
-                
-                for row in rows:
-                    day = str(row.get("busy_day") or "")
-                    hour = row.get("busy_time")
-                    count = row.get("busy_count")
-                    try:
-                        hour_int = int(hour)
-                    except Exception:
-                        continue
-                    if day in congestion_stats and 0 <= hour_int <= 23:
-                        congestion_stats[day][hour_int] = int(count or 0)
-                
-                return congestion_stats
-        except Exception as exc:
-            logger.warning(f"Congestion stats fetch failed: {exc}")
-            return {d: [0] * 24 for d in ["월", "화", "수", "목", "금", "토", "일"]}
-    
-    return await run_in_threadpool(_fetch)
+    """Congestion statistics from the in-memory matrix (9시~21시만)."""
+    try:
+        if not congestion_matrix.loaded:
+            await run_in_threadpool(congestion_matrix.ensure_loaded)
+        return congestion_matrix.snapshot(9, 21)
+    except Exception as exc:
+        logger.warning(f"Congestion stats fetch failed: {exc}")
+        return {d: [0] * 24 for d in ["월", "화", "수", "목", "금", "토", "일"]}
 
 
 @router.get("/tip", response_model=TipResponse)
-async def get_tip(authorization: str | None = Header(None)):
-    """Generate AI-powered laundry room status tip (fully async)."""
+async def get_tip(
+    response: Response,
+    room_id: int | None = Query(None),
+    authorization: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """Generate AI-powered laundry room status tip (fully async).
+
+    room_id를 생략하면 사용자가 구독한 세탁실 중 가장 작은 ID의 TIP을 반환.
+    캐시가 비었으면 AI 생성을 TIP_DEADLINE_SECONDS까지만 기다리고, 넘으면 통계 기반 로컬 TIP을 반환
+    (생성은 백그라운드로 계속되어 다음 요청부터 캐시에서 응답).
+    """
+    started = time.monotonic()
     token = _resolve_token(authorization, None)
     try:
         user = get_current_user(token)
@@ -656,13 +494,24 @@ async def get_tip(authorization: str | None = Header(None)):
         raise HTTPException(status_code=401, detail="invalid token")
 
     user_id = int(user["user_id"])
+    if room_id is None:
+        user_rooms = subscriber_index.user_rooms(user_id)
+        room_id = user_rooms[0] if user_rooms else None
+
+    # 캐시된 TIP 세대가 같으면 클라이언트가 가진 TIP을 그대로 사용 (DB 조회 없음)
+    etag = make_etag("tip", room_id, get_version("tip"))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
     now_ts = int(time.time())
     now_dt = datetime.now(tz=pytz.timezone("Asia/Seoul"))
     kr_holidays = holidays.country_holidays("KR")
 
     # 1단계: TTL 없이 캐시된 TIP이 있으면 바로 반환 (AI 호출/추가 DB 조회 없음)
-    cached_tip = await run_in_threadpool(get_tip_from_cache_no_ttl)
+    cached_tip = await run_in_threadpool(get_tip_from_cache_no_ttl, room_id)
     if cached_tip:
+        # ETag는 캐시에서 꺼낸 TIP에만 부여 (실시간 생성/폴백 응답은 매번 새로 계산)
+        response.headers["ETag"] = etag
         return TipResponse(tip_message=cached_tip)
 
     # 순차 데이터 조회 (DB 연결 풀 고갈 방지)
@@ -682,29 +531,21 @@ async def get_tip(authorization: str | None = Header(None)):
     # Aggregate by room
     room_stats = defaultdict(lambda: {"total": 0, "busy": 0, "room_name": ""})
     room_remaining_times = defaultdict(list)
+    # 남은 시간은 /load·웹소켓 타이머와 같은 추정기 (학습된 소요 시간 우선)
+    estimates = TimerEstimator(course_avg_map, model=duration_model).estimate_rows(machines, now_ts)
     
-    for m in machines:
-        room_id = m.get("room_id")
+    for m, (timer_minutes, _, _, _) in zip(machines, estimates):
+        m_room_id = m.get("room_id")
         room_name = m.get("room_name", "")
         status = (m.get("status") or "").upper()
         
-        room_stats[room_id]["room_name"] = room_name
-        room_stats[room_id]["total"] += 1
+        room_stats[m_room_id]["room_name"] = room_name
+        room_stats[m_room_id]["total"] += 1
         
         if status in {"WASHING", "SPINNING"}:
-            room_stats[room_id]["busy"] += 1
-            
-            course_name = m.get("course_name")
-            first_ts = m.get("first_ts")
-            if course_name and first_ts is not None:
-                avg_minutes = course_avg_map.get(course_name)
-                if avg_minutes:
-                    try:
-                        remaining, negative = compute_remaining_minutes(int(first_ts), avg_minutes, now_ts)
-                        if not negative and remaining is not None:
-                            room_remaining_times[room_id].append(remaining)
-                    except Exception:
-                        pass
+            room_stats[m_room_id]["busy"] += 1
+            if timer_minutes is not None:
+                room_remaining_times[m_room_id].append(timer_minutes)
 
     # Build time context
     weekday_labels = ["월", "화", "수", "목", "금", "토", "일"]
@@ -725,21 +566,21 @@ async def get_tip(authorization: str | None = Header(None)):
 
     # Build room summaries
     room_summaries = []
-    for room_id, stats in room_stats.items():
+    for rid, stats in room_stats.items():
         total = stats["total"]
         busy = stats["busy"]
         idle = max(total - busy, 0)
-        reservation_count = room_reservation_counts.get(room_id, 0)
-        notify_count = room_notify_counts.get(room_id, 0)
+        reservation_count = room_reservation_counts.get(rid, 0)
+        notify_count = room_notify_counts.get(rid, 0)
         
-        remaining_list = room_remaining_times.get(room_id, [])
+        remaining_list = room_remaining_times.get(rid, [])
         avg_remaining = mean(remaining_list) if remaining_list else None
         max_remaining = max(remaining_list) if remaining_list else None
         
         per_cycle = None
         if stats.get("room_name"):
             for m in machines:
-                if m.get("room_id") == room_id and m.get("course_name"):
+                if m.get("room_id") == rid and m.get("course_name"):
                     per_cycle = course_avg_map.get(m["course_name"])
                     if per_cycle:
                         break
@@ -750,7 +591,7 @@ async def get_tip(authorization: str | None = Header(None)):
 
         room_summaries.append(
             RoomSummary(
-                room_id=room_id,
+                room_id=rid,
                 room_name=stats["room_name"],
                 machines_total=total,
                 machines_busy=busy,
@@ -784,21 +625,35 @@ async def get_tip(authorization: str | None = Header(None)):
         alerts=alerts,
     )
 
-    # Generate AI tip (비동기 처리)
+    # 통계 예측 (추천 시간대는 로컬에서 계산, AI는 문장만 다듬음)
+    try:
+        forecasts = await run_in_threadpool(build_forecasts, None, user_id, FORECAST_DEFAULT_HOURS, now_dt)
+    except Exception as exc:
+        logger.warning(f"Forecast failed: {exc}")
+        forecasts = []
+
+    # Generate AI tip (남은 지연 예산만큼만 대기)
     tip_message = None
     try:
         status_dict = status_context.model_dump()
         status_dict["congestion_stats"] = congestion_stats
+        status_dict["forecast"] = forecasts
         status_dict["system_info"] = {
             "operating_hours": "09:00-21:00",
             "operating_hours_description": "세탁기 사용 가능 시간은 9시부터 21시까지입니다"
         }
-        tip_message = await run_in_threadpool(generate_summary, status_dict)
+        budget = TIP_DEADLINE_SECONDS - (time.monotonic() - started)
+        tip_message = await generate_summary_within(status_dict, budget, room_id)
     except Exception as exc:
         logger.warning(f"AI tip generation failed: {exc}")
     
     if not tip_message:
-        tip_message = "세탁실 정보를 불러올 수 없습니다."
+        room_forecasts = [fc for fc in forecasts if fc["room_id"] == room_id] or forecasts
+        tip_message = (
+            forecast_tip_message(room_forecasts, now_dt)
+            or congestion_tip_message(congestion_stats, now_dt)
+            or "세탁실 정보를 불러올 수 없습니다."
+        )
     
     return TipResponse(tip_message=tip_message)
 
@@ -838,6 +693,7 @@ async def reserve(body: ReserveRequest, authorization: str | None = Header(None)
                 "INSERT INTO room_subscriptions (user_id, room_id) VALUES (%s, %s)",
                 (user_id, body.room_id)
             )
+        machine_uuids = []
         if body.isreserved == 1:
             cursor.execute(
                 "SELECT machine_uuid FROM machine_table WHERE room_id = %s AND machine_uuid IS NOT NULL",
@@ -853,6 +709,10 @@ async def reserve(body: ReserveRequest, authorization: str | None = Header(None)
                     tuple(params),
                 )
         conn.commit()
+    subscriber_index.add_room_subscriber(body.room_id, user_id)
+    if machine_uuids:
+        subscriber_index.remove_notify_subscriber(user_id, machine_uuids)
+    bump_state_version("reserve")
     return {"message": "reserve ok"}
 
 @router.post("/notify_me")
@@ -900,6 +760,11 @@ async def notify_me(body: NotifyMeRequest, authorization: str | None = Header(No
                 (user_id, machine_uuid)
             )
         conn.commit()
+    if body.isusing == 1:
+        subscriber_index.add_notify_subscriber(machine_uuid, user_id)
+    else:
+        subscriber_index.remove_notify_subscriber(user_id, [machine_uuid])
+    bump_state_version("notify_me")
     return {"message": "notify ok"}
 
 @router.post("/admin/add_device")
@@ -929,6 +794,7 @@ async def admin_add_device(body: AdminAddDeviceRequest, authorization: str | Non
             (body.machine_id, body.machine_name, body.room_id, room_name, 0, 0, "IDLE", int(time.time()), int(time.time()))
         )
         conn.commit()
+    bump_state_version("admin_add_device")
     return {"message": "admin add ok"}
 
 @router.post("/admin/add_room", response_model=AdminAddRoomResponse)
@@ -954,6 +820,8 @@ async def admin_add_room(body: AdminAddRoomRequest, authorization: str | None =
             # Ignore duplicate or fk errors silently
             pass
         conn.commit()
+    subscriber_index.add_room_subscriber(int(new_id), int(user["user_id"]))
+    bump_state_version("admin_add_room")
     return {"room_id": int(new_id)}
 
 @router.post("/set_fcm_token")
@@ -968,6 +836,8 @@ async def set_fcm_token(body: SetFcmTokenRequest, authorization: str | None = He
         cursor = conn.cursor()
         cursor.execute("UPDATE user_table SET fcm_token = %s WHERE user_id = %s", (body.fcm_token, int(user["user_id"])) )
         conn.commit()
+    invalidate_cached_user(int(user["user_id"]))
+    subscriber_index.set_token(int(user["user_id"]), body.fcm_token)
     return {"message": "set fcm token ok"}
 
 
@@ -1023,7 +893,24 @@ async def start_course(body: StartCourseRequest, authorization: str | None = Hea
                     time_row.get("avg_time"),
                 )
 
-        timer_minutes, negative_time = compute_remaining_minutes(first_ts, avg_minutes, now_ts)
+        # 코스 전체 남은 시간: 세탁기 DRYING 행과 같은 계산 (학습된 코스 소요 시간 우선, 없으면 avg_time)
+        estimator = TimerEstimator({body.course_name: avg_minutes} if avg_minutes is not None else {}, model=duration_model)
+        timer_minutes, course_minutes, elapsed_minutes, _ = estimator.estimate_one(
+            {
+                "machine_id": body.machine_id,
+                "status": "DRYING",
+                "machine_type": "washer",
+                "course_name": body.course_name,
+                "first_ts": first_ts if first_ts is not None else now_ts,
+            },
+            now_ts,
+        )
+        # first_update가 미래이거나 코스 시간을 넘겼으면 (이전 사이클 값) 코스를 설정하지 않음
+        negative_time = (
+            elapsed_minutes is not None
+            and course_minutes is not None
+            and (elapsed_minutes < 0 or elapsed_minutes > course_minutes)
+        )
         if negative_time:
             timer_minutes = None
 
@@ -1048,6 +935,7 @@ async def start_course(body: StartCourseRequest, authorization: str | None = Hea
         cursor.execute(update_sql, tuple(params))
 
         conn.commit()
+        bump_state_version("start_course")
 
         logger.info(
             "✅ %s 세탁 시작: %s (avg=%s분, timer=%s분)",
@@ -1064,8 +952,10 @@ async def start_course(body: StartCourseRequest, authorization: str | None = Hea
 
 @router.get("/rooms")
 async def get_rooms(
+    response: Response,
     authorization: str | None = Header(None),
-    access_token: str | None = Query(None)
+    access_token: str | None = Query(None),
+    if_none_match: str | None = Header(None),
 ):
     token = _resolve_token(authorization, access_token)
     try:
@@ -1074,6 +964,11 @@ async def get_rooms(
         raise HTTPException(status_code=401, detail="invalid token")
 
     user_id = int(user["user_id"])
+    # 구독/방 추가는 state 버전을 올리므로 버전이 같으면 목록도 같음
+    etag = make_etag("rooms", user_id, get_state_version())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     with get_db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
@@ -1092,7 +987,12 @@ async def get_rooms(
 
 
 @router.get("/statistics/congestion", response_model=CongestionResponse)
-async def get_congestion_statistics(authorization: str | None = Header(None)):
+async def get_congestion_statistics(
+    room_id: int | None = Query(None, description="세탁실 ID (없으면 전체 세탁실)"),
+    window: str = Query("all", description="all(전체 누적) | decay(지수 감쇠) | <N>w(최근 N주, 예: 4w)"),
+    authorization: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
     """요일/시간대별 혼잡도(사용 수) 집계 반환.
 
     응답 형식 예시:
@@ -1102,6 +1002,7 @@ async def get_congestion_statistics(authorization: str | None = Header(None)):
       ...
       "일": [0..23]
     }
+    window=decay는 소수점 값(최근 주일수록 가중치가 큼)을 반환한다.
     """
     # 인증 (헤더 Bearer 토큰 필수)
     token = _resolve_token(authorization, None)
@@ -1110,29 +1011,98 @@ async def get_congestion_statistics(authorization: str | None = Header(None)):
     except Exception:
         raise HTTPException(status_code=401, detail="invalid token")
 
-    days = ["월", "화", "수", "목", "금", "토", "일"]
-    result = {d: [0] * 24 for d in days}
+    try:
+        window = parse_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # 기동 시 적재에 실패했을 때만 DB 조회 (적재 시 congestion 버전이 바뀔 수 있어 ETag보다 먼저)
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT busy_day, busy_time, busy_count FROM busy_table")
-            rows = cursor.fetchall() or []
-
-            for row in rows:
-                day = str(row.get("busy_day") or "")
-                hour = row.get("busy_time")
-                count = row.get("busy_count")
-                try:
-                    hour_int = int(hour)
-                except Exception:
-                    continue
-                if day in result and 0 <= hour_int <= 23:
-                    result[day][hour_int] = int(count or 0)
+        if not (congestion_matrix.loaded and weekly_congestion.loaded):
+            await run_in_threadpool(ensure_congestion_loaded)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"failed to load congestion: {str(e)}")
 
-    return result
+    # 주가 바뀌면 윈도우/감쇠 값이 달라지므로 현재 주도 ETag에 포함
+    etag = make_etag("congestion", get_version("congestion"), room_id, window, current_week())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # 미리 직렬화된 JSON을 그대로 반환 (busy_table 스캔/dict 재구성 없음)
+    return Response(
+        content=congestion_json(room_id, window),
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
+
+
+@router.get("/forecast", response_model=ForecastResponse)
+async def get_forecast(
+    response: Response,
+    room_id: int | None = Query(None, description="세탁실 ID (없으면 구독한 세탁실 전체)"),
+    hours: int = Query(FORECAST_DEFAULT_HOURS, ge=1, le=FORECAST_MAX_HOURS),
+    authorization: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """세탁실별 다음 N시간 예상 대기 시간과 추천 시간대.
+
+    혼잡도 통계(세탁실별 최근 주 평균), 현재 사용 중인 세탁기의 남은 시간,
+    예약 대기 수, 학습된 세탁 소요 시간을 조합해 로컬에서 계산한다 (AI 호출 없음).
+    """
+    token = _resolve_token(authorization, None)
+    try:
+        user = get_current_user(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="invalid token")
+
+    user_id = int(user["user_id"])
+    now_dt = datetime.now(tz=pytz.timezone("Asia/Seoul"))
+
+    # 상태/혼잡도가 그대로고 같은 분이면 이전 예측과 동일
+    etag = make_etag(
+        "forecast", user_id, room_id, hours,
+        get_state_version(), get_version("congestion"), int(now_dt.timestamp()) // 60,
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    try:
+        forecasts = await run_in_threadpool(
+            build_forecasts, [room_id] if room_id is not None else None, user_id, hours, now_dt
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"failed to build forecast: {str(e)}")
+
+    response.headers["ETag"] = etag
+    return ForecastResponse(
+        generated_at=now_dt.isoformat(),
+        rooms=forecasts,
+        tip_message=forecast_tip_message(forecasts, now_dt),
+    )
+
+
+@router.get("/statistics/cycles", response_model=CycleHistoryResponse)
+async def get_cycle_history(
+    room_id: int | None = Query(None),
+    machine_id: int | None = Query(None),
+    since: int | None = Query(None, description="finished_at 하한 (Unix timestamp, 포함)"),
+    until: int | None = Query(None, description="finished_at 상한 (Unix timestamp, 미포함)"),
+    limit: int = Query(100, ge=1, le=CYCLE_QUERY_MAX_LIMIT),
+    authorization: str | None = Header(None),
+):
+    """완료된 세탁/건조 사이클 기록 조회 (finished_at 최신순)."""
+    token = _resolve_token(authorization, None)
+    try:
+        get_current_user(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="invalid token")
+
+    try:
+        rows = await run_in_threadpool(fetch_cycles, room_id, machine_id, since, until, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"failed to load cycles: {str(e)}")
+
+    return CycleHistoryResponse(count=len(rows), cycles=[CycleItem(**row) for row in rows])
 
 
 @router.post("/survey", response_model=SurveyResponse)
@@ -1191,26 +1161,24 @@ async def debug_dump():
     return result
 
 @router.websocket("/status_update")
-async def status_update(websocket: WebSocket, token: str = Query(...)):
-    # JWT 인증
+async def status_update(
+    websocket: WebSocket,
+    token: str = Query(...),
+    last_seq: int | None = Query(None),
+):
+    # JWT 인증 (DB의 현재 토큰과 일치 확인, 검증 캐시 사용)
     try:
-        payload = decode_jwt(token)
-        user_id = int(payload.get("sub"))
-        # DB의 현재 토큰과 일치 확인
-        with get_db_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT user_token FROM user_table WHERE user_id = %s", (user_id,))
-            row = cursor.fetchone()
-            if not row or row.get("user_token") != token:
-                await websocket.close(code=1008)
-                return
+        user = get_current_user(token)
+        user_id = int(user["user_id"])
     except Exception:
         await websocket.close(code=1008)
         return
 
-    logger.info("WS handshake success user_id={}", user_id)
+    logger.info("WS handshake success user_id={} last_seq={}", user_id, last_seq)
     await manager.connect(user_id, websocket)
     try:
+        if last_seq is not None:
+            await resume_session(user_id, websocket, last_seq)
         while True:
             # 클라이언트 keep-alive 수신(내용은 사용하지 않음)
             msg = await websocket.receive_text()
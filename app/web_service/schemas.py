@@ -18,6 +18,9 @@ class WeatherContext(BaseModel):
     forecast_time: Optional[str] = None
     precipitation_probability: Optional[float] = None
     precipitation_type: Optional[str] = None
+    precipitation_type_code: Optional[int] = None
+    sky_condition: Optional[str] = None
+    sky_condition_code: Optional[int] = None
     rainfall_last_hour: Optional[float] = None
     temperature: Optional[float] = None
     humidity: Optional[float] = None
@@ -101,6 +104,7 @@ class MachineItem(BaseModel):
     timer: int | None = None  # 남은 시간(분)
     avg_minutes: int | None = None  # 전체 코스 예상 시간(분)
     elapsed_time_minutes: int | None = None  # 경과 시간(분)
+    timer_p90: int | None = None  # 남은 시간 p90(분, 학습된 소요 시간이 있을 때만)
 
 
 class LoadResponse(BaseModel):
@@ -147,11 +151,33 @@ class SetFcmTokenRequest(BaseModel):
     fcm_token: str
 
 
-class CongestionResponse(RootModel[Dict[str, Annotated[List[int], Field(min_length=24, max_length=24)]]]):
-    """요일 키(월~일) -> 24길이 정수 배열 매핑"""
+class CongestionResponse(RootModel[Dict[str, Annotated[List[int | float], Field(min_length=24, max_length=24)]]]):
+    """요일 키(월~일) -> 24길이 배열 매핑 (window=decay일 때만 소수)"""
     pass
 
 
+class CycleItem(BaseModel):
+    cycle_id: int
+    machine_id: int
+    room_id: int | None = None
+    machine_type: str
+    course_name: str | None = None
+    started_at: int  # Unix timestamp (초)
+    spinning_at: int | None = None
+    finished_at: int
+    washing_seconds: int | None = None
+    spinning_seconds: int | None = None
+    total_seconds: int | None = None
+    wash_avg_magnitude: float | None = None
+    wash_max_magnitude: float | None = None
+    spin_max_magnitude: float | None = None
+
+
+class CycleHistoryResponse(BaseModel):
+    count: int
+    cycles: List[CycleItem]
+
+
 class SurveyRequest(BaseModel):
     satisfaction: int = Field(..., ge=1, le=5, description="만족도 (1-5)")
     suggestion: str = Field(..., description="건의사항")
@@ -171,4 +197,29 @@ class StartCourseResponse(BaseModel):
 
 
 class TipResponse(BaseModel):
-    tip_message: str
\ No newline at end of file
+    tip_message: str
+
+
+class ForecastSlot(BaseModel):
+    start: str  # 시간대 시작 (ISO 8601, KST). 첫 항목은 현재 시각
+    weekday: str
+    hour: int
+    expected_busy: float  # 예상 사용 대수
+    predicted_wait_minutes: int | None = None  # 예상 대기 시간(분)
+
+
+class RoomForecast(BaseModel):
+    room_id: int
+    room_name: str
+    machines_total: int
+    machines_busy: int
+    reservation_count: int
+    cycle_minutes: int  # 세탁 1회 예상 소요 시간(분)
+    slots: List[ForecastSlot]
+    recommended: ForecastSlot | None = None
+
+
+class ForecastResponse(BaseModel):
+    generated_at: str
+    rooms: List[RoomForecast]
+    tip_message: str | None = None
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# 방별로 보관하는 최근 이벤트 수 (재접속 시 이 범위 안에서만 이어받기 가능)
+ROOM_EVENT_BUFFER_SIZE = int(os.getenv("WS_ROOM_EVENT_BUFFER_SIZE", "256"))
+
+# (seq, 수신 대상 user_id 집합 또는 None(방 구독자 전체), 전송한 payload)
+_BufferedEvent = Tuple[int, Optional[FrozenSet[int]], dict]
+
+
+class RoomEventBuffer:
+    """WebSocket 이벤트에 단조 증가 seq를 부여하고 방 단위 링 버퍼에 보관.
+
+    - seq는 프로세스 전역 카운터 (방이 달라도 비교 가능)
+    - room_status 이벤트는 audience=None (방 구독자 전체)
+    - notify 이벤트는 audience=해당 세탁기 구독자 집합
+    - 재접속한 클라이언트는 last_seq 이후 이벤트만 다시 받고,
+      이미 버퍼에서 밀려난 구간이 필요하면 None을 받아 전체 스냅샷으로 폴백
+    """
+
+    def __init__(self, maxlen: int = ROOM_EVENT_BUFFER_SIZE):
+        self.maxlen = max(1, maxlen)
+        self._seq = 0
+        self._rooms: Dict[Optional[int], Deque[_BufferedEvent]] = {}
+        # 방별로 버퍼에서 밀려난 마지막 seq
+        self._evicted_upto: Dict[Optional[int], int] = {}
+        # 사용자별로 밀려난 대상 지정(notify) 이벤트의 마지막 seq (구독하지 않은 방의 버퍼 포함)
+        self._evicted_user_upto: Dict[int, int] = {}
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def next_seq(self) -> int:
+        """버퍼에 저장하지 않는 이벤트(timer_sync 등)용 seq 발급."""
+        self._seq += 1
+        return self._seq
+
+    def append(
+        self,
+        room_id: Optional[int],
+        payload: dict,
+        audience: Optional[Iterable[int]] = None,
+    ) -> dict:
+        """payload에 seq를 붙여 방 버퍼에 저장하고, 전송할 이벤트를 반환."""
+        seq = self.next_seq()
+        event = {**payload, "seq": seq}
+        buf = self._rooms.get(room_id)
+        if buf is None:
+            buf = deque(maxlen=self.maxlen)
+            self._rooms[room_id] = buf
+        if len(buf) == buf.maxlen:
+            evicted_seq, evicted_audience, _ = buf[0]
+            self._evicted_upto[room_id] = evicted_seq
+            for uid in evicted_audience or ():
+                self._evicted_user_upto[uid] = evicted_seq
+        buf.append((seq, frozenset(audience) if audience is not None else None, event))
+        return event
+
+    def replay(self, user_id: int, room_ids: Iterable[int], last_seq: int) -> Optional[List[dict]]:
+        """last_seq 이후 user_id가 받아야 할 이벤트를 seq 순으로 반환.
+
+        구독 중인 방의 버퍼가 이미 last_seq 이후 이벤트를 버렸거나, 다른 방 버퍼라도
+        user_id 대상 이벤트를 last_seq 이후에 버렸거나, last_seq가 현재 seq보다 크면
+        (서버 재시작 등) None을 반환한다.
+        """
+        if last_seq < 0 or last_seq > self._seq:
+            return None
+
+        rooms = set(room_ids)
+        for rid in rooms:
+            if self._evicted_upto.get(rid, 0) > last_seq:
+                return None
+        # 구독하지 않은 방 버퍼에서는 대상 지정 이벤트만 읽으므로 그 이벤트가 밀려났는지만 확인
+        if self._evicted_user_upto.get(user_id, 0) > last_seq:
+            return None
+
+        events: List[Tuple[int, dict]] = []
+        for rid, buf in self._rooms.items():
+            if not buf or buf[-1][0] <= last_seq:
+                continue
+            for seq, audience, event in buf:
+                if seq <= last_seq:
+                    continue
+                if audience is None:
+                    if rid in rooms:
+                        events.append((seq, event))
+                elif user_id in audience:
+                    events.append((seq, event))
+
+        events.sort(key=lambda item: item[0])
+        return [event for _, event in events]
+
+
+event_buffer = RoomEventBuffer()
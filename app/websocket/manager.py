@@ -2,13 +2,16 @@ import asyncio
 import json
 import time
 from contextlib import suppress
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from fastapi import WebSocket
 from loguru import logger
 
 from app.database import get_db_connection
-from app.notifications.fcm import send_to_tokens
+from app.notifications.subscriber_index import subscriber_index
+from app.services.duration_model import duration_model
+from app.utils.timer import TimerEstimator
+from app.websocket.event_buffer import event_buffer
 
 
 class ConnectionManager:
@@ -88,11 +91,34 @@ TIMER_SYNC_INTERVAL_SECONDS = 1
 _timer_sync_task: asyncio.Task | None = None
 
 
+def _fetch_course_avg_map(cursor, course_names) -> Dict[str, int]:
+    """time_table에서 코스별 평균 소요 시간(avg_time, 분) 조회."""
+    course_names = [c for c in set(course_names) if c]
+    course_avg_map: Dict[str, int] = {}
+    if not course_names:
+        return course_avg_map
+    placeholders = ",".join(["%s"] * len(course_names))
+    cursor.execute(
+        f"SELECT course_name, avg_time FROM time_table WHERE course_name IN ({placeholders})",
+        tuple(course_names),
+    )
+    for course_row in cursor.fetchall() or []:
+        cname = course_row.get("course_name")
+        avg_time = course_row.get("avg_time")
+        if cname and avg_time is not None:
+            try:
+                course_avg_map[cname] = int(avg_time)
+            except Exception:
+                logger.warning(f"avg_time parsing failed for course={cname} value={avg_time}")
+    return course_avg_map
+
+
 async def broadcast_machine_status(machine_id: int, status: str):
     """Convenience helper: broadcast both room_status and notify for a machine.
 
-    - room_status: 방 구독자 UI 업데이트 및 FINISHED 시 방 단위 FCM
-    - notify: 개별 구독자 알림 및 FINISHED 시 개별 FCM + 자동 구독 해제
+    - room_status: 방 구독자 UI 업데이트
+    - notify: 개별 구독자 알림 및 FINISHED 시 자동 구독 해제
+    - FINISHED FCM 푸시는 /update 트랜잭션에서 notification_outbox에 기록되어 outbox 발송 루프가 전송
     """
     await broadcast_room_status(machine_id, status)
     await broadcast_notify(machine_id, status)
@@ -100,15 +126,15 @@ async def broadcast_machine_status(machine_id: int, status: str):
 
 async def broadcast_room_status(machine_id: int, status: str):
     """
-    방 구독자에게 WebSocket + FCM 알림 전송
-    ❗️ FINISHED 상태일 때만 FCM 푸시 알림 전송 (알림 스팸 방지)
+    방 구독자에게 WebSocket 알림 전송
+    ❗️ FINISHED FCM 푸시는 notification_outbox 경유 (app.notifications.outbox)
     """
     now_ts = int(time.time())
 
     with get_db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
-            "SELECT room_id, room_name, machine_name, machine_type, course_name, status, UNIX_TIMESTAMP(first_update) AS first_ts, UNIX_TIMESTAMP(updated_at) AS updated_ts FROM machine_table WHERE machine_id = %s",
+            "SELECT machine_id, room_id, room_name, machine_name, machine_type, course_name, status, UNIX_TIMESTAMP(first_update) AS first_ts, UNIX_TIMESTAMP(updated_at) AS updated_ts FROM machine_table WHERE machine_id = %s",
             (machine_id,)
         )
         m = cursor.fetchone()
@@ -121,166 +147,45 @@ async def broadcast_room_status(machine_id: int, status: str):
         machine_name = m.get("machine_name", "세탁기")
         machine_type = m.get("machine_type", "washer")
         course_name = m.get("course_name")
-        first_ts = m.get("first_ts")
-        updated_ts = m.get("updated_ts")
         machine_status = m.get("status", "").upper()
         
-        avg_minutes = None
-        elapsed_minutes = None
-        timer_minutes = None
-
-        if machine_status == "WASHING":
-            # WASHING: 고정값 avg_minutes=36, elapsed는 updated_at 기준
-            avg_minutes = 36
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes = elapsed_seconds // 60
-                timer_minutes = max(0, avg_minutes - elapsed_minutes)
-            else:
-                elapsed_minutes = 0
-                timer_minutes = 36
-        elif machine_status == "SPINNING":
-            # SPINNING: 고정값 avg_minutes=10, elapsed는 updated_at 기준
-            avg_minutes = 10
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes = elapsed_seconds // 60
-                timer_minutes = max(0, avg_minutes - elapsed_minutes)
-            else:
-                elapsed_minutes = 0
-                timer_minutes = 10
-        elif machine_status == "DRYING":
-            if machine_type == "dryer":
-                # DRYING (건조기): 고정값 avg_minutes=45, elapsed는 updated_at 기준
-                avg_minutes = 45
-                if updated_ts:
-                    elapsed_seconds = now_ts - int(updated_ts)
-                    elapsed_minutes = elapsed_seconds // 60
-                    timer_minutes = max(0, avg_minutes - elapsed_minutes)
-                else:
-                    elapsed_minutes = 0
-                    timer_minutes = 45
-            elif course_name:
-                # DRYING (세탁기): 기존 로직 유지 (avg_time 사용)
-                cursor.execute(
-                    "SELECT avg_time FROM time_table WHERE course_name = %s",
-                    (course_name,)
-                )
-                row_avg = cursor.fetchone()
-                if row_avg:
-                    try:
-                        avg_time = row_avg.get("avg_time")
-                        if avg_time and first_ts:
-                            avg_minutes = int(avg_time)
-                            elapsed_seconds = now_ts - int(first_ts)
-                            elapsed_minutes = elapsed_seconds // 60
-                            timer_minutes = max(0, avg_minutes - elapsed_minutes)
-                    except Exception as e:
-                        logger.warning("broadcast_room_status: time calculation failed course=%s error=%s", course_name, str(e))
+        timer_minutes, avg_minutes, elapsed_minutes, timer_p90 = TimerEstimator(
+            _fetch_course_avg_map(cursor, [course_name] if machine_status == "DRYING" else []),
+            model=duration_model,
+        ).estimate_one(m, now_ts)
         
-        cursor.execute(
-            "SELECT DISTINCT user_id FROM room_subscriptions WHERE room_id = %s",
-            (room_id,)
-        )
-        users = cursor.fetchall() or []
-    
-    # 1. WebSocket으로 실시간 전송 (모든 상태)
-    for u in users:
-        await manager.send_to_user(int(u["user_id"]), {
-            "type": "room_status",
-            "machine_id": machine_id,
-            "status": status,
-            "machine_type": machine_type,
-            "room_id": room_id,
-            "room_name": room_name,
-            "machine_name": machine_name,
-            "timer": timer_minutes,
-            "avg_minutes": avg_minutes,
-            "elapsed_time_minutes": elapsed_minutes,
-        })
-    
-    # 2. FCM 푸시 알림은 FINISHED 상태일 때만
-    if status != "FINISHED":
-        logger.info(f"FCM 스킵 (room): machine_id={machine_id}, status={status}")
-        return
-    
-    uids = [int(u["user_id"]) for u in users]
-    if not uids:
-        logger.info(f"FCM 스킵 (room): machine_id={machine_id}, 구독자 없음")
-        return
-
-    # 3. 개별 알림 구독자와 중복되는 방 구독자는 FCM 대상에서 제외
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                """
-                SELECT DISTINCT ns.user_id
-                FROM notify_subscriptions ns
-                JOIN machine_table m2 ON ns.machine_uuid = m2.machine_uuid
-                WHERE m2.machine_id = %s
-                """,
-                (machine_id,),
-            )
-            device_rows = cur.fetchall() or []
-            device_uids = {int(row[0]) for row in device_rows if row and row[0] is not None}
-        except Exception as e:
-            logger.warning(
-                "broadcast_room_status: device subscriber fetch failed for machine_id=%s error=%s",
-                machine_id,
-                str(e),
-            )
-            device_uids = set()
-
-        room_only_uids = [uid for uid in uids if uid not in device_uids]
-        if not room_only_uids:
-            logger.info(
-                f"FCM 스킵 (room): machine_id={machine_id}, room-only 구독자 없음 (개별 알림과 중복)"
-            )
-            return
-
-        # 4. FCM 토큰 조회 (room-only 구독자 대상)
-        placeholders = ",".join(["%s"] * len(room_only_uids))
-        cur.execute(
-            f"SELECT fcm_token FROM user_table WHERE user_id IN ({placeholders}) AND fcm_token IS NOT NULL",
-            tuple(room_only_uids),
-        )
-        rows = cur.fetchall() or []
-
-    tokens = [r[0] for r in rows if r and r[0]]
-    if not tokens:
-        logger.info(f"FCM 스킵 (room): machine_id={machine_id}, 유효한 토큰 없음")
-        return
-
-    # 5. FCM 전송 (FINISHED 상태만)
-    try:
-        if machine_type == "dryer":
-            title = f"🎉 {room_name} 건조 완료!"
-            body = f"{machine_name}의 건조가 완료되었습니다."
+        if subscriber_index.loaded:
+            uids = subscriber_index.room_users(room_id)
         else:
-            title = f"🎉 {room_name} 세탁 완료!"
-            body = f"{machine_name}의 세탁이 완료되었습니다."
-        
-        data = {
-            "machine_id": str(machine_id),
-            "room_id": str(room_id),
-            "status": status,
-            "click_action": "index.html",
-            "type": "wash_complete"
-        }
-        
-        logger.info(f"📤 FCM 전송 (room): machine_id={machine_id}, 대상={len(tokens)}명")
-        result = send_to_tokens(tokens, title, body, data)
-        logger.info(f"✅ FCM 전송 완료 (room): {result}")
-        
-    except Exception as e:
-        logger.error(f"❌ FCM 전송 실패 (room): machine_id={machine_id}, error={str(e)}", exc_info=True)
+            subscriber_index.note_fallback()
+            cursor.execute(
+                "SELECT DISTINCT user_id FROM room_subscriptions WHERE room_id = %s",
+                (room_id,)
+            )
+            uids = [int(u["user_id"]) for u in cursor.fetchall() or []]
+    
+    # 1. WebSocket으로 실시간 전송 (모든 상태, seq 부여 후 방 버퍼에 보관)
+    event = event_buffer.append(room_id, {
+        "type": "room_status",
+        "machine_id": machine_id,
+        "status": status,
+        "machine_type": machine_type,
+        "room_id": room_id,
+        "room_name": room_name,
+        "machine_name": machine_name,
+        "timer": timer_minutes,
+        "avg_minutes": avg_minutes,
+        "elapsed_time_minutes": elapsed_minutes,
+        "timer_p90": timer_p90,
+    })
+    for uid in uids:
+        await manager.send_to_user(uid, event)
 
 
 async def broadcast_notify(machine_id: int, status: str):
     """
-    개별 세탁기 구독자에게 WebSocket + FCM 알림 전송
-    ❗️ FINISHED 상태일 때만 FCM 푸시 알림 전송 (알림 스팸 방지)
+    개별 세탁기 구독자에게 WebSocket 알림 전송
+    ❗️ FINISHED FCM 푸시는 notification_outbox 경유 (수신자는 커밋 시점에 이미 확정)
     ❗️ FINISHED 후 알림 자동 해제
     """
     now_ts = int(time.time())
@@ -288,7 +193,7 @@ async def broadcast_notify(machine_id: int, status: str):
     with get_db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
-            "SELECT machine_uuid, machine_name, machine_type, room_id, course_name, status, UNIX_TIMESTAMP(first_update) AS first_ts, UNIX_TIMESTAMP(updated_at) AS updated_ts FROM machine_table WHERE machine_id = %s",
+            "SELECT machine_id, machine_uuid, machine_name, machine_type, room_id, course_name, status, UNIX_TIMESTAMP(first_update) AS first_ts, UNIX_TIMESTAMP(updated_at) AS updated_ts FROM machine_table WHERE machine_id = %s",
             (machine_id,)
         )
         mu = cursor.fetchone()
@@ -297,75 +202,29 @@ async def broadcast_notify(machine_id: int, status: str):
             return
         
         machine_uuid = mu.get("machine_uuid")
-        machine_name = mu.get("machine_name", "세탁기")
         machine_type = mu.get("machine_type", "washer")
         course_name = mu.get("course_name")
-        first_ts = mu.get("first_ts")
-        updated_ts = mu.get("updated_ts")
         machine_status = mu.get("status", "").upper()
         
-        avg_minutes = None
-        elapsed_minutes = None
-        timer_minutes = None
-
-        if machine_status == "WASHING":
-            # WASHING: 고정값 avg_minutes=36, elapsed는 updated_at 기준
-            avg_minutes = 36
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes = elapsed_seconds // 60
-                timer_minutes = max(0, avg_minutes - elapsed_minutes)
-            else:
-                elapsed_minutes = 0
-                timer_minutes = 36
-        elif machine_status == "SPINNING":
-            # SPINNING: 고정값 avg_minutes=10, elapsed는 updated_at 기준
-            avg_minutes = 10
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes = elapsed_seconds // 60
-                timer_minutes = max(0, avg_minutes - elapsed_minutes)
-            else:
-                elapsed_minutes = 0
-                timer_minutes = 10
-        elif machine_status == "DRYING":
-            if machine_type == "dryer":
-                # DRYING (건조기): 고정값 avg_minutes=45, elapsed는 updated_at 기준
-                avg_minutes = 45
-                if updated_ts:
-                    elapsed_seconds = now_ts - int(updated_ts)
-                    elapsed_minutes = elapsed_seconds // 60
-                    timer_minutes = max(0, avg_minutes - elapsed_minutes)
-                else:
-                    elapsed_minutes = 0
-                    timer_minutes = 45
-            elif course_name:
-                # DRYING (세탁기): 기존 로직 유지 (avg_time 사용)
-                cursor.execute(
-                    "SELECT avg_time FROM time_table WHERE course_name = %s",
-                    (course_name,)
-                )
-                avg_row = cursor.fetchone()
-                if avg_row:
-                    try:
-                        avg_time = avg_row.get("avg_time")
-                        if avg_time and first_ts:
-                            avg_minutes = int(avg_time)
-                            elapsed_seconds = now_ts - int(first_ts)
-                            elapsed_minutes = elapsed_seconds // 60
-                            timer_minutes = max(0, avg_minutes - elapsed_minutes)
-                    except Exception as e:
-                        logger.warning("broadcast_notify: time calculation failed course=%s error=%s", course_name, str(e))
+        timer_minutes, avg_minutes, elapsed_minutes, timer_p90 = TimerEstimator(
+            _fetch_course_avg_map(cursor, [course_name] if machine_status == "DRYING" else []),
+            model=duration_model,
+        ).estimate_one(mu, now_ts)
         
-        cursor.execute(
-            "SELECT user_id FROM notify_subscriptions WHERE machine_uuid = %s",
-            (machine_uuid,)
-        )
-        users = cursor.fetchall() or []
+        if subscriber_index.loaded:
+            uids = subscriber_index.machine_users(machine_uuid)
+        else:
+            subscriber_index.note_fallback()
+            cursor.execute(
+                "SELECT user_id FROM notify_subscriptions WHERE machine_uuid = %s",
+                (machine_uuid,)
+            )
+            uids = [int(u["user_id"]) for u in cursor.fetchall() or []]
     
-    # 1. WebSocket으로 실시간 전송 (모든 상태)
-    for u in users:
-        await manager.send_to_user(int(u["user_id"]), {
+    # 1. WebSocket으로 실시간 전송 (모든 상태, 구독자 한정 이벤트로 방 버퍼에 보관)
+    event = event_buffer.append(
+        mu.get("room_id"),
+        {
             "type": "notify",
             "machine_id": machine_id,
             "status": status,
@@ -373,58 +232,20 @@ async def broadcast_notify(machine_id: int, status: str):
             "timer": timer_minutes,
             "avg_minutes": avg_minutes,
             "elapsed_time_minutes": elapsed_minutes,
-        })
+            "timer_p90": timer_p90,
+        },
+        audience=uids,
+    )
+    for uid in uids:
+        await manager.send_to_user(uid, event)
     
-    # 2. FCM 푸시 알림은 FINISHED 상태일 때만
     if status != "FINISHED":
-        logger.info(f"FCM 스킵: machine_id={machine_id}, status={status} (FINISHED 아님)")
         return
-    
-    uids = [int(u["user_id"]) for u in users]
-    if not uids:
-        logger.info(f"FCM 스킵: machine_id={machine_id}, 구독자 없음")
-        return
-    
-    # 3. FCM 토큰 조회
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        placeholders = ",".join(["%s"] * len(uids))
-        cur.execute(
-            f"SELECT fcm_token FROM user_table WHERE user_id IN ({placeholders}) AND fcm_token IS NOT NULL",
-            tuple(uids)
-        )
-        rows = cur.fetchall() or []
-    
-    tokens = [r[0] for r in rows if r and r[0]]
-    if not tokens:
-        logger.info(f"FCM 스킵: machine_id={machine_id}, 유효한 토큰 없음")
+
+    # 2. 알림 자동 해제 (FINISHED 후 구독 해제)
+    if subscriber_index.loaded and not uids:
+        logger.info(f"알림 해제 스킵: machine_uuid={machine_uuid}, 구독 없음")
         return
-    
-    # 4. FCM 전송 (백그라운드 알림)
-    try:
-        if machine_type == "dryer":
-            title = "🎉 건조 완료!"
-            body = f"{machine_name}의 건조가 완료되었습니다. 빨래를 꺼내주세요!"
-        else:
-            title = "🎉 세탁 완료!"
-            body = f"{machine_name}의 세탁이 완료되었습니다. 빨래를 꺼내주세요!"
-        
-        data = {
-            "machine_id": str(machine_id),
-            "room_id": str(mu.get("room_id")),
-            "status": status,
-            "click_action": "index.html",
-            "type": "wash_complete"
-        }
-        
-        logger.info(f"📤 FCM 전송 시작: machine_id={machine_id}, 대상={len(tokens)}명")
-        result = send_to_tokens(tokens, title, body, data)
-        logger.info(f"✅ FCM 전송 완료: {result}")
-        
-    except Exception as e:
-        logger.error(f"❌ FCM 전송 실패: machine_id={machine_id}, error={str(e)}", exc_info=True)
-    
-    # 5. 알림 자동 해제 (FINISHED 후 구독 해제)
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
@@ -434,6 +255,8 @@ async def broadcast_notify(machine_id: int, status: str):
             )
             deleted_count = cur.rowcount
             conn.commit()
+            # 커밋된 뒤에만 인덱스에서 제거 (DELETE 실패 시 DB에 남은 구독과 어긋나지 않게)
+            subscriber_index.clear_machine(machine_uuid)
             
             if deleted_count > 0:
                 logger.info(f"🔕 알림 자동 해제 완료: machine_uuid={machine_uuid}, 해제된 구독={deleted_count}개")
@@ -463,105 +286,24 @@ async def _gather_machine_timers(now_ts: int) -> list[dict]:
         )
         machines = cursor.fetchall() or []
 
-        course_names = {row.get("course_name") for row in machines if row.get("course_name")}
-        course_avg_map: Dict[str, int] = {}
-        course_washing_map: Dict[str, int] = {}
-        course_spinning_map: Dict[str, int] = {}
-        if course_names:
-            placeholders = ",".join(["%s"] * len(course_names))
-            cursor.execute(
-                f"SELECT course_name, avg_time, avg_washing_time, avg_spinning_time FROM time_table WHERE course_name IN ({placeholders})",
-                tuple(course_names),
-            )
-            for course_row in cursor.fetchall() or []:
-                cname = course_row.get("course_name")
-                avg_time = course_row.get("avg_time")
-                avg_washing = course_row.get("avg_washing_time")
-                avg_spinning = course_row.get("avg_spinning_time")
-                
-                if cname and avg_time is not None:
-                    try:
-                        course_avg_map[cname] = int(avg_time)
-                    except Exception:
-                        logger.warning(
-                            "timer_sync: avg_time parsing failed for course=%s value=%s",
-                            cname,
-                            avg_time,
-                        )
-                
-                if cname and avg_washing is not None:
-                    try:
-                        course_washing_map[cname] = int(avg_washing)
-                    except Exception:
-                        pass
-                
-                if cname and avg_spinning is not None:
-                    try:
-                        course_spinning_map[cname] = int(avg_spinning)
-                    except Exception:
-                        pass
+        course_avg_map = _fetch_course_avg_map(
+            cursor, {row.get("course_name") for row in machines if row.get("course_name")}
+        )
 
+    estimates = TimerEstimator(course_avg_map, model=duration_model).estimate_rows(machines, now_ts)
     payloads: list[dict] = []
-    for row in machines:
-        status = (row.get("status") or "").upper()
-        machine_type = row.get("machine_type") or "washer"
-        course_name = row.get("course_name")
-        first_ts = row.get("first_ts")
-        updated_ts = row.get("updated_ts")
-        
-        timer_val: int | None = None
-        avg_minutes_val: int | None = None
-        elapsed_minutes_val: int | None = None
-        
-        if status == "WASHING":
-            # WASHING: 고정값 avg_minutes=36, elapsed는 updated_at 기준
-            avg_minutes_val = 36
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes_val = elapsed_seconds // 60
-                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-            else:
-                elapsed_minutes_val = 0
-                timer_val = 36
-        elif status == "SPINNING":
-            # SPINNING: 고정값 avg_minutes=10, elapsed는 updated_at 기준
-            avg_minutes_val = 10
-            if updated_ts:
-                elapsed_seconds = now_ts - int(updated_ts)
-                elapsed_minutes_val = elapsed_seconds // 60
-                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-            else:
-                elapsed_minutes_val = 0
-                timer_val = 10
-        elif status == "DRYING":
-            if machine_type == "dryer":
-                # DRYING (건조기): 고정값 avg_minutes=45, elapsed는 updated_at 기준
-                avg_minutes_val = 45
-                if updated_ts:
-                    elapsed_seconds = now_ts - int(updated_ts)
-                    elapsed_minutes_val = elapsed_seconds // 60
-                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-                else:
-                    elapsed_minutes_val = 0
-                    timer_val = 45
-            elif course_name:
-                # DRYING (세탁기): 기존 로직 유지 (avg_time 사용)
-                avg_minutes_val = course_avg_map.get(course_name)
-                if avg_minutes_val and first_ts:
-                    elapsed_seconds = now_ts - int(first_ts)
-                    elapsed_minutes_val = elapsed_seconds // 60
-                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
-
+    for row, (timer_val, avg_minutes_val, elapsed_minutes_val, timer_p90) in zip(machines, estimates):
         payloads.append(
             {
                 "machine_id": int(row["machine_id"]),
                 "room_id": row.get("room_id"),
                 "room_name": row.get("room_name"),
-                "status": status,
-                "machine_type": machine_type,
+                "status": (row.get("status") or "").upper(),
+                "machine_type": row.get("machine_type") or "washer",
                 "timer": timer_val,
                 "avg_minutes": avg_minutes_val,
                 "elapsed_time_minutes": elapsed_minutes_val,
+                "timer_p90": timer_p90,
             }
         )
 
@@ -580,12 +322,58 @@ async def broadcast_timer_snapshot():
     await manager.broadcast(
         {
             "type": "timer_sync",
+            "seq": event_buffer.next_seq(),
             "timestamp": now_ts,
             "machines": machines,
         }
     )
 
 
+def _fetch_user_room_ids(user_id: int) -> set[int]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT room_id FROM room_subscriptions WHERE user_id = %s",
+            (user_id,),
+        )
+        return {int(row[0]) for row in cursor.fetchall() or [] if row and row[0] is not None}
+
+
+async def resume_session(user_id: int, websocket: WebSocket, last_seq: int):
+    """재접속한 클라이언트에게 last_seq 이후 놓친 이벤트만 재전송.
+
+    버퍼가 이미 해당 구간을 버렸으면 구독 중인 방의 전체 타이머 스냅샷을 보낸다.
+    구독 방 조회에 실패하면 어떤 방 이벤트를 놓쳤는지 알 수 없으므로 재전송 대신
+    전체 방 스냅샷(timer_sync와 같은 범위)을 보낸다.
+    manager.connect 직후 호출해야 누락/중복 없이 이어받을 수 있다
+    (replay 계산 전까지 이벤트 루프에 제어를 넘기지 않음).
+    """
+    try:
+        room_ids: Optional[set[int]] = _fetch_user_room_ids(user_id)
+    except Exception as e:
+        logger.warning("WS resume: room fetch failed user_id={} error={}", user_id, str(e))
+        room_ids = None
+
+    missed = event_buffer.replay(user_id, room_ids, last_seq) if room_ids is not None else None
+    if missed is not None:
+        logger.info("WS resume user_id={} last_seq={} missed={}", user_id, last_seq, len(missed))
+        for event in missed:
+            await websocket.send_text(json.dumps(event))
+        return
+
+    seq = event_buffer.last_seq
+    now_ts = int(time.time())
+    machines = await _gather_machine_timers(now_ts)
+    reason = "gap too old" if room_ids is not None else "room lookup failed"
+    logger.info("WS resume user_id={} last_seq={} -> snapshot ({})", user_id, last_seq, reason)
+    await websocket.send_text(json.dumps({
+        "type": "snapshot",
+        "seq": seq,
+        "timestamp": now_ts,
+        "machines": [m for m in machines if room_ids is None or m.get("room_id") in room_ids],
+    }))
+
+
 async def _timer_sync_loop():
     logger.info("Timer sync loop started interval=%ss", TIMER_SYNC_INTERVAL_SECONDS)
     try:
@@ -0,0 +1,150 @@
+"""기상청 단기예보 응답 적재 비용 측정 (오프라인, DB는 --db일 때만).
+
+fixtures/kma_vilage_fcst_60_127.json(getVilageFcst dataType=JSON 형식, 1000 item)을 입력으로
+기존 방식(XML 전체 DOM 파싱 → 시간대별 그룹화 → 시간대마다 INSERT 1회)과
+JSON 한 번 피벗 / XML iterparse 피벗을 비교한다. 세 방식의 결과 행이 같은지도 확인.
+XML 입력은 같은 item으로 만든 XML 응답을 사용한다.
+
+--db를 주면 .env의 DB에 시간대별 INSERT와 다중 행 upsert 1회를 실제로 실행해 비교하고
+측정용 격자(nx=ny=-1) 행은 끝나고 지운다.
+
+실행: python -m benchmarks.bench_kma_ingest [--db]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from statistics import median
+
+from app.services.kma_weather import (
+    CATEGORY_COLUMNS,
+    WEATHER_COLUMNS,
+    _parse_forecast,
+    _store_to_cache,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "kma_vilage_fcst_60_127.json"
+BASE_DATE, BASE_TIME = "20251020", "1400"
+BENCH_GRID = (-1, -1)
+REPEAT = 20
+
+
+def to_xml(content: bytes) -> bytes:
+    """JSON 응답과 같은 item을 담은 XML 응답."""
+    response = json.loads(content)["response"]
+    root = ET.Element("response")
+    header = ET.SubElement(root, "header")
+    ET.SubElement(header, "resultCode").text = response["header"]["resultCode"]
+    ET.SubElement(header, "resultMsg").text = response["header"]["resultMsg"]
+    items = ET.SubElement(ET.SubElement(root, "body"), "items")
+    for item in response["body"]["items"]["item"]:
+        node = ET.SubElement(items, "item")
+        for key, value in item.items():
+            ET.SubElement(node, key).text = str(value)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def legacy_parse(xml_text: str) -> list[dict]:
+    """리팩터링 전 _parse_xml_forecast + 시간대별 변환."""
+    root = ET.fromstring(xml_text)
+    forecasts: dict[tuple[str, str], dict[str, str]] = {}
+    for item in root.findall(".//item"):
+        fcst_date = item.findtext("fcstDate")
+        fcst_time = item.findtext("fcstTime")
+        category = item.findtext("category")
+        value = item.findtext("fcstValue")
+        if not all([fcst_date, fcst_time, category, value]):
+            continue
+        forecasts.setdefault((fcst_date, fcst_time), {})[category] = value
+    rows = []
+    for (fcst_date, fcst_time), categories in forecasts.items():
+        row = {"base_date": BASE_DATE, "base_time": BASE_TIME, "fcst_date": fcst_date, "fcst_time": fcst_time}
+        for category, (column, convert) in CATEGORY_COLUMNS.items():
+            value = categories.get(category)
+            row[column] = convert(value) if value is not None else None
+        rows.append(row)
+    return rows
+
+
+def legacy_store(rows: list[dict], nx: int, ny: int, now_ts: int) -> None:
+    """리팩터링 전 _store_to_cache: 시간대마다 INSERT ... ON DUPLICATE KEY UPDATE 1회."""
+    from app.database import get_db_connection
+
+    columns = ("base_date", "base_time", "fcst_date", "fcst_time", "nx", "ny", "fetched_at") + WEATHER_COLUMNS
+    sql = (
+        f"INSERT INTO weather_cache ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in ('fetched_at',) + WEATHER_COLUMNS)}"
+    )
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for row in rows:
+            cursor.execute(
+                sql,
+                (BASE_DATE, BASE_TIME, row["fcst_date"], row["fcst_time"], nx, ny, now_ts)
+                + tuple(row[c] for c in WEATHER_COLUMNS),
+            )
+        conn.commit()
+
+
+def cleanup(nx: int, ny: int) -> None:
+    from app.database import get_db_connection
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM weather_cache WHERE nx = %s AND ny = %s", (nx, ny))
+        conn.commit()
+
+
+def _time(func, *args, repeat: int = REPEAT) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return median(samples)
+
+
+def _key(rows: list[dict]) -> list[tuple]:
+    return sorted(tuple(row[c] for c in ("fcst_date", "fcst_time") + WEATHER_COLUMNS) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", action="store_true", help="실제 DB에 적재 시간도 측정")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    json_content = FIXTURE.read_bytes()
+    xml_content = to_xml(json_content)
+    xml_text = xml_content.decode("utf-8")
+
+    legacy_rows = legacy_parse(xml_text)
+    json_rows = _parse_forecast(json_content, BASE_DATE, BASE_TIME)
+    xml_rows = _parse_forecast(xml_content, BASE_DATE, BASE_TIME)
+    assert _key(legacy_rows) == _key(json_rows) == _key(xml_rows)
+
+    print(f"fixture: {len(json_content) / 1024:.0f} KiB JSON / {len(xml_content) / 1024:.0f} KiB XML, {len(json_rows)} time slots")
+    print(f"{'parse':<28} {'ms':>8}")
+    print(f"{'legacy XML DOM + group':<28} {_time(legacy_parse, xml_text, repeat=args.repeat) * 1000:>8.2f}")
+    print(f"{'XML iterparse + pivot':<28} {_time(_parse_forecast, xml_content, BASE_DATE, BASE_TIME, repeat=args.repeat) * 1000:>8.2f}")
+    print(f"{'JSON + pivot':<28} {_time(_parse_forecast, json_content, BASE_DATE, BASE_TIME, repeat=args.repeat) * 1000:>8.2f}")
+    print(f"statements per fetch: legacy {len(legacy_rows)} → bulk 1")
+
+    if args.db:
+        nx, ny = BENCH_GRID
+        now_ts = int(time.time())
+        try:
+            legacy = _time(legacy_store, legacy_rows, nx, ny, now_ts, repeat=args.repeat)
+            bulk = _time(_store_to_cache, BASE_DATE, BASE_TIME, nx, ny, json_rows, now_ts, repeat=args.repeat)
+        finally:
+            cleanup(nx, ny)
+        print(f"{'store':<28} {'ms':>8}")
+        print(f"{'legacy per-slot INSERT':<28} {legacy * 1000:>8.2f}")
+        print(f"{'multi-row upsert':<28} {bulk * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""/load 데이터 조회 지연시간 측정 (실제 MySQL 필요, .env의 DB 설정 사용).
+
+기존 방식(쿼리 5~7개를 각자 커넥션을 빌려 순차 실행)과 결합 쿼리 1회 방식을
+같은 사용자로 반복 실행해 p50/p99를 비교한다. 두 방식의 결과가 같은지도 확인.
+
+실행: python -m benchmarks.bench_load_queries --user-id 1 --iterations 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.database import get_db_connection
+from app.web_service.load_query import RECENT_FINISHED_LOOKBACK_SECONDS, fetch_load_snapshot
+
+
+def legacy_fetch(user_id: int, now_ts: int):
+    """리팩터링 전 _fetch_load_* 헬퍼들의 순차 조회 (헬퍼마다 커넥션 1개)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT m.machine_id, m.machine_uuid, m.room_id,
+                   COALESCE(rt.room_name, m.room_name) AS room_name,
+                   m.machine_name, m.status, m.machine_type, m.course_name,
+                   UNIX_TIMESTAMP(m.first_update) AS first_ts,
+                   m.spinning_update,
+                   UNIX_TIMESTAMP(m.updated_at) AS updated_ts
+            FROM machine_table m
+            JOIN room_subscriptions rs ON m.room_id = rs.room_id
+            LEFT JOIN room_table rt ON m.room_id = rt.room_id
+            WHERE rs.user_id = %s
+            """,
+            (user_id,),
+        )
+        rows = cursor.fetchall() or []
+
+    course_names = {r["course_name"] for r in rows if r.get("course_name")}
+    course_avg_map, course_washing_map, course_spinning_map = {}, {}, {}
+    if course_names:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            placeholders = ",".join(["%s"] * len(course_names))
+            cursor.execute(
+                f"SELECT course_name, avg_time, avg_washing_time, avg_spinning_time FROM time_table WHERE course_name IN ({placeholders})",
+                tuple(course_names),
+            )
+            for rec in cursor.fetchall() or []:
+                for target, field in (
+                    (course_avg_map, "avg_time"),
+                    (course_washing_map, "avg_washing_time"),
+                    (course_spinning_map, "avg_spinning_time"),
+                ):
+                    if rec.get(field) is not None:
+                        target[rec["course_name"]] = int(rec[field])
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT machine_uuid FROM notify_subscriptions WHERE user_id = %s", (user_id,))
+        notify_set = {r["machine_uuid"] for r in cursor.fetchall() or []}
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT MAX(isreserved) AS max_reserved FROM reservation_table WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        isreserved = int(row.get("max_reserved") or 0) if row else 0
+
+    room_ids = {int(r["room_id"]) for r in rows if r.get("room_id") is not None}
+    room_reservation_counts, room_notify_counts, recent_finished_count = {}, {}, 0
+    if room_ids:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            placeholders = ",".join(["%s"] * len(room_ids))
+            cursor.execute(
+                f"SELECT room_id, COUNT(*) AS cnt FROM reservation_table WHERE room_id IN ({placeholders}) AND isreserved = 1 GROUP BY room_id",
+                tuple(room_ids),
+            )
+            room_reservation_counts = {int(r["room_id"]): int(r["cnt"]) for r in cursor.fetchall() or []}
+            cursor.execute(
+                f"SELECT m.room_id, COUNT(*) AS cnt FROM notify_subscriptions ns JOIN machine_table m ON ns.machine_uuid = m.machine_uuid WHERE m.room_id IN ({placeholders}) GROUP BY m.room_id",
+                tuple(room_ids),
+            )
+            room_notify_counts = {int(r["room_id"]): int(r["cnt"]) for r in cursor.fetchall() or []}
+            cursor.execute(
+                f"SELECT COUNT(*) AS cnt FROM machine_table WHERE room_id IN ({placeholders}) AND status = %s AND timestamp >= %s",
+                tuple(room_ids) + ("FINISHED", now_ts - RECENT_FINISHED_LOOKBACK_SECONDS),
+            )
+            row = cursor.fetchone()
+            recent_finished_count = int(row.get("cnt") or 0) if row else 0
+
+    return (
+        rows,
+        (course_avg_map, course_washing_map, course_spinning_map),
+        notify_set,
+        isreserved,
+        (room_reservation_counts, room_notify_counts, recent_finished_count),
+    )
+
+
+def _normalize(result):
+    rows, course_maps, notify_set, isreserved, room_stats = result
+    return (
+        sorted((r["machine_uuid"], r["status"], r["course_name"]) for r in rows),
+        course_maps,
+        notify_set,
+        isreserved,
+        room_stats,
+    )
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def _measure(func, user_id: int, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(user_id, int(time.time()))
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    now_ts = int(time.time())
+    assert _normalize(legacy_fetch(args.user_id, now_ts)) == _normalize(fetch_load_snapshot(args.user_id, now_ts))
+
+    # 커넥션 풀/쿼리 캐시 예열
+    _measure(legacy_fetch, args.user_id, 10)
+    _measure(fetch_load_snapshot, args.user_id, 10)
+
+    print(f"{'method':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, func in (("sequential", legacy_fetch), ("combined", fetch_load_snapshot)):
+        samples = _measure(func, args.user_id, args.iterations)
+        print(f"{name:>12} {_percentile(samples, 0.5):>10.2f} {_percentile(samples, 0.99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
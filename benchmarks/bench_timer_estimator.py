@@ -0,0 +1,104 @@
+"""TimerEstimator 스냅샷 비용 측정.
+
+기존 호출부마다 복사되어 있던 행 단위 계산(legacy)과 TimerEstimator 배치 계산을
+1k / 10k / 100k 대 규모의 가상 세탁기 행으로 비교한다. 결과가 동일한지도 함께 확인.
+
+실행: python -m benchmarks.bench_timer_estimator
+"""
+from __future__ import annotations
+
+import random
+import time
+from statistics import median
+
+from app.utils.timer import TimerEstimator
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 5
+COURSES = {"표준": 52, "쾌속": 31, "이불": 64, "울/섬세": 45}
+
+
+def make_rows(n: int, now_ts: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    statuses = ["WASHING", "SPINNING", "DRYING", "FINISHED", "IDLE"]
+    rows = []
+    for i in range(n):
+        status = rng.choice(statuses)
+        rows.append({
+            "machine_id": i,
+            "status": status,
+            "machine_type": "dryer" if rng.random() < 0.3 else "washer",
+            "course_name": rng.choice(list(COURSES) + [None]),
+            "first_ts": now_ts - rng.randint(0, 90 * 60) if rng.random() < 0.9 else None,
+            "updated_ts": now_ts - rng.randint(0, 60 * 60) if rng.random() < 0.9 else None,
+        })
+    return rows
+
+
+def legacy_estimate(rows: list[dict], course_avg_map: dict, now_ts: int) -> list[tuple]:
+    """리팩터링 전 _gather_machine_timers / load()의 행 단위 계산."""
+    out = []
+    for row in rows:
+        status = (row.get("status") or "").upper()
+        machine_type = row.get("machine_type") or "washer"
+        course_name = row.get("course_name")
+        first_ts = row.get("first_ts")
+        updated_ts = row.get("updated_ts")
+        timer_val = avg_minutes_val = elapsed_minutes_val = None
+        if status == "WASHING":
+            avg_minutes_val = 36
+            if updated_ts:
+                elapsed_minutes_val = (now_ts - int(updated_ts)) // 60
+                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
+            else:
+                elapsed_minutes_val = 0
+                timer_val = 36
+        elif status == "SPINNING":
+            avg_minutes_val = 10
+            if updated_ts:
+                elapsed_minutes_val = (now_ts - int(updated_ts)) // 60
+                timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
+            else:
+                elapsed_minutes_val = 0
+                timer_val = 10
+        elif status == "DRYING":
+            if machine_type == "dryer":
+                avg_minutes_val = 45
+                if updated_ts:
+                    elapsed_minutes_val = (now_ts - int(updated_ts)) // 60
+                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
+                else:
+                    elapsed_minutes_val = 0
+                    timer_val = 45
+            elif course_name:
+                avg_minutes_val = course_avg_map.get(course_name)
+                if avg_minutes_val and first_ts:
+                    elapsed_minutes_val = (now_ts - int(first_ts)) // 60
+                    timer_val = max(0, avg_minutes_val - elapsed_minutes_val)
+        out.append((timer_val, avg_minutes_val, elapsed_minutes_val))
+    return out
+
+
+def _time(func, *args) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return median(samples)
+
+
+def main():
+    now_ts = int(time.time())
+    estimator = TimerEstimator(COURSES)
+    print(f"{'machines':>10} {'legacy ms':>12} {'estimator ms':>14} {'us/machine':>12}")
+    for n in SIZES:
+        rows = make_rows(n, now_ts)
+        assert [e[:3] for e in estimator.estimate_rows(rows, now_ts)] == legacy_estimate(rows, COURSES, now_ts)
+        legacy = _time(legacy_estimate, rows, COURSES, now_ts)
+        batch = _time(estimator.estimate_rows, rows, now_ts)
+        print(f"{n:>10} {legacy * 1000:>12.2f} {batch * 1000:>14.2f} {batch / n * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,24 @@ import os
 from app.arduino_service.router import router as arduino_router
 from app.web_service.router import router as android_router
 from app.websocket.manager import start_timer_sync_loop, stop_timer_sync_loop
+from app.notifications.dispatcher import dispatcher as fcm_dispatcher
+from app.notifications.token_health import get_token_health_stats
+from app.notifications.outbox import start_outbox_sender, stop_outbox_sender, get_outbox_stats
+from app.notifications.subscriber_index import subscriber_index, start_subscriber_index, stop_subscriber_index
+from app.services.duration_model import duration_model, start_duration_model, stop_duration_model
+from app.services.tip_pool import get_tip_pool_stats
+from app.services.tip_memo import tip_memo
+from app.services.ai_summary import get_tip_deadline_stats
+from app.services.prompt_compiler import prompt_metrics
+from app.services.http_clients import http_clients, start_http_clients, stop_http_clients
+from app.services.kma_weather import forecast_cache
+from app.services.refresh_scheduler import start_refresh_scheduler, stop_refresh_scheduler, get_refresh_scheduler_stats
+from app.services.congestion import congestion_matrix, weekly_congestion, start_congestion_matrix, stop_congestion_matrix
+from app.web_service.load_cache import load_cache
 
 # 데이터베이스 연결 설정 추가
 from app.database import get_db_connection
+from app.auth.security import get_auth_cache_stats
 import logging
 from loguru import logger
 
@@ -54,8 +69,8 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "ngrok-skip-browser-warning"],
-    expose_headers=["*"],  # 클라이언트가 읽을 수 있는 헤더
+    allow_headers=["Authorization", "Content-Type", "If-None-Match", "ngrok-skip-browser-warning"],
+    expose_headers=["*", "ETag"],  # 클라이언트가 읽을 수 있는 헤더 (credentials 요청은 "*"가 무시되므로 ETag 명시)
     max_age=600,  # Preflight 캐시 시간 (10분)
 )
 
@@ -99,6 +114,7 @@ def custom_openapi():
         "/rooms": ["get"],
         "/device_subscribe": ["get"],
         "/statistics/congestion": ["get"],
+        "/forecast": ["get"],
         "/survey": ["post"],
     }
     for path, methods in protected.items():
@@ -162,6 +178,29 @@ async def health():
         }
 
 
+@app.get("/metrics")
+async def metrics():
+    """프로세스 내부 캐시/큐 지표 조회"""
+    return {
+        "auth_cache": get_auth_cache_stats(),
+        "fcm_dispatcher": fcm_dispatcher.stats(),
+        "fcm_tokens": get_token_health_stats(),
+        "notification_outbox": get_outbox_stats(),
+        "subscriber_index": subscriber_index.stats(),
+        "duration_model": duration_model.stats(),
+        "load_cache": load_cache.stats(),
+        "congestion_matrix": congestion_matrix.stats(),
+        "weekly_congestion": weekly_congestion.stats(),
+        "tip_pool": get_tip_pool_stats(),
+        "tip_memo": tip_memo.stats(),
+        "tip_deadline": get_tip_deadline_stats(),
+        "prompt": prompt_metrics.stats(),
+        "refresh_scheduler": get_refresh_scheduler_stats(),
+        "http_clients": http_clients.stats(),
+        "weather_cache": forecast_cache.stats(),
+    }
+
+
 @app.on_event("startup")
 async def startup_event():
     """서버 시작 시 Firebase 및 데이터베이스 초기화"""
@@ -198,18 +237,60 @@ async def startup_event():
     if last_error is not None:
         logger.warning("DB not ready; server will start but database operations may fail")
 
+    # 알림 대상 인메모리 인덱스 적재 (방/세탁기 구독자, FCM 토큰)
+    await start_subscriber_index()
+
+    # 사이클 소요 시간 학습 모델 복원
+    await start_duration_model()
+
+    # 혼잡도 집계 적재 (busy_table 전체 누적 + 세탁실별 주 단위)
+    await start_congestion_matrix()
+
+    # FCM 전송 디스패처 시작
+    await fcm_dispatcher.start()
+
+    # 완료 알림 outbox 발송 루프 시작 (재시작 전 미발송 알림도 이어서 전송)
+    await start_outbox_sender()
+
     # Timer sync loop 시작
     await start_timer_sync_loop()
 
+    # 외부 API(Gemini, OpenRouter, Ollama, 기상청) 공용 HTTP 커넥션 풀 생성
+    await start_http_clients()
+
+    # AI TIP / 날씨 캐시 갱신 스케줄러 시작 (기상청 발표 시각, TIP TTL + 상태 변경 수 기준)
+    await start_refresh_scheduler()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """서버 종료 시 정리 작업"""
     logger.info("Shutting down Laundry API Server...")
 
+    # 갱신 스케줄러 종료
+    await stop_refresh_scheduler()
+
     # Timer sync loop 종료
     await stop_timer_sync_loop()
 
+    # outbox 발송 루프 종료 (미발송 행은 DB에 남아 다음 기동 시 전송)
+    await stop_outbox_sender()
+
+    # 구독자 인덱스 재적재 루프 종료
+    await stop_subscriber_index()
+
+    # 혼잡도 행렬 재적재 루프 종료
+    await stop_congestion_matrix()
+
+    # 소요 시간 학습 모델 마지막 저장
+    await stop_duration_model()
+
+    # FCM 전송 디스패처 종료 (남은 작업은 잠시 처리 후 종료)
+    await fcm_dispatcher.stop()
+
+    # 외부 API HTTP 커넥션 풀 종료 (갱신 스케줄러 종료 후)
+    await stop_http_clients()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,75 @@
+import json
+from contextlib import contextmanager
+
+from app.services import congestion
+from app.services.congestion import CongestionMatrix, WeeklyCongestion, current_week, week_start
+from app.services.state_version import get_version
+
+
+class _Cursor:
+    def __init__(self, results, on_fetch):
+        self._results = list(results)
+        self._on_fetch = on_fetch
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        # SELECT 결과를 돌려준 뒤(스냅샷 이후) 커밋된 증가분을 흉내낸다
+        rows = self._results.pop(0)
+        self._on_fetch()
+        return rows
+
+
+def _fake_db(monkeypatch, results, on_fetch):
+    @contextmanager
+    def get_db_connection():
+        class _Conn:
+            def cursor(self, dictionary=False):
+                return _Cursor(results, on_fetch)
+        yield _Conn()
+
+    monkeypatch.setattr(congestion, "get_db_connection", get_db_connection)
+
+
+def test_matrix_reload_keeps_increments_made_while_reading(monkeypatch):
+    matrix = CongestionMatrix()
+    cell = (0, 2, 9)  # 수요일 9시
+    _fake_db(
+        monkeypatch,
+        [[{"busy_day": "수", "busy_time": 9, "busy_count": 5}]],
+        on_fetch=lambda: matrix.increment([cell]),
+    )
+
+    matrix.load()
+
+    assert matrix.snapshot()["수"][9] == 6
+    assert matrix.stats()["replayed"] == 1
+    # 재적재가 끝난 뒤의 증가분은 기록하지 않음
+    matrix.increment([cell])
+    assert matrix.snapshot()["수"][9] == 7
+    assert matrix._journal is None
+
+
+def test_weekly_reload_keeps_increments_and_bumps_version(monkeypatch):
+    weekly = WeeklyCongestion()
+    week = current_week()
+    cell = (week, 2, 9)
+    _fake_db(
+        monkeypatch,
+        [
+            [{"room_id": 3, "busy_day": 2, "busy_time": 9, "cnt": 4}],
+            [{"room_id": 3, "week_start": week_start(week), "busy_day": 2, "busy_time": 9, "busy_count": 4}],
+        ],
+        on_fetch=lambda: weekly.increment(3, [cell]),
+    )
+    version = get_version("congestion")
+
+    weekly.load()
+
+    # 두 SELECT는 같은 트랜잭션 스냅샷(4)을 읽고, 읽는 동안 커밋된 증가분 2건을 다시 더함
+    for room_id in (3, None):
+        assert json.loads(weekly.to_json(room_id, "all"))["수"][9] == 6
+        assert json.loads(weekly.to_json(room_id, "decay"))["수"][9] == 6
+    assert weekly.stats()["replayed"] == 2
+    assert get_version("congestion") == version + 1
@@ -0,0 +1,29 @@
+from app.services import duration_model as dm
+from app.services.duration_model import DurationModel
+
+
+def test_machine_samples_are_split_by_course(monkeypatch):
+    monkeypatch.setattr(dm, "DURATION_MIN_SAMPLES", 5)
+    model = DurationModel()
+    for _ in range(8):
+        model.observe(7, "표준", "total", 80)
+        model.observe(7, "쾌속", "total", 30)
+
+    # 코스가 다른 표본을 이상치로 버리지 않음
+    assert model.stats()["rejected"] == 0
+    assert model.lookup(7, "쾌속", "total") == (30, 30)
+    assert model.lookup(7, "표준", "total") == (80, 80)
+
+
+def test_lookup_falls_back_to_course_then_machine_without_course(monkeypatch):
+    monkeypatch.setattr(dm, "DURATION_MIN_SAMPLES", 5)
+    model = DurationModel()
+    for _ in range(5):
+        model.observe(1, "이불", "total", 64)
+        model.observe(2, None, "total", 40)
+
+    # 다른 세탁기는 코스 값을 사용
+    assert model.lookup(9, "이불", "total") == (64, 64)
+    # 코스를 모르는 표본은 코스를 모를 때만 사용
+    assert model.lookup(2, None, "total") == (40, 40)
+    assert model.lookup(2, "표준", "total") is None
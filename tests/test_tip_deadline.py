@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+
+from app.services import ai_summary
+
+
+def _context(*room_ids):
+    return {"rooms": [{"room_id": room_id} for room_id in room_ids]}
+
+
+def _fake_generation(monkeypatch, pool):
+    calls = []
+    lock = threading.Lock()
+
+    def generate_summary(status_context, room_id=None):
+        with lock:
+            calls.append(room_id)
+        time.sleep(0.1)
+        rooms = ai_summary._context_room_ids(status_context)
+        with lock:
+            pool.update({r: f"tip-{r}" for r in rooms})
+        return f"tip-{room_id if room_id is not None else rooms[0]}"
+
+    monkeypatch.setattr(ai_summary, "generate_summary", generate_summary)
+    monkeypatch.setattr(ai_summary.tip_pool, "random_tip", lambda room_id=None, **_: pool.get(room_id))
+    return calls
+
+
+def test_concurrent_calls_for_disjoint_rooms_do_not_share_generation(monkeypatch):
+    # 풀이 비어 있어도(다른 워커가 덮어쓴 경우 등) 다른 세탁실 결과를 받지 않는지 확인
+    calls = _fake_generation(monkeypatch, pool={})
+    monkeypatch.setattr(ai_summary.tip_pool, "random_tip", lambda room_id=None, **_: None)
+
+    async def run():
+        return await asyncio.gather(
+            ai_summary.generate_summary_within(_context(1), 1.0, 1),
+            ai_summary.generate_summary_within(_context(2), 1.0, 2),
+        )
+
+    assert asyncio.run(run()) == ["tip-1", "tip-2"]
+    assert sorted(calls) == [1, 2]
+    assert ai_summary.get_tip_deadline_stats()["running"] == 0
+
+
+def test_joined_call_reads_its_own_room_from_pool(monkeypatch):
+    pool = {}
+    calls = _fake_generation(monkeypatch, pool)
+
+    async def run():
+        first = asyncio.create_task(ai_summary.generate_summary_within(_context(2, 1), 1.0, 2))
+        await asyncio.sleep(0)
+        # 1번 세탁실도 생성 중이므로 새로 시작하지 않고 함께 기다림
+        second = ai_summary.generate_summary_within(_context(1), 1.0, 1)
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(run()) == ["tip-2", "tip-1"]
+    assert calls == [2]
@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import contextmanager
+
+from app.notifications.subscriber_index import SubscriberIndex
+from app.websocket import manager as ws_manager
+
+
+class _Cursor:
+    rowcount = 0
+
+    def __init__(self):
+        self._row = None
+
+    def execute(self, sql, params=None):
+        if sql.startswith("DELETE"):
+            raise RuntimeError("db down")
+        self._row = {
+            "machine_id": 1, "machine_uuid": 101, "machine_name": "W1", "machine_type": "washer",
+            "room_id": 1, "course_name": None, "status": "FINISHED", "first_ts": None, "updated_ts": None,
+        }
+
+    def fetchone(self):
+        return self._row
+
+
+def test_failed_unsubscribe_keeps_index_entry(monkeypatch):
+    @contextmanager
+    def get_db_connection():
+        class _Conn:
+            def cursor(self, dictionary=False):
+                return _Cursor()
+
+            def commit(self):
+                pass
+        yield _Conn()
+
+    index = SubscriberIndex()
+    index.loaded = True
+    index.add_notify_subscriber(101, 7)
+    monkeypatch.setattr(ws_manager, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(ws_manager, "subscriber_index", index)
+
+    asyncio.run(ws_manager.broadcast_notify(1, "FINISHED"))
+
+    # DELETE가 커밋되지 않았으므로 DB에 남은 구독과 인덱스가 같아야 함
+    assert index.machine_users(101) == [7]
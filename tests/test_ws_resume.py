@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+from app.websocket import manager as ws_manager
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_resume_sends_full_snapshot_when_room_lookup_fails(monkeypatch):
+    def fail(user_id):
+        raise RuntimeError("db down")
+
+    async def machines(now_ts):
+        return [{"machine_id": 1, "room_id": 1}, {"machine_id": 2, "room_id": 2}]
+
+    def replay(*args):
+        raise AssertionError("구독 방을 모르면 재전송하지 않아야 함")
+
+    monkeypatch.setattr(ws_manager, "_fetch_user_room_ids", fail)
+    monkeypatch.setattr(ws_manager, "_gather_machine_timers", machines)
+    monkeypatch.setattr(ws_manager.event_buffer, "replay", replay)
+    websocket = _FakeWebSocket()
+
+    asyncio.run(ws_manager.resume_session(7, websocket, last_seq=0))
+
+    assert [m["type"] for m in websocket.sent] == ["snapshot"]
+    assert [m["machine_id"] for m in websocket.sent[0]["machines"]] == [1, 2]
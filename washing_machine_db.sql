@@ -24,12 +24,14 @@ DROP TABLE IF EXISTS `ai_tip_cache`;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `ai_tip_cache` (
   `id` int NOT NULL AUTO_INCREMENT,
+  `room_id` int NOT NULL DEFAULT '1' COMMENT '세탁실 ID (세탁실별 팁)',
   `tip_message` text NOT NULL COMMENT 'AI가 생성한 팁 메시지',
   `fetched_at` bigint NOT NULL COMMENT '생성 시각 (Unix timestamp)',
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
-  KEY `idx_fetched_at` (`fetched_at`)
-) ENGINE=InnoDB AUTO_INCREMENT=387 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='AI 팁 캐시 (10분 갱신, 랜덤 반환)';
+  KEY `idx_fetched_at` (`fetched_at`),
+  KEY `idx_room_id` (`room_id`)
+) ENGINE=InnoDB AUTO_INCREMENT=387 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='AI 팁 캐시 (세탁실별, 랜덤 반환)';
 /*!40101 SET character_set_client = @saved_cs_client */;
 
 --
@@ -38,7 +40,7 @@ CREATE TABLE `ai_tip_cache` (
 
 LOCK TABLES `ai_tip_cache` WRITE;
 /*!40000 ALTER TABLE `ai_tip_cache` DISABLE KEYS */;
-INSERT INTO `ai_tip_cache` VALUES (386,'지금은 1대만 사용 중이지만 평균 바쁜 시간인데, 오늘 밤 10시(22시)가 0대로 제일 한산할 거예요! ?',1763545717,'2025-11-19 09:48:37');
+INSERT INTO `ai_tip_cache` VALUES (386,1,'지금은 1대만 사용 중이지만 평균 바쁜 시간인데, 오늘 밤 10시(22시)가 0대로 제일 한산할 거예요! ?',1763545717,'2025-11-19 09:48:37');
 /*!40000 ALTER TABLE `ai_tip_cache` ENABLE KEYS */;
 UNLOCK TABLES;
 
@@ -72,6 +74,61 @@ INSERT INTO `busy_table` VALUES (77996,'월',0,0,'2025-11-24 10:37:32'),(77997,'
 /*!40000 ALTER TABLE `busy_table` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `congestion_weekly_table`
+--
+
+DROP TABLE IF EXISTS `congestion_weekly_table`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `congestion_weekly_table` (
+  `room_id` int NOT NULL COMMENT '세탁실 (알 수 없으면 0)',
+  `week_start` date NOT NULL COMMENT '주 시작일 (KST 월요일)',
+  `busy_day` tinyint NOT NULL COMMENT '요일 (0=월 ~ 6=일)',
+  `busy_time` tinyint NOT NULL COMMENT '시간 (0-23)',
+  `busy_count` int NOT NULL DEFAULT '0' COMMENT '해당 주/시간대에 사용 중이던 세탁기 수',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`room_id`,`week_start`,`busy_day`,`busy_time`),
+  KEY `idx_week_start` (`week_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `congestion_weekly_table`
+--
+
+LOCK TABLES `congestion_weekly_table` WRITE;
+/*!40000 ALTER TABLE `congestion_weekly_table` DISABLE KEYS */;
+/*!40000 ALTER TABLE `congestion_weekly_table` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `duration_model_table`
+--
+
+DROP TABLE IF EXISTS `duration_model_table`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `duration_model_table` (
+  `scope` varchar(10) COLLATE utf8mb4_unicode_ci NOT NULL COMMENT 'course / machine',
+  `scope_key` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '코스명 또는 machine_id:코스명',
+  `segment` varchar(10) COLLATE utf8mb4_unicode_ci NOT NULL COMMENT 'washing / spinning / total',
+  `samples` json NOT NULL COMMENT '최근 완료 사이클 소요 시간(분) 목록',
+  `rejected` int NOT NULL DEFAULT '0' COMMENT '이상치로 제외된 표본 수',
+  `updated_at` bigint NOT NULL COMMENT 'Unix timestamp (초)',
+  PRIMARY KEY (`scope`,`scope_key`,`segment`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='사이클 소요 시간 학습 표본';
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `duration_model_table`
+--
+
+LOCK TABLES `duration_model_table` WRITE;
+/*!40000 ALTER TABLE `duration_model_table` DISABLE KEYS */;
+/*!40000 ALTER TABLE `duration_model_table` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `machine_table`
 --
@@ -123,6 +180,42 @@ INSERT INTO `machine_table` VALUES (1,1,'1번 세탁기',1,'수원a기숙사',NU
 /*!40000 ALTER TABLE `machine_table` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `notification_outbox`
+--
+
+DROP TABLE IF EXISTS `notification_outbox`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `notification_outbox` (
+  `outbox_id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `machine_id` int NOT NULL COMMENT '세탁기 ID',
+  `room_id` int DEFAULT NULL COMMENT '세탁실 ID',
+  `event_type` varchar(30) COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'wash_complete',
+  `payload` json NOT NULL COMMENT '수신자 그룹(user_ids, title, body) + data',
+  `status` varchar(10) COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'PENDING' COMMENT 'PENDING / SENT / FAILED',
+  `created_at` bigint NOT NULL COMMENT 'Unix timestamp (초)',
+  `attempts` int NOT NULL DEFAULT '0',
+  `next_attempt_at` bigint NOT NULL COMMENT '다음 전송 시도 시각 (Unix timestamp)',
+  `locked_by` varchar(32) COLLATE utf8mb4_unicode_ci DEFAULT NULL COMMENT '행을 가져간 발송 루프 ID',
+  `locked_until` bigint DEFAULT NULL,
+  `sent_at` bigint DEFAULT NULL,
+  `last_error` varchar(500) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  PRIMARY KEY (`outbox_id`),
+  KEY `idx_status_next_attempt` (`status`,`next_attempt_at`),
+  KEY `idx_locked_by` (`locked_by`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='완료 푸시 알림 outbox';
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `notification_outbox`
+--
+
+LOCK TABLES `notification_outbox` WRITE;
+/*!40000 ALTER TABLE `notification_outbox` DISABLE KEYS */;
+/*!40000 ALTER TABLE `notification_outbox` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `notify_subscriptions`
 --
@@ -403,6 +496,47 @@ INSERT INTO `user_table` VALUES (1,'홍길동','5994471abb01112afcc18159f6cc74b4
 /*!40000 ALTER TABLE `user_table` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `wash_cycle_table`
+--
+
+DROP TABLE IF EXISTS `wash_cycle_table`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `wash_cycle_table` (
+  `cycle_id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `machine_id` int NOT NULL COMMENT '세탁기 ID',
+  `machine_uuid` int DEFAULT NULL,
+  `room_id` int DEFAULT NULL COMMENT '세탁실 ID',
+  `machine_type` varchar(10) COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'washer',
+  `course_name` varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `started_at` bigint NOT NULL COMMENT '세탁/건조 시작 (first_update, Unix timestamp)',
+  `spinning_at` bigint DEFAULT NULL COMMENT '탈수 시작 (spinning_update)',
+  `finished_at` bigint NOT NULL COMMENT '완료 (last_update)',
+  `washing_seconds` int DEFAULT NULL,
+  `spinning_seconds` int DEFAULT NULL,
+  `total_seconds` int DEFAULT NULL,
+  `wash_avg_magnitude` float DEFAULT NULL,
+  `wash_max_magnitude` float DEFAULT NULL,
+  `spin_max_magnitude` float DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`cycle_id`),
+  UNIQUE KEY `uq_machine_started` (`machine_id`,`started_at`),
+  KEY `idx_finished_at` (`finished_at`),
+  KEY `idx_room_finished` (`room_id`,`finished_at`),
+  KEY `idx_machine_finished` (`machine_id`,`finished_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='완료된 세탁/건조 사이클 기록 (append-only)';
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `wash_cycle_table`
+--
+
+LOCK TABLES `wash_cycle_table` WRITE;
+/*!40000 ALTER TABLE `wash_cycle_table` DISABLE KEYS */;
+/*!40000 ALTER TABLE `wash_cycle_table` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `weather_cache`
 --